@@ -2,46 +2,26 @@ from dotenv import load_dotenv
 load_dotenv()
 import streamlit as st
 from utils.llm_client import LLMClient
-from utils.memory_manager import MemoryManager
-from prompts.few_shot_templates import get_few_shot_prompt
-from utils.session_store import init_session, append_message, get_conversation
-from utils.pdf_processor import process_uploaded_pdf
-from utils.vector_store import build_index, query_index, search_document_chunks
-from utils.bfsi_filter import is_bfsi_query, safety_check, clean_unsafe_content
+from utils.session_store import init_session, get_conversation
+from utils.document_cache import document_key
+from utils.corpus import SessionCorpus
+from utils.ingestion import ACTIVE_JOB_STATES, ingestion_manager
+from utils.pipeline import PipelineSession, QueryPipeline
+from utils.embeddings import warm_up_in_background
+from utils import knowledge_base
 import os
-import re
 
-# Comprehensive KB – covers health, home, claims, and general policy info
-KB_DOCS = [
-    # Health insurance facts
-    "Health insurance covers medical expenses incurred due to illness, injury, or disease.",
-    "We offer individual, family, and group health insurance plans.",
-    "Health insurance provides financial protection against unexpected medical emergencies.",
-    "You can renew your health insurance policy online through our website or mobile app.",
-    "Pre-existing conditions may be covered after a waiting period in health insurance policies.",
-    "Cashless hospitalization is available at our network hospitals for health insurance policyholders.",
-    "You can add dependents to your health insurance policy during renewal or special enrollment periods.",
-    # Home insurance facts
-    "Home insurance covers damages caused by natural disasters such as earthquakes, floods, and hurricanes.",
-    "Your policy covers your home, personal belongings, and liability.",
-    "Your policy includes coverage for earthquakes and floods.",
-    # Claims and general info
-    "You can file a claim via our mobile app under the Claims tab.",
-    "To file a claim, provide your policy number, a detailed description, and supporting documents.",
-    "Your policy is valid for one year from the date of issue.",
-    "You can pay your premium online through our website or mobile app using various payment methods.",
-    "The grace period for premium payment is usually 30 days from the due date.",
-    "To cancel your policy, contact our customer service team and provide your policy number and reason for cancellation.",
-    "Adding a new driver to your auto policy may affect your premium.",
-    "You can add or remove beneficiaries from your life insurance policy at any time.",
-    # More general insurance facts
-    "Insurance policies help manage financial risks by providing coverage for unexpected events.",
-    "Policyholders receive a renewal notice before their policy expires.",
-    "You can check your claim status online or by contacting customer service.",
-]
+# Load the shared encoder in the background, once per process: the first page renders
+# (and KB questions are answered lexically) without waiting for it
+warm_up_in_background()
 
-# Build the default KB index
-faiss_index = build_index(KB_DOCS)
+@st.cache_resource
+def load_kb_index():
+    """Load the KB index once per process (see utils.knowledge_base)."""
+    return knowledge_base.load_kb_index()
+
+# Load the default KB index
+faiss_index = load_kb_index()
 
 # Initialize session state
 init_session()
@@ -75,49 +55,106 @@ else:
 st.title('PolicyPulse Chat')
 
 # File upload section
-st.subheader('📁 Upload Policy Document')
-uploaded_file = st.file_uploader(
-    "Upload a PDF policy document to ask questions based on its contents",
+st.subheader('📁 Upload Policy Documents')
+if 'uploader_key' not in st.session_state:
+    st.session_state['uploader_key'] = 0
+if 'doc_corpus' not in st.session_state:
+    # One shared index for every document uploaded in this session
+    st.session_state['doc_corpus'] = SessionCorpus()
+corpus = st.session_state['doc_corpus']
+uploaded_files = st.file_uploader(
+    "Upload PDF policy documents (e.g. proposal form, schedule, endorsement) to ask questions based on their contents",
     type=['pdf'],
-    help="Upload a PDF file to enable document-specific Q&A"
+    accept_multiple_files=True,
+    key=f"uploader_{st.session_state['uploader_key']}",
+    help="Upload one or more PDF files to enable document-specific Q&A"
 )
 
-# Process uploaded PDF
-if uploaded_file is not None:
-    if 'doc_chunks' not in st.session_state or 'doc_index' not in st.session_state:
-        with st.spinner("Processing uploaded document..."):
-            # Process the PDF
-            doc_chunks = process_uploaded_pdf(uploaded_file)
-            
-            if doc_chunks:
-                # Build FAISS index for document chunks
-                doc_index = build_index(doc_chunks)
-                
-                # Store in session state
-                st.session_state['doc_chunks'] = doc_chunks
-                st.session_state['doc_index'] = doc_index
-                st.session_state['uploaded_filename'] = uploaded_file.name
-                
-                st.success(f"✅ Document uploaded successfully! You can now ask questions based on '{uploaded_file.name}'.")
-                st.info("📄 Using uploaded document for answer context.")
-            else:
-                st.error("❌ Failed to process the uploaded document. Please try a different PDF file.")
-    
-    # Display current document info
-    if 'uploaded_filename' in st.session_state:
-        st.info(f"📄 Currently using: {st.session_state['uploaded_filename']}")
-        if st.button("🗑️ Clear Document"):
-            # Clear document-related session state
-            for key in ['doc_chunks', 'doc_index', 'uploaded_filename']:
-                if key in st.session_state:
-                    del st.session_state[key]
-            st.rerun()
+# Index uploaded PDFs in the background: the upload returns at once and each page is
+# searchable as soon as it is indexed. Job ids are kept per file so reruns never reprocess it.
+ingest_jobs = st.session_state.setdefault('ingest_jobs', {})
+reported = st.session_state.setdefault('ingest_reported', set())
+uploaded_keys = {}
+for uploaded_file in uploaded_files or []:
+    pdf_bytes = uploaded_file.getvalue()
+    doc_key = document_key(pdf_bytes)
+    uploaded_keys[doc_key] = uploaded_file.name
+    if doc_key not in ingest_jobs:
+        ingest_jobs[doc_key] = ingestion_manager.submit(pdf_bytes, uploaded_file.name, corpus)
+for doc_key in list(ingest_jobs):
+    if doc_key not in uploaded_keys:
+        ingestion_manager.forget(ingest_jobs.pop(doc_key))
+        corpus.remove_document(doc_key)
+        reported.discard(doc_key)
+
+# Report finished jobs once; poll the running ones
+job_statuses = {doc_key: ingestion_manager.status(job_id) for doc_key, job_id in ingest_jobs.items()}
+for doc_key, job_status in job_statuses.items():
+    if job_status is None or job_status['status'] in ACTIVE_JOB_STATES or doc_key in reported:
+        continue
+    reported.add(doc_key)
+    if job_status['status'] == 'done':
+        st.success(f"✅ Document uploaded successfully! You can now ask questions based on '{job_status['name']}'.")
+    else:
+        st.error(f"❌ Failed to process '{job_status['name']}': {job_status['error']} Please try a different PDF file.")
+active_statuses = [s for s in job_statuses.values() if s is not None and s['status'] in ACTIVE_JOB_STATES]
+# The chat stays locked until every upload has at least one indexed page to answer from
+chat_locked = any(s['pages_done'] == 0 for s in active_statuses)
+
+
+@st.fragment(run_every=1.0)
+def show_ingestion_progress():
+    statuses = [ingestion_manager.status(job_id) for job_id in st.session_state['ingest_jobs'].values()]
+    active = [s for s in statuses if s is not None and s['status'] in ACTIVE_JOB_STATES]
+    for job_status in active:
+        pages = f"page {job_status['pages_done']} of {job_status['page_count']}" if job_status['page_count'] else "queued"
+        st.progress(job_status['progress'], text=f"Indexing {job_status['name']}: {pages}")
+    # Rerun the whole page when a job finishes or the chat can unlock
+    if len(active) != len(active_statuses) or (chat_locked and not any(s['pages_done'] == 0 for s in active)):
+        st.rerun()
+
+
+if active_statuses:
+    show_ingestion_progress()
+
+# Display current document info
+if len(corpus):
+    doc_names = corpus.document_names()
+    # Keep the user's selection, and select newly uploaded documents by default
+    previous_options = st.session_state.get('doc_filter_options', [])
+    selected_docs = [doc_key for doc_key in st.session_state.get('doc_filter', []) if doc_key in doc_names]
+    selected_docs += [doc_key for doc_key in doc_names if doc_key not in previous_options and doc_key not in selected_docs]
+    st.session_state['doc_filter'] = selected_docs
+    st.session_state['doc_filter_options'] = list(doc_names)
+    st.multiselect(
+        "📄 Search in documents",
+        options=list(doc_names),
+        key='doc_filter',
+        format_func=lambda doc_key: doc_names[doc_key] + ("" if corpus.is_complete(doc_key) else " (indexing…)"),
+    )
+    storage = corpus.memory_report()
+    index_label = storage['index_type']
+    if index_label != storage['requested_type']:
+        index_label += f" (requested {storage['requested_type']})"
+    st.caption(f"Index: {index_label} · {storage['vectors']} lines · "
+               f"{storage['bytes_per_vector']:.0f} B/vector · {storage['vector_bytes'] / 1024:.1f} KB")
+    if st.button("🗑️ Clear Documents"):
+        # Reset the corpus and the uploader widget
+        for job_id in st.session_state.pop('ingest_jobs', {}).values():
+            ingestion_manager.forget(job_id)
+        st.session_state['doc_corpus'] = SessionCorpus()
+        st.session_state.pop('ingest_reported', None)
+        st.session_state.pop('doc_filter', None)
+        st.session_state.pop('doc_filter_options', None)
+        st.session_state['uploader_key'] += 1
+        st.rerun()
 
 # Instantiate LLMClient with Hugging Face API key
 llm = LLMClient(api_key=os.getenv('HF_API_KEY'))
 
-# Initialize memory manager
-memory_manager = MemoryManager(llm)
+# Question answering runs headless; this page only maps session state in and results out.
+# The reply is shown after one LLM call; its rationale and memory summary follow.
+pipeline = QueryPipeline(llm, faiss_index, defer_follow_up=True)
 
 # Chat area
 st.subheader('💬 Chat')
@@ -130,361 +167,23 @@ if 'user_input' not in st.session_state:
     st.session_state.user_input = ''
 
 def on_send():
-    user_input = st.session_state.user_input
-    if user_input.strip():
-        # Safety check on user input first
-        input_safety = safety_check(user_input.strip(), "")
-        st.session_state['last_safety_check'] = input_safety
-        
-        if input_safety["unsafe"]:
-            warning_message = (
-                "⚠️ Your question may violate safety guidelines. "
-                "Please ensure your questions are appropriate and related to BFSI topics. "
-                "I can help you with legitimate banking, financial services, and insurance matters."
-            )
-            append_message('assistant', warning_message)
-            st.session_state.user_input = ''
-            return
-        
-        append_message('user', user_input.strip())
-        if not is_bfsi_query(user_input):
-            refusal_message = (
-                "I'm sorry, I can only answer questions related to banking, financial services, and insurance (BFSI). "
-                "Please ask a question relevant to these topics."
-            )
-            append_message('assistant', refusal_message)
-            st.session_state.user_input = ''
-            return
-        doc_chunks = None
-        kb_passages = None
-        using_document = False
-        if ('doc_chunks' in st.session_state and 
-            'doc_index' in st.session_state and 
-            st.session_state['doc_chunks'] and 
-            st.session_state['doc_index']):
-            # Heuristic for 'customer name'
-            if not doc_chunks and 'customer name' in user_input.lower():
-                customer_name_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'customer name' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            customer_name_lines.append(st.session_state['doc_chunks'][j])
-                customer_name_lines = list(dict.fromkeys(customer_name_lines))[:5]
-                if customer_name_lines:
-                    doc_chunks = customer_name_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (customer name match).")
-            # Heuristic for 'insured name'
-            if not doc_chunks and 'insured name' in user_input.lower():
-                insured_name_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'insured name' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            insured_name_lines.append(st.session_state['doc_chunks'][j])
-                insured_name_lines = list(dict.fromkeys(insured_name_lines))[:5]
-                if insured_name_lines:
-                    doc_chunks = insured_name_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (insured name match).")
-            # Heuristic for 'policyholder'
-            if not doc_chunks and 'policyholder' in user_input.lower():
-                policyholder_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'policyholder' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            policyholder_lines.append(st.session_state['doc_chunks'][j])
-                policyholder_lines = list(dict.fromkeys(policyholder_lines))[:5]
-                if policyholder_lines:
-                    doc_chunks = policyholder_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (policyholder match).")
-            # Heuristic for 'nominee'
-            if not doc_chunks and 'nominee' in user_input.lower():
-                nominee_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'nominee details' in line.lower():
-                        # Add the header and up to 5 lines below (table rows)
-                        nominee_lines.append(line)
-                        for k in range(1, 6):
-                            if i + k < len(st.session_state['doc_chunks']):
-                                next_line = st.session_state['doc_chunks'][i + k]
-                                # Stop if we hit a blank line or a new section
-                                if not next_line.strip() or any(x in next_line.lower() for x in ["details", "policy", "coverage", "important", "note:"]):
-                                    break
-                                nominee_lines.append(next_line)
-                    elif 'nominee' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            nominee_lines.append(st.session_state['doc_chunks'][j])
-                nominee_lines = list(dict.fromkeys(nominee_lines))[:7]
-                if nominee_lines:
-                    doc_chunks = nominee_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (nominee match).")
-            # Heuristic for 'address'
-            if not doc_chunks and 'address' in user_input.lower():
-                address_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'address' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            address_lines.append(st.session_state['doc_chunks'][j])
-                address_lines = list(dict.fromkeys(address_lines))[:5]
-                if address_lines:
-                    doc_chunks = address_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (address match).")
-            # Heuristic for 'mobile' or 'phone'
-            if not doc_chunks and any(word in user_input.lower() for word in ['mobile', 'phone']):
-                phone_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'mobile' in line.lower() or 'phone' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            phone_lines.append(st.session_state['doc_chunks'][j])
-                phone_lines = list(dict.fromkeys(phone_lines))[:5]
-                if phone_lines:
-                    doc_chunks = phone_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (phone/mobile match).")
-            # Heuristic for 'email'
-            if not doc_chunks and 'email' in user_input.lower():
-                email_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'email' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            email_lines.append(st.session_state['doc_chunks'][j])
-                email_lines = list(dict.fromkeys(email_lines))[:5]
-                if email_lines:
-                    doc_chunks = email_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (email match).")
-            # Heuristic for 'gstin'
-            if not doc_chunks and 'gstin' in user_input.lower():
-                gstin_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'gstin' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            gstin_lines.append(st.session_state['doc_chunks'][j])
-                gstin_lines = list(dict.fromkeys(gstin_lines))[:5]
-                if gstin_lines:
-                    doc_chunks = gstin_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (GSTIN match).")
-            # Heuristic for 'plan' or 'product'
-            if not doc_chunks and any(word in user_input.lower() for word in ['plan', 'product']):
-                plan_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'plan' in line.lower() or 'product' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            plan_lines.append(st.session_state['doc_chunks'][j])
-                plan_lines = list(dict.fromkeys(plan_lines))[:5]
-                if plan_lines:
-                    doc_chunks = plan_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (plan/product match).")
-            # Heuristic for 'premium'
-            if not doc_chunks and 'premium' in user_input.lower():
-                premium_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'premium' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            premium_lines.append(st.session_state['doc_chunks'][j])
-                premium_lines = list(dict.fromkeys(premium_lines))[:5]
-                if premium_lines:
-                    doc_chunks = premium_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (premium match).")
-            # Heuristic for 'date of inception'
-            if not doc_chunks and 'date of inception' in user_input.lower():
-                inception_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'date of inception' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            inception_lines.append(st.session_state['doc_chunks'][j])
-                inception_lines = list(dict.fromkeys(inception_lines))[:5]
-                if inception_lines:
-                    doc_chunks = inception_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (date of inception match).")
-            # Heuristic for 'collection number'
-            if not doc_chunks and 'collection number' in user_input.lower():
-                collection_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'collection no' in line.lower() or 'collection number' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            collection_lines.append(st.session_state['doc_chunks'][j])
-                collection_lines = list(dict.fromkeys(collection_lines))[:5]
-                if collection_lines:
-                    doc_chunks = collection_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (collection number match).")
-            # Heuristic for 'collection date'
-            if not doc_chunks and 'collection date' in user_input.lower():
-                collection_date_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'collection date' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            collection_date_lines.append(st.session_state['doc_chunks'][j])
-                collection_date_lines = list(dict.fromkeys(collection_date_lines))[:5]
-                if collection_date_lines:
-                    doc_chunks = collection_date_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (collection date match).")
-            # Heuristic for 'policy category'
-            if not doc_chunks and 'policy category' in user_input.lower():
-                policy_category_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'policy category' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            policy_category_lines.append(st.session_state['doc_chunks'][j])
-                policy_category_lines = list(dict.fromkeys(policy_category_lines))[:5]
-                if policy_category_lines:
-                    doc_chunks = policy_category_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (policy category match).")
-            # Heuristic for 'insured' questions
-            if any(word in user_input.lower() for word in ["insured", "insured name", "who is insured", "who is the insured"]):
-                insured_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if "insured" in line.lower() or "name" in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            insured_lines.append(st.session_state['doc_chunks'][j])
-                insured_lines = list(dict.fromkeys(insured_lines))[:5]
-                if insured_lines:
-                    doc_chunks = insured_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (insured match).")
-            # Heuristic for 'policy number'
-            if not doc_chunks and 'policy number' in user_input.lower():
-                policy_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'policy no' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            policy_lines.append(st.session_state['doc_chunks'][j])
-                policy_lines = list(dict.fromkeys(policy_lines))[:5]
-                if policy_lines:
-                    doc_chunks = policy_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (policy number match).")
-            # Improved heuristic for 'sum insured'/'sum assured' (2 lines before and after)
-            if not doc_chunks and any(word in user_input.lower() for word in ["sum insured", "sum assured"]):
-                sum_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if re.search(r"sum[\s_-]*insured|sum[\s_-]*assured", line, re.IGNORECASE):
-                        for j in range(max(0, i-2), min(len(st.session_state['doc_chunks']), i+3)):
-                            sum_lines.append(st.session_state['doc_chunks'][j])
-                sum_lines = list(dict.fromkeys(sum_lines))[:7]
-                if sum_lines:
-                    doc_chunks = sum_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (sum insured match).")
-            # Heuristic for 'customer code'
-            if not doc_chunks and 'customer code' in user_input.lower():
-                customer_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'customer code' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            customer_lines.append(st.session_state['doc_chunks'][j])
-                customer_lines = list(dict.fromkeys(customer_lines))[:5]
-                if customer_lines:
-                    doc_chunks = customer_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (customer code match).")
-            # Heuristic for 'proposer'
-            if not doc_chunks and 'proposer' in user_input.lower():
-                proposer_lines = []
-                for i, line in enumerate(st.session_state['doc_chunks']):
-                    if 'proposer' in line.lower():
-                        for j in range(max(0, i-1), min(len(st.session_state['doc_chunks']), i+2)):
-                            proposer_lines.append(st.session_state['doc_chunks'][j])
-                proposer_lines = list(dict.fromkeys(proposer_lines))[:5]
-                if proposer_lines:
-                    doc_chunks = proposer_lines
-                    using_document = True
-                    st.info("🔍 Using uploaded document for answer context (proposer match).")
-            if not doc_chunks:
-                try:
-                    relevant_chunks, has_relevant_chunks = search_document_chunks(
-                        st.session_state['doc_index'],
-                        st.session_state['doc_chunks'],
-                        user_input,
-                        k=3,
-                        similarity_threshold=0.1
-                    )
-                    if has_relevant_chunks:
-                        doc_chunks = relevant_chunks
-                        using_document = True
-                        st.info("🔍 Using uploaded document for answer context.")
-                    else:
-                        st.warning("⚠️ No relevant information found in uploaded document. Using general knowledge base.")
-                        passages = query_index(faiss_index, KB_DOCS, user_input, k=3)
-                        kb_passages = passages
-                except Exception as e:
-                    st.error(f"Error searching document: {str(e)}")
-                    passages = query_index(faiss_index, KB_DOCS, user_input, k=3)
-                    kb_passages = passages
-        else:
-            passages = query_index(faiss_index, KB_DOCS, user_input, k=3)
-            kb_passages = passages
-        base_prompt = get_few_shot_prompt(
-            st.session_state.context_page, 
-            user_input.strip(), 
-            kb_passages=kb_passages,
-            doc_chunks=doc_chunks
-        )
-        
-        # Add memory context to the prompt by modifying the system message
-        memory_ctx = memory_manager.get_memory_context()
-        if memory_ctx:
-            # Insert memory context prominently at the beginning of the system message
-            if "You are a helpful assistant" in base_prompt:
-                # Split at the system message start and insert memory before it
-                parts = base_prompt.split("You are a helpful assistant", 1)
-                full_prompt = f"{parts[0]}### CONVERSATION MEMORY (Use this information for consistency):\n{memory_ctx}\n\nYou are a helpful assistant{parts[1]}"
-            else:
-                # Fallback: prepend memory context
-                full_prompt = f"### CONVERSATION MEMORY (Use this information for consistency):\n{memory_ctx}\n\n{base_prompt}"
-            print(f"Full prompt with memory context:\n{full_prompt[:500]}...")
-        else:
-            full_prompt = base_prompt
-            print("No memory context available")
-        
-        # Streaming support
-        stream_response = False
-        if 'stream_response' in st.session_state:
-            stream_response = st.session_state['stream_response']
-        elif 'stream_response' in globals():
-            stream_response = globals()['stream_response']
-        # You can also add config-based check here if you have a config dict
-
-        if stream_response:
-            # Only accumulate the streamed reply here, do not render
-            reply_accum = ""
-            for token in llm.stream_chat_response(full_prompt):
-                reply_accum += token
-            reply = reply_accum
-            rationale = None
-        else:
-            reply, rationale = llm.chat(full_prompt, kb_passages=kb_passages)
-        
-        # Safety check on the response
-        safety_result = safety_check(user_input.strip(), reply)
-        st.session_state['last_safety_check'] = safety_result
-        
-        if safety_result["unsafe"]:
-            cleaned_reply = clean_unsafe_content(reply)
-            cleaned_safety = safety_check(user_input.strip(), cleaned_reply)
-            if not cleaned_safety["unsafe"]:
-                reply = cleaned_reply
-                rationale = "Some unsafe words were removed for safety."
-            else:
-                reply = "Sorry, I couldn't provide a safe answer to your question."
-                rationale = "Content could not be made safe."
-        # Only block if unsafe, not just if not BFSI relevant
-        
-        # Add this conversation turn to memory
-        memory_manager.add_turn(user_input.strip(), reply)
-        
-        append_message('assistant', reply, rationale=rationale)
-        st.session_state.user_input = ''
+    session = PipelineSession(
+        context_page=st.session_state.context_page,
+        corpus=st.session_state.get('doc_corpus'),
+        doc_ids=st.session_state.get('doc_filter'),
+        memories=st.session_state.memories,
+        conversation=st.session_state.conversation,
+        stream=st.session_state.get('stream_response', False),
+        follow_up=st.session_state.get('follow_up'),
+    )
+    result = pipeline.run(st.session_state.user_input, session)
+    if result is None:
+        return
+    st.session_state['follow_up'] = session.follow_up
+    st.session_state['last_safety_check'] = session.last_safety_check
+    for level, message in result['notices']:
+        getattr(st, level)(message)
+    st.session_state.user_input = ''
 
 with chat_container:
     for idx, msg in enumerate(conversation):
@@ -524,4 +223,18 @@ with chat_container:
             if 'rationale' in msg and msg['rationale']:
                 st.markdown(f"*🔍 Rationale:* {msg['rationale']}", unsafe_allow_html=True)
 
-st.text_input('Type your message:', key='user_input', on_change=on_send)
+
+
+@st.fragment(run_every=1.0)
+def await_rationale():
+    # Rerun the page once the rationale of the latest answer has arrived
+    if st.session_state['follow_up'].done():
+        st.rerun()
+
+
+follow_up = st.session_state.get('follow_up')
+if follow_up is not None and not follow_up.done():
+    await_rationale()
+
+st.text_input('Type your message:', key='user_input', on_change=on_send, disabled=chat_locked,
+              placeholder="Indexing your upload..." if chat_locked else None)
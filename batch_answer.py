@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Answer a JSONL file of questions offline through the QueryPipeline.
+
+Each input line is a JSON object with the question ("question", "query" or "body") and
+optionally an "id" (or "request_id"), a "pdf" path to answer from and a "session" id.
+Questions sharing a session run in file order with one conversation and memory; all
+other work runs concurrently. Each PDF is ingested once and shared by every question
+that names it.
+
+Each answer is written as one JSON line as soon as it is ready: id, session, question,
+reply, rationale, route, kb_ranker, timings_ms (per pipeline stage, document ingestion, the
+rationale and memory follow-up, and total) and, for session questions, the session's
+memory summaries; failures get an "error" instead. Rerunning with the same output file
+skips the questions already answered and restores their sessions' conversation and memory.
+The encoder is loaded before the first question, so knowledge-base answers are always
+ranked by vector search rather than depending on how fast it loads.
+
+Usage:
+    python batch_answer.py questions.jsonl --output answers.jsonl --concurrency 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from utils.corpus import SessionCorpus
+from utils.document_cache import DocumentCache
+from utils.ingestion import PageIngestor
+from utils.pipeline import PipelineSession, QueryPipeline
+
+
+def read_questions(path: str) -> Iterator[dict]:
+    """Stream questions from a JSONL file as {'id', 'question', 'pdf', 'session'} dicts."""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            session = item.get('session')
+            yield {
+                'id': str(item.get('id') or item.get('request_id') or f"line-{line_no}"),
+                'question': item.get('question') or item.get('query') or item.get('body') or "",
+                'pdf': item.get('pdf'),
+                'session': None if session is None else str(session),
+            }
+
+
+def read_answers(path: str) -> Tuple[Set[str], Dict[str, list]]:
+    """
+    Answers already written to `path` (a missing file or a torn last line is fine).
+
+    Returns:
+        (ids answered without error, {session id: its answered records in file order})
+    """
+    done: Set[str] = set()
+    sessions: Dict[str, list] = {}
+    if not os.path.exists(path):
+        return done, sessions
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('error') is None:
+                done.add(record['id'])
+                if record.get('session') is not None:
+                    sessions.setdefault(record['session'], []).append(record)
+    return done, sessions
+
+
+class BatchRunner:
+    """
+    Runs questions through a QueryPipeline on a bounded thread pool.
+
+    Questions of one session are chained so they run one at a time, in submission
+    order; PDFs are ingested on first use (once per path, however many questions or
+    threads ask for them) into a corpus shared by their questions.
+    """
+
+    def __init__(self, pipeline: QueryPipeline, concurrency: int = 4, cache: Optional[DocumentCache] = None):
+        self.pipeline = pipeline
+        self.concurrency = concurrency
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch')
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, PipelineSession] = {}
+        self._session_tails: Dict[str, Future] = {}
+        self._documents: Dict[str, Future] = {}
+
+    def restore_session(self, session_id: str, records: Iterable[dict]) -> None:
+        """Rebuild a session's conversation and memory from its answered records."""
+        session = self._session(session_id)
+        for record in records:
+            session.append_message('user', record['question'])
+            session.append_message('assistant', record['reply'], rationale=record.get('rationale'))
+            session.memories[:] = record.get('memories', session.memories)
+
+    def submit(self, item: dict) -> Future:
+        """Queue one question; the future resolves to its output record."""
+        session_id = item['session']
+        if session_id is None:
+            return self._executor.submit(self.answer, item)
+        with self._lock:
+            previous = self._session_tails.get(session_id)
+            future = self._executor.submit(self._answer_after, previous, item)
+            self._session_tails[session_id] = future
+        return future
+
+    def _answer_after(self, previous: Optional[Future], item: dict) -> dict:
+        # The previous turn was queued first, so it is already running or done: waiting cannot deadlock
+        if previous is not None:
+            wait([previous])
+        return self.answer(item)
+
+    def _session(self, session_id: Optional[str]) -> PipelineSession:
+        if session_id is None:
+            # One-off question: no memory to keep, so no memory-summary LLM call
+            return PipelineSession(remember=False)
+        with self._lock:
+            return self._sessions.setdefault(session_id, PipelineSession())
+
+    def document(self, path: str) -> Tuple[SessionCorpus, str]:
+        """(corpus, document id) for a PDF, ingesting it on first use."""
+        with self._lock:
+            future = self._documents.get(path)
+            owner = future is None
+            if owner:
+                future = self._documents[path] = Future()
+        if owner:
+            try:
+                future.set_result(self._ingest(path))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def _ingest(self, path: str) -> Tuple[SessionCorpus, str]:
+        with open(path, 'rb') as f:
+            pdf_bytes = f.read()
+        corpus = SessionCorpus()
+        ingestor = PageIngestor(pdf_bytes, os.path.basename(path), corpus, cache=self.cache)
+        for _ in ingestor.run():
+            pass
+        if ingestor.error:
+            raise RuntimeError(ingestor.error)
+        return corpus, ingestor.key
+
+    def answer(self, item: dict) -> dict:
+        """Answer one question; errors are reported in the record rather than raised."""
+        started = time.perf_counter()
+        record = {'id': item['id'], 'session': item['session'], 'question': item['question']}
+        timings: Dict[str, float] = {}
+        session = self._session(item['session'])
+        try:
+            if item['pdf']:
+                document_started = time.perf_counter()
+                session.corpus, doc_id = self.document(item['pdf'])
+                session.doc_ids = [doc_id]
+                timings['document'] = time.perf_counter() - document_started
+            else:
+                session.corpus, session.doc_ids = None, None
+            result = self.pipeline.run(item['question'], session)
+            if result is None:
+                raise ValueError("Empty question")
+            timings.update(result['timings'])
+            if result['follow_up'] is not None:
+                # The rationale and memory summary are generated together after the reply
+                follow_up_started = time.perf_counter()
+                result['rationale'] = result['follow_up'].result()
+                timings['follow_up'] = time.perf_counter() - follow_up_started
+            record.update({key: result[key] for key in ('reply', 'rationale', 'route', 'kb_ranker')})
+            record['error'] = None
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+        timings['total'] = time.perf_counter() - started
+        record['timings_ms'] = {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+        if item['session'] is not None:
+            record['memories'] = list(session.memories)
+        return record
+
+    def run(self, items: Iterable[dict], output, skip: Set[str] = frozenset()) -> dict:
+        """
+        Answer every item not in `skip`, writing each record to `output` as it completes.
+        At most 2 x concurrency questions are in flight, so the input is streamed.
+
+        Returns:
+            {'answered', 'failed', 'skipped', 'seconds', 'mean_ms': {stage: mean ms}}
+        """
+        started = time.perf_counter()
+        stats = {'answered': 0, 'failed': 0, 'skipped': 0}
+        totals: Dict[str, float] = {}
+        # future -> submission number: a batch of finished futures is written in submission
+        # order, so a session's turns always appear in the file in the order they were asked
+        pending: Dict[Future, int] = {}
+
+        def drain(finished: Set[Future]) -> None:
+            for future in sorted(finished, key=pending.pop):
+                record = future.result()
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                stats['failed' if record['error'] else 'answered'] += 1
+                if not record['error']:
+                    for stage, ms in record['timings_ms'].items():
+                        totals[stage] = totals.get(stage, 0.0) + ms
+
+        for number, item in enumerate(items):
+            if item['id'] in skip:
+                stats['skipped'] += 1
+                continue
+            if len(pending) >= 2 * self.concurrency:
+                drain(wait(pending, return_when=FIRST_COMPLETED)[0])
+            pending[self.submit(item)] = number
+        drain(wait(pending)[0])
+        stats['seconds'] = time.perf_counter() - started
+        stats['mean_ms'] = {stage: total / stats['answered'] for stage, total in totals.items()}
+        return stats
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='JSONL file of questions')
+    parser.add_argument('--output', help='JSONL file for the answers (default: <input>.answers.jsonl)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Questions answered in parallel')
+    parser.add_argument('--restart', action='store_true', help='Ignore existing answers and start over')
+    args = parser.parse_args()
+    output_path = args.output or os.path.splitext(args.input)[0] + '.answers.jsonl'
+
+    load_dotenv()
+    # Imported here so `--help` does not load the encoder or the LLM client
+    from utils.embeddings import warm_up
+    from utils.knowledge_base import load_kb_index
+    from utils.llm_client import LLMClient
+    # Rank KB passages by vector search from the first question on, as in every later run
+    warm_up()
+    pipeline = QueryPipeline(LLMClient(api_key=os.getenv('HF_API_KEY')), load_kb_index(), defer_follow_up=True)
+    runner = BatchRunner(pipeline, concurrency=args.concurrency)
+
+    done, sessions = (set(), {}) if args.restart else read_answers(output_path)
+    for session_id, records in sessions.items():
+        runner.restore_session(session_id, records)
+    if done:
+        print(f"[batch_answer] Resuming: {len(done)} questions already answered in {output_path}")
+    try:
+        with open(output_path, 'w' if args.restart else 'a', encoding='utf-8') as output:
+            stats = runner.run(read_questions(args.input), output, skip=done)
+    finally:
+        runner.close()
+
+    answered = stats['answered'] + stats['failed']
+    rate = answered / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    print(f"[batch_answer] {stats['answered']} answered, {stats['failed']} failed, {stats['skipped']} skipped "
+          f"in {stats['seconds']:.1f}s ({rate:.2f} questions/s) -> {output_path}")
+    for stage, ms in stats['mean_ms'].items():
+        print(f"  {stage:<14} {ms:>10.1f} ms mean")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
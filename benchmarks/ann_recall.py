@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-latency benchmark of the approximate FAISS index types against the exact IndexFlatL2.
+Also reports bytes per vector, so the compressed types (sq8, pq) can be judged on memory vs recall loss.
+
+Usage:
+    python -m benchmarks.ann_recall                       # synthetic clustered vectors
+    python -m benchmarks.ann_recall --texts wordings.txt  # one passage per line, embedded with the shared encoder
+    python -m benchmarks.ann_recall --types flat sq8 pq   # per-session storage options only
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.index_factory import INDEX_TYPES, benchmark_index_types
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int = 0):
+    """Clustered unit vectors, which behave more like sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 50), dim))
+    def sample(count):
+        points = centers[rng.integers(len(centers), size=count)] + 0.3 * rng.normal(size=(count, dim))
+        return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype('float32')
+    return sample(n), sample(n_queries)
+
+
+def text_corpus(path: str, n_queries: int, seed: int = 0):
+    """Embed passages from a file; queries are a random sample of the passages themselves."""
+    from utils.embeddings import encode_texts
+    with open(path, 'r', encoding='utf-8') as f:
+        texts = [line.strip() for line in f if line.strip()]
+    embeddings = encode_texts(texts)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(texts), size=min(n_queries, len(texts)), replace=False)
+    return embeddings, embeddings[picks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', help='File with one passage per line (default: synthetic vectors)')
+    parser.add_argument('--n', type=int, default=20000, help='Synthetic corpus size')
+    parser.add_argument('--dim', type=int, default=384, help='Synthetic embedding dimension')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--types', nargs='+', default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument('--nlist', type=int)
+    parser.add_argument('--nprobe', type=int)
+    parser.add_argument('--ef-search', type=int)
+    args = parser.parse_args()
+
+    if args.texts:
+        corpus, queries = text_corpus(args.texts, args.queries)
+    else:
+        corpus, queries = synthetic_corpus(args.n, args.dim, args.queries)
+
+    results = benchmark_index_types(corpus, queries, k=args.k, index_types=args.types,
+                                    nlist=args.nlist, nprobe=args.nprobe, ef_search=args.ef_search)
+    print(f"corpus={corpus.shape[0]} dim={corpus.shape[1]} queries={len(queries)} k={args.k}")
+    print(f"{'type':<10} {'class':<22} {'build s':>9} {'ms/query':>9} {'bytes/vec':>10} {'recall@k':>9} {'loss':>7}")
+    for row in results:
+        print(f"{row['index_type']:<10} {row['index_class']:<22} {row['build_seconds']:>9.3f} "
+              f"{row['ms_per_query']:>9.4f} {row['bytes_per_vector']:>10.0f} "
+              f"{row['recall_at_k']:>9.3f} {1 - row['recall_at_k']:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
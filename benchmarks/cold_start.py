@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Cold-start profile: import time of the serving modules and time for a fresh process to
+answer its first questions.
+
+Each measurement runs in a new interpreter, so nothing is shared with this process:
+- `python -X importtime -c "import <module>"` for each module, reporting the total and
+  the slowest imports (cumulative, top --top)
+- a child that imports the pipeline, loads the prebuilt KB index and answers one
+  off-topic question (BFSI refusal) and one KB question, with the encoder warm-up
+  started first as in app.py (the KB question is ranked with BM25 while it loads). The
+  LLM is a stub that replies at once, so the numbers are PolicyPulse's own latency, not
+  the provider's.
+
+Build the KB artifact first (`python -m utils.knowledge_base`), or the first KB answer
+includes embedding the KB.
+
+Usage:
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --modules utils.pipeline server --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+FIRST_ANSWERS = r'''
+import json, sys, time
+started = time.perf_counter()
+marks = {}
+from utils.pipeline import PipelineSession, QueryPipeline
+from utils.embeddings import warm_up_in_background
+marks['import_pipeline'] = time.perf_counter()
+# As app.py does: the encoder loads in the background while the first questions are answered
+warm_up_in_background()
+from utils.knowledge_base import load_kb_index
+kb_index = load_kb_index()
+marks['load_kb_index'] = time.perf_counter()
+
+class StubLLM:
+    def chat(self, prompt, kb_passages=None):
+        return "Stub reply.", None
+
+pipeline = QueryPipeline(StubLLM(), kb_index)
+result = pipeline.run("What is the weather today?", PipelineSession())
+assert result['route'] == 'off_topic', result['route']
+marks['first_refusal'] = time.perf_counter()
+result = pipeline.run("What is the grace period for premium payment?", PipelineSession())
+assert result['route'] == 'kb', result['route']
+marks['first_kb_answer'] = time.perf_counter()
+print(json.dumps({name: (t - started) * 1000 for name, t in marks.items()}))
+'''
+
+
+def import_profile(module: str, top: int):
+    """Return (total ms, [(cumulative ms, module name), ...] slowest first) for importing `module`."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    total = next((ms for ms, name in rows if name.strip() == module), 0.0)
+    slowest = sorted(((ms, name.strip()) for ms, name in rows if name.strip() != module), reverse=True)
+    return total, slowest[:top]
+
+
+def first_answers() -> dict:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', FIRST_ANSWERS], cwd=ROOT, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1])
+    marks = json.loads(output.stdout.strip().splitlines()[-1])
+    marks['process_wall'] = wall_ms
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=['utils.pipeline', 'utils.llm_client', 'server'],
+                        help='Modules to profile')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list per module')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        total, slowest = import_profile(module, args.top)
+        print(f"import {module}: {total:.0f} ms")
+        for ms, name in slowest:
+            print(f"  {ms:>8.1f} ms  {name}")
+
+    marks = first_answers()
+    print("fresh process (ms since interpreter start of the script body):")
+    for name in ('import_pipeline', 'load_kb_index', 'first_refusal', 'first_kb_answer'):
+        print(f"  {name:<16} {marks[name]:>8.1f}")
+    print(f"  {'process_wall':<16} {marks['process_wall']:>8.1f}  (includes interpreter start and exit)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Query-embedding throughput and latency under concurrency, with and without micro-batching.
+
+Usage:
+    python -m benchmarks.concurrent_queries --threads 16 --queries 50
+    python -m benchmarks.concurrent_queries --windows 0 2 5 10
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.embeddings import EmbeddingBatcher, get_model
+
+
+def run(window_ms: float, threads: int, per_thread: int):
+    batcher = EmbeddingBatcher(window_ms=window_ms)
+    latencies = []
+    lock = threading.Lock()
+
+    def session(worker: int):
+        own = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            batcher.encode([f"what is the grace period for policy {worker}-{i}?"])
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=session, args=(w,)) for w in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    return elapsed, np.array(latencies) * 1000, batcher.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent sessions')
+    parser.add_argument('--queries', type=int, default=25, help='Queries per session')
+    parser.add_argument('--windows', type=float, nargs='+', default=[0, 5], help='Batch windows in ms (0 = inline)')
+    args = parser.parse_args()
+
+    get_model().encode(["warm up"], convert_to_numpy=True)
+    print(f"threads={args.threads} queries/thread={args.queries}")
+    print(f"{'window ms':>9} {'queries/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean batch':>11}")
+    for window in args.windows:
+        elapsed, latencies, stats = run(window, args.threads, args.queries)
+        print(f"{window:>9.1f} {len(latencies) / elapsed:>10.1f} {np.percentile(latencies, 50):>8.2f} "
+              f"{np.percentile(latencies, 95):>8.2f} {stats['mean_batch_size']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Throughput (sentences/sec) and cosine parity of the encoder backends against stock PyTorch.
+
+Usage:
+    python -m benchmarks.encoder_backends                        # built-in policy sentences
+    python -m benchmarks.encoder_backends --texts wordings.txt   # one passage per line
+    python -m benchmarks.encoder_backends --backends torch int8 --model ./models/minilm
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.embeddings import DEFAULT_MODEL_NAME, ENCODER_BACKENDS, backend_parity, backend_throughput
+
+SAMPLE_SENTENCES = [
+    "The grace period for premium payment is 30 days.",
+    "Nominee Name: Sumegha, Relationship: Spouse, Share: 100%",
+    "Sum Insured under the policy is Rs. 5,00,000 per policy year.",
+    "Claims must be intimated within 48 hours of hospitalisation.",
+    "Pre-existing diseases are covered after a waiting period of 36 months.",
+    "The policy may be renewed annually by paying the renewal premium before the due date.",
+    "Room rent is capped at 1% of the sum insured per day.",
+    "Cashless treatment is available at network hospitals only.",
+]
+
+
+def load_texts(path: str, limit: int):
+    if not path:
+        return (SAMPLE_SENTENCES * (limit // len(SAMPLE_SENTENCES) + 1))[:limit]
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', help='File with one passage per line (default: built-in sentences)')
+    parser.add_argument('--n', type=int, default=512, help='Number of sentences to encode')
+    parser.add_argument('--model', default=DEFAULT_MODEL_NAME, help='Model name or local path')
+    parser.add_argument('--backends', nargs='+', default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts, args.n)
+    print(f"model={args.model} sentences={len(texts)} batch_size={args.batch_size}")
+    print(f"{'backend':<8} {'sent/s':>10} {'speedup':>8} {'min cos':>8} {'mean cos':>9}")
+    baseline = None
+    for backend in args.backends:
+        try:
+            speed = backend_throughput(texts, backend, args.model, args.batch_size, args.repeats)
+            parity = backend_parity(texts, backend, args.model)
+        except ImportError as e:
+            print(f"{backend:<8} unavailable: {e}")
+            continue
+        baseline = baseline or (speed['sentences_per_second'] if backend == 'torch' else None)
+        speedup = speed['sentences_per_second'] / baseline if baseline else float('nan')
+        print(f"{backend:<8} {speed['sentences_per_second']:>10.1f} {speedup:>8.2f} "
+              f"{parity['min_cosine']:>8.4f} {parity['mean_cosine']:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Pages per second of sequential vs process-pool PDF text extraction.
+
+Usage:
+    python -m benchmarks.pdf_extraction policy_wording.pdf
+    python -m benchmarks.pdf_extraction policy_wording.pdf --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import pdf_processor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf', help='PDF file to extract')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, pdf_processor.PDF_WORKERS])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.pdf, 'rb') as f:
+        data = f.read()
+    print(f"{'workers':>7} {'pages':>6} {'best s':>8} {'pages/s':>9}")
+    for workers in args.workers:
+        # Start the pool outside the timed runs, as in a long-running app
+        list(pdf_processor.iter_pdf_pages(data, workers=workers))
+        best, pages = float('inf'), 0
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            pages = sum(1 for _ in pdf_processor.iter_pdf_pages(data, workers=workers))
+            best = min(best, time.perf_counter() - start)
+        print(f"{workers:>7} {pages:>6} {best:>8.3f} {pages / best:>9.1f}")
+    pdf_processor.shutdown_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+Async HTTP API for PolicyPulse (ASGI, built on Starlette), for clients other than the
+Streamlit page: the agent portal, IVR, scripts. Answers go through the same
+QueryPipeline as the UI; uploads go through the shared IngestionManager.
+
+Run with:
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    GET    /health                                   liveness and load
+    POST   /sessions                                 create a session -> {"session_id"}
+    GET    /sessions/{session_id}                    conversation, memories, documents
+    DELETE /sessions/{session_id}                    drop a session and its documents
+    POST   /sessions/{session_id}/documents          upload a PDF (raw body with ?name=, or multipart "file")
+    GET    /sessions/{session_id}/documents          indexing status of every upload
+    DELETE /sessions/{session_id}/documents/{doc_id} remove one document
+    POST   /sessions/{session_id}/chat               {"message", "doc_ids"?, "context_page"?, "stream"?}
+
+Pipeline runs happen on a bounded thread pool (POLICYPULSE_API_WORKERS). Requests
+beyond the pool plus POLICYPULSE_API_MAX_QUEUE waiting ones are refused with 503 and
+Retry-After; a request still unanswered after POLICYPULSE_API_TIMEOUT seconds gets 504.
+A session answers one message at a time, so its conversation stays in order.
+
+"stream": true only selects the LLM's streaming endpoint, like the UI's streaming toggle;
+the HTTP response is still one JSON body, because the response safety check needs the
+whole reply before any of it can be sent.
+
+A chat response returns after one LLM call. When its rationale is still being generated
+(together with the memory summary), the response has "rationale_pending": true and the
+rationale appears on the message in GET /sessions/{session_id} once ready. "kb_ranker" is
+"vector" or "bm25" for knowledge-base answers (BM25 while the encoder is still loading).
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from utils.corpus import SessionCorpus
+from utils.ingestion import IngestionManager, ingestion_manager
+from utils.pipeline import PipelineSession, QueryPipeline
+
+API_WORKERS = int(os.getenv('POLICYPULSE_API_WORKERS', '8'))
+API_MAX_QUEUE = int(os.getenv('POLICYPULSE_API_MAX_QUEUE', '32'))
+API_TIMEOUT = float(os.getenv('POLICYPULSE_API_TIMEOUT', '60'))
+API_SESSION_TTL = float(os.getenv('POLICYPULSE_API_SESSION_TTL', '3600'))
+API_MAX_UPLOAD_MB = float(os.getenv('POLICYPULSE_API_MAX_UPLOAD_MB', '50'))
+
+
+class Overloaded(Exception):
+    """Raised when the worker pool and its wait queue are both full."""
+
+
+class ApiSession:
+    """One API client conversation: pipeline state, its own corpus and upload jobs."""
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.state = PipelineSession(corpus=SessionCorpus())
+        self.jobs: Dict[str, str] = {}
+        # Held by the worker thread for a whole pipeline run (also past a timeout)
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+
+
+class ChatService:
+    """
+    Sessions plus admission control for pipeline runs.
+
+    `run(fn)` executes blocking work on the worker pool: at most `workers` run at once
+    and at most `max_queue` more wait; beyond that Overloaded is raised at once. A run
+    that exceeds `timeout` raises asyncio.TimeoutError for the caller, but keeps its pool
+    slot until the thread finishes, so abandoned work still counts against the limit.
+    """
+
+    def __init__(self, pipeline: Optional[QueryPipeline] = None, ingestion: Optional[IngestionManager] = None,
+                 workers: int = API_WORKERS, max_queue: int = API_MAX_QUEUE, timeout: float = API_TIMEOUT,
+                 session_ttl: float = API_SESSION_TTL):
+        self.pipeline = pipeline
+        self.ingestion = ingestion or ingestion_manager
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.session_ttl = session_ttl
+        self.sessions: Dict[str, ApiSession] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self._admitted = 0
+
+    @property
+    def load(self) -> dict:
+        return {'admitted': self._admitted, 'workers': self.workers, 'max_queue': self.max_queue}
+
+    async def run(self, fn, *args):
+        # Only touched from the event loop thread, so the counter needs no lock
+        if self._admitted >= self.workers + self.max_queue:
+            raise Overloaded()
+        self._admitted += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def _release(self, _future) -> None:
+        self._admitted -= 1
+
+    def create_session(self) -> ApiSession:
+        self._prune(time.time())
+        session = ApiSession(uuid.uuid4().hex)
+        self.sessions[session.id] = session
+        return session
+
+    def get_session(self, session_id: str) -> Optional[ApiSession]:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.time()
+        return session
+
+    def drop_session(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        for job_id in session.jobs.values():
+            self.ingestion.forget(job_id)
+        return True
+
+    def _prune(self, now: float) -> None:
+        for session_id in [s.id for s in self.sessions.values() if now - s.last_used > self.session_ttl]:
+            self.drop_session(session_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _error(status: int, message: str, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse({'error': message}, status_code=status, headers=headers)
+
+
+def _service(request: Request) -> ChatService:
+    return request.app.state.service
+
+
+def _documents(service: ChatService, session: ApiSession) -> list:
+    corpus = session.state.corpus
+    documents = []
+    for doc_id, job_id in session.jobs.items():
+        status = service.ingestion.status(job_id) or {}
+        documents.append({
+            'doc_id': doc_id,
+            'name': status.get('name') or corpus.document_names().get(doc_id),
+            'job_id': job_id,
+            'status': status.get('status'),
+            'pages_done': status.get('pages_done'),
+            'page_count': status.get('page_count'),
+            'error': status.get('error'),
+            'complete': corpus.is_complete(doc_id),
+        })
+    return documents
+
+
+async def health(request: Request) -> JSONResponse:
+    service = _service(request)
+    return JSONResponse({'status': 'ok', 'sessions': len(service.sessions), **service.load})
+
+
+async def create_session(request: Request) -> JSONResponse:
+    session = _service(request).create_session()
+    return JSONResponse({'session_id': session.id}, status_code=201)
+
+
+async def get_session(request: Request) -> JSONResponse:
+    service = _service(request)
+    session = service.get_session(request.path_params['session_id'])
+    if session is None:
+        return _error(404, "Unknown session")
+    return JSONResponse({
+        'session_id': session.id,
+        'conversation': session.state.conversation,
+        'memories': session.state.memories,
+        'documents': _documents(service, session),
+    })
+
+
+async def delete_session(request: Request) -> JSONResponse:
+    if not _service(request).drop_session(request.path_params['session_id']):
+        return _error(404, "Unknown session")
+    return JSONResponse({'deleted': True})
+
+
+async def upload_document(request: Request) -> JSONResponse:
+    service = _service(request)
+    session = service.get_session(request.path_params['session_id'])
+    if session is None:
+        return _error(404, "Unknown session")
+    max_bytes = int(API_MAX_UPLOAD_MB * 1024 * 1024)
+    if int(request.headers.get('content-length') or 0) > max_bytes:
+        return _error(413, f"Upload larger than {API_MAX_UPLOAD_MB:g} MB")
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('file')
+        if upload is None or not hasattr(upload, 'read'):
+            return _error(400, "Multipart upload needs a 'file' field")
+        pdf_bytes, name = await upload.read(), upload.filename or 'document.pdf'
+    else:
+        pdf_bytes, name = await request.body(), request.query_params.get('name', 'document.pdf')
+    if not pdf_bytes:
+        return _error(400, "Empty upload")
+    if len(pdf_bytes) > max_bytes:
+        return _error(413, f"Upload larger than {API_MAX_UPLOAD_MB:g} MB")
+    job_id = service.ingestion.submit(pdf_bytes, name, session.state.corpus)
+    doc_id = service.ingestion.status(job_id)['doc_id']
+    session.jobs[doc_id] = job_id
+    return JSONResponse({'doc_id': doc_id, 'job_id': job_id, 'name': name}, status_code=202)
+
+
+async def list_documents(request: Request) -> JSONResponse:
+    service = _service(request)
+    session = service.get_session(request.path_params['session_id'])
+    if session is None:
+        return _error(404, "Unknown session")
+    return JSONResponse({'documents': _documents(service, session)})
+
+
+async def delete_document(request: Request) -> JSONResponse:
+    service = _service(request)
+    session = service.get_session(request.path_params['session_id'])
+    if session is None:
+        return _error(404, "Unknown session")
+    doc_id = request.path_params['doc_id']
+    job_id = session.jobs.pop(doc_id, None)
+    if job_id is None:
+        return _error(404, "Unknown document")
+    service.ingestion.forget(job_id)
+    session.state.corpus.remove_document(doc_id)
+    return JSONResponse({'deleted': True})
+
+
+async def chat(request: Request) -> JSONResponse:
+    service = _service(request)
+    session = service.get_session(request.path_params['session_id'])
+    if session is None:
+        return _error(404, "Unknown session")
+    try:
+        body = await request.json()
+    except ValueError:
+        return _error(400, "Body must be JSON")
+    message = body.get('message') if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return _error(400, "'message' must be a non-empty string")
+    corpus = session.state.corpus
+    doc_ids = body.get('doc_ids')
+    if doc_ids is None:
+        # Every upload with at least one indexed page, like the UI's default selection
+        doc_ids = list(corpus.document_names())
+    elif not isinstance(doc_ids, list) or any(doc_id not in session.jobs for doc_id in doc_ids):
+        return _error(400, "'doc_ids' must list documents uploaded to this session")
+
+    def answer() -> Optional[dict]:
+        with session.lock:
+            state = session.state
+            state.doc_ids = doc_ids
+            state.context_page = body.get('context_page', state.context_page)
+            # Streaming endpoint only; the reply is checked whole before it is returned
+            state.stream = bool(body.get('stream', False))
+            return service.pipeline.run(message, state)
+
+    try:
+        result = await service.run(answer)
+    except Overloaded:
+        return _error(503, "Server busy, retry shortly", headers={'Retry-After': '1'})
+    except asyncio.TimeoutError:
+        return _error(504, f"No answer within {service.timeout:g}s")
+    return JSONResponse({
+        'session_id': session.id,
+        'reply': result['reply'],
+        'rationale': result['rationale'],
+        'rationale_pending': result['rationale_pending'],
+        'route': result['route'],
+        'kb_ranker': result['kb_ranker'],
+        'notices': [{'level': level, 'message': text} for level, text in result['notices']],
+        'safety': session.state.last_safety_check,
+        'timings_ms': {stage: round(seconds * 1000, 2) for stage, seconds in result['timings'].items()},
+    })
+
+
+def create_app(service: Optional[ChatService] = None) -> Starlette:
+    """
+    Build the ASGI app. Without a service, one is created at startup with the KB index
+    and an LLMClient configured from the environment.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        if service is None:
+            from dotenv import load_dotenv
+            from utils.knowledge_base import load_kb_index
+            from utils.llm_client import LLMClient
+            load_dotenv()
+            kb_index = await asyncio.to_thread(load_kb_index)
+            pipeline = QueryPipeline(LLMClient(api_key=os.getenv('HF_API_KEY')), kb_index, defer_follow_up=True)
+            app.state.service = ChatService(pipeline)
+        else:
+            app.state.service = service
+        yield
+        app.state.service.shutdown()
+
+    routes = [
+        Route('/health', health, methods=['GET']),
+        Route('/sessions', create_session, methods=['POST']),
+        Route('/sessions/{session_id}', get_session, methods=['GET']),
+        Route('/sessions/{session_id}', delete_session, methods=['DELETE']),
+        Route('/sessions/{session_id}/documents', upload_document, methods=['POST']),
+        Route('/sessions/{session_id}/documents', list_documents, methods=['GET']),
+        Route('/sessions/{session_id}/documents/{doc_id}', delete_document, methods=['DELETE']),
+        Route('/sessions/{session_id}/chat', chat, methods=['POST']),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
@@ -0,0 +1,90 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import re
+import zlib
+import numpy as np
+import pytest
+
+
+class FakeSentenceTransformer:
+    """Deterministic bag-of-words encoder standing in for SentenceTransformer in tests."""
+    dim = 64
+    instances = 0
+
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+        self.encode_calls = 0
+        FakeSentenceTransformer.instances += 1
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        self.encode_calls += 1
+        out = np.zeros((len(texts), self.dim), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                out[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+            norm = np.linalg.norm(out[row])
+            if norm:
+                out[row] /= norm
+        return out
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Patch the embedding registry to use FakeSentenceTransformer."""
+    from utils import embeddings
+    monkeypatch.setattr(embeddings, 'SentenceTransformer', FakeSentenceTransformer)
+    embeddings.clear_models()
+    FakeSentenceTransformer.instances = 0
+    yield FakeSentenceTransformer
+    embeddings.clear_models()
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages, tables=None):
+    """
+    Minimal single-font PDF with one text line per list item on each page (for pdfplumber tests).
+    `tables` maps a 0-based page index to table rows, drawn as a ruled grid below the text.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_index, lines in enumerate(pages):
+        ops = ["BT", "/F1 11 Tf", "14 TL", "50 780 Td"]
+        for line in lines:
+            ops.append(f"({_escape(line)}) Tj T*")
+        ops.append("ET")
+        rows = (tables or {}).get(page_index, [])
+        top, row_height, col_width = 760 - 14 * len(lines), 20, 100
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                x, y = 50 + c * col_width, top - (r + 1) * row_height
+                ops.append(f"{x} {y} {col_width} {row_height} re S")
+                ops.append(f"BT /F1 9 Tf {x + 4} {y + 6} Td ({_escape(cell)}) Tj ET")
+        stream = "\n".join(ops)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+@pytest.fixture
+def make_pdf():
+    """Factory fixture: make_pdf([[line, ...], ...], tables={page: rows}) -> PDF bytes, one inner list per page."""
+    return build_pdf
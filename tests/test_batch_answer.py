@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import json
+import pytest
+from batch_answer import BatchRunner, read_answers, read_questions
+from utils.document_cache import DocumentCache
+from utils.knowledge_base import KB_DOCS
+from utils.pipeline import QueryPipeline
+from utils.vector_store import build_index
+
+class EchoLLM:
+    def __init__(self):
+        self.summarised = []
+
+    def chat(self, prompt, kb_passages=None):
+        if prompt.lstrip().startswith("Extract the most important factual information"):
+            self.summarised.append(prompt.split('User: "', 1)[1].split('"', 1)[0])
+            return "The user asked about " + prompt.split('User: "', 1)[1].split('"', 1)[0], None
+        return "Answer to: " + prompt.rsplit("User: ", 1)[1].split("\n", 1)[0], None
+
+    def reply(self, prompt):
+        return self.chat(prompt)[0], "hf"
+
+    async def arationale(self, reply, kb_passages=None, provider="hf"):
+        return "Rationale for: " + reply
+
+def _write(path, items):
+    path.write_text("".join(json.dumps(item) + "\n" for item in items))
+    return str(path)
+
+@pytest.fixture
+def runner(fake_model, tmp_path):
+    pipeline = QueryPipeline(EchoLLM(), build_index(KB_DOCS), defer_follow_up=True)
+    runner = BatchRunner(pipeline, concurrency=3, cache=DocumentCache(cache_dir=str(tmp_path / "cache")))
+    yield runner
+    runner.close()
+
+def test_read_questions_accepts_backlog_format(tmp_path):
+    path = _write(tmp_path / "q.jsonl", [{"request_id": "r-1", "title": "t", "body": "premium due?"},
+                                         {"question": "claim status?", "session": 7}])
+    assert list(read_questions(path)) == [
+        {"id": "r-1", "question": "premium due?", "pdf": None, "session": None},
+        {"id": "line-2", "question": "claim status?", "pdf": None, "session": "7"},
+    ]
+
+def test_pdf_is_ingested_once_and_sessions_keep_order(runner, make_pdf, tmp_path, monkeypatch):
+    pdf = tmp_path / "schedule.pdf"
+    pdf.write_bytes(make_pdf([["POLICY SCHEDULE", "Policy No. : 2293112006084450", "Premium: 12,400"]]))
+    ingests = []
+    original = BatchRunner._ingest
+    monkeypatch.setattr(BatchRunner, "_ingest", lambda self, path: ingests.append(path) or original(self, path))
+    items = [{"id": f"q{i}", "question": f"Is the premium for policy {i} refundable?", "pdf": str(pdf), "session": "s"}
+             for i in range(6)]
+    items += [{"id": "kb", "question": "What is the grace period for premium?", "pdf": None, "session": None},
+              {"id": "bad", "question": "", "pdf": None, "session": None}]
+    output = io.StringIO()
+    stats = runner.run(items, output)
+    assert ingests == [str(pdf)]
+    assert (stats["answered"], stats["failed"]) == (7, 1)
+    records = {r["id"]: r for r in map(json.loads, output.getvalue().splitlines())}
+    assert records["bad"]["error"] == "ValueError: Empty question"
+    assert records["kb"]["route"] == "kb" and records["kb"]["kb_ranker"] == "vector" and "session" in records["kb"] and "memories" not in records["kb"]
+    # A sessionless question gets its rationale but no memory-summary call
+    assert records["kb"]["rationale"] == "Rationale for: " + records["kb"]["reply"]
+    assert sorted(runner.pipeline.llm.summarised) == sorted(item["question"] for item in items[:6])
+    assert records["q0"]["route"] == "document" and "document" in records["q0"]["timings_ms"]
+    assert records["q0"]["rationale"] == "Rationale for: " + records["q0"]["reply"]
+    assert "follow_up" in records["q0"]["timings_ms"]
+    assert records["q5"]["memories"] == [f"The user asked about Is the premium for policy {i} refundable?" for i in range(6)]
+    conversation = runner._sessions["s"].conversation
+    assert [m["content"] for m in conversation[::2]] == [item["question"] for item in items[:6]]
+
+def test_resume_skips_answered_and_restores_session(runner, tmp_path):
+    items = [{"id": f"q{i}", "question": f"Is claim {i} settled?", "session": "s"} for i in range(3)]
+    out = tmp_path / "answers.jsonl"
+    with open(out, "w") as output:
+        runner.run([dict(item, pdf=None) for item in items[:2]], output)
+    with open(out, "a") as output:
+        output.write('{"id": "q2", "trunc')
+    done, sessions = read_answers(str(out))
+    assert done == {"q0", "q1"} and len(sessions["s"]) == 2
+
+    pipeline = runner.pipeline
+    resumed = BatchRunner(pipeline, concurrency=2)
+    resumed.restore_session("s", sessions["s"])
+    output = io.StringIO()
+    stats = resumed.run([dict(item, pdf=None) for item in items], output, skip=done)
+    resumed.close()
+    assert (stats["answered"], stats["skipped"]) == (1, 2)
+    record = json.loads(output.getvalue())
+    assert record["id"] == "q2" and len(record["memories"]) == 3
+    assert len(resumed._sessions["s"].conversation) == 6
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.corpus import SessionCorpus
+from utils.document_index import DocumentIndex
+from utils.vector_store import build_index
+
+PROPOSAL = ["PROPOSAL FORM", "Proposer Name: Ravi Kumar", "Nominee: Sumegha (Spouse)"]
+SCHEDULE = ["POLICY SCHEDULE", "Policy No. : 2293112006084450", "Sum Insured: 5,00,000", "Nominee: Anil (Son)"]
+
+def _corpus():
+    corpus = SessionCorpus()
+    corpus.add_document("proposal", "proposal.pdf", PROPOSAL, pages=[1, 1, 2])
+    corpus.add_document("schedule", "schedule.pdf", SCHEDULE)
+    return corpus
+
+def test_single_index_holds_all_documents(fake_model):
+    corpus = _corpus()
+    assert len(corpus) == 2
+    assert corpus.index.index.ntotal == len(PROPOSAL) + len(SCHEDULE)
+    assert corpus.chunks() == PROPOSAL + SCHEDULE
+    assert corpus.chunks(["schedule"]) == SCHEDULE
+
+def test_search_filters_by_document(fake_model):
+    corpus = _corpus()
+    lines, found = corpus.search("who is the nominee", k=1, window=0, doc_ids=["schedule"])
+    assert found and lines == ["Nominee: Anil (Son)"]
+    lines, _ = corpus.search("who is the nominee", k=2, window=0, with_sources=True)
+    assert sorted(lines) == ["[proposal.pdf p.2] Nominee: Sumegha (Spouse)", "[schedule.pdf p.1] Nominee: Anil (Son)"]
+    assert corpus.search("nominee", doc_ids=[]) == ([], False)
+
+def test_windows_do_not_cross_documents(fake_model):
+    corpus = _corpus()
+    lines, _ = corpus.search("nominee sumegha spouse", k=1, window=1, doc_ids=["proposal"])
+    assert lines == PROPOSAL[1:]
+
+def test_remove_document_and_add_record(fake_model):
+    corpus = _corpus()
+    corpus.remove_document("proposal")
+    assert corpus.chunks() == SCHEDULE
+    lines, _ = corpus.search("proposer name", k=1, window=0)
+    assert "Proposer Name: Ravi Kumar" not in lines
+    record = {"key": "proposal-v2", "chunks": PROPOSAL, "pages": [1, 1, 1], "index": build_index(PROPOSAL)}
+    corpus.add_record(record, "proposal.pdf")
+    assert corpus.chunks(["proposal-v2"]) == PROPOSAL
+    assert corpus.document_names() == {"schedule": "schedule.pdf", "proposal-v2": "proposal.pdf"}
+
+def test_compressed_corpus_reports_memory(fake_model):
+    corpus = SessionCorpus(index_type="sq8")
+    corpus.add_document("schedule", "schedule.pdf", SCHEDULE)
+    report = corpus.memory_report()
+    assert report["index_class"] == "IndexScalarQuantizer"
+    assert report["index_type"] == report["requested_type"] == "sq8"
+    assert report["vectors"] == len(SCHEDULE)
+    assert report["vector_bytes"] == len(SCHEDULE) * (64 + 8)
+    lines, _ = corpus.search("sum insured", k=1, window=0)
+    assert lines == ["Sum Insured: 5,00,000"]
+
+def test_memory_report_shows_the_storage_in_use(fake_model, caplog):
+    corpus = SessionCorpus(index_type="pq")
+    corpus.extend_document("schedule", "schedule.pdf", SCHEDULE)
+    report = corpus.memory_report()
+    # Staged until the document is complete, and kept float32 while too few lines to train PQ
+    assert (report["index_type"], report["requested_type"], report["index_class"]) == ("flat", "pq", "IndexFlatL2")
+    corpus.mark_complete("schedule")
+    assert corpus.memory_report()["index_type"] == "flat"
+    with caplog.at_level("WARNING", logger="utils.index_factory"):
+        fallback = DocumentIndex.from_documents(SCHEDULE, index_type="pq")
+    assert "too few to train pq; using sq8" in caplog.text
+    assert fallback.storage_type == "sq8" and fallback.index_type == "pq"
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+from utils import document_cache as dc
+from utils.vector_store import build_index, search_document_chunks
+
+LINES = ["Policy No. : 2293112006084450", "Nominee Name: Sumegha", "Sum Insured: 500000"]
+
+def _record(pdf_bytes):
+    return dc.document_key(pdf_bytes), {'chunks': list(LINES), 'pages': [1, 1, 2], 'index': build_index(LINES)}
+
+def test_repeat_upload_is_served_from_memory(fake_model, tmp_path):
+    cache = dc.DocumentCache(cache_dir=str(tmp_path))
+    key, record = _record(b"%PDF-1 same bytes")
+    assert cache.get(key) is None
+    cache.put(key, record)
+    cached = cache.get(key)
+    assert cached["chunks"] == LINES and cached["key"] == key
+    assert cached["index"] is record["index"]
+
+def test_disk_tier_survives_new_process(fake_model, tmp_path):
+    key, record = _record(b"%PDF-1 doc")
+    dc.DocumentCache(cache_dir=str(tmp_path)).put(key, record)
+    cached = dc.DocumentCache(cache_dir=str(tmp_path)).get(key)
+    assert cached["pages"] == [1, 1, 2] and cached["key"] == dc.document_key(b"%PDF-1 doc")
+    relevant, found = search_document_chunks(cached["index"], cached["chunks"], "nominee name", k=1, similarity_threshold=0.0)
+    assert found and relevant == ["Nominee Name: Sumegha"]
+
+def test_different_bytes_are_cached_separately(fake_model, tmp_path):
+    cache = dc.DocumentCache(cache_dir=str(tmp_path))
+    cache.put(*_record(b"%PDF-1 a"))
+    assert cache.get(dc.document_key(b"%PDF-1 b")) is None
+    assert dc.document_key(b"%PDF-1 a") != dc.document_key(b"%PDF-1 b")
+
+def test_eviction_by_age_and_size(fake_model, tmp_path):
+    cache = dc.DocumentCache(cache_dir=str(tmp_path), max_age_seconds=60)
+    old_key, record = _record(b"%PDF-1 old")
+    cache.put(old_key, record)
+    stale = time.time() - 120
+    os.utime(tmp_path / old_key, (stale, stale))
+    cache._memory.clear()
+    assert cache.get(old_key) is None
+    assert not (tmp_path / old_key).exists()
+
+    small = dc.DocumentCache(cache_dir=str(tmp_path / "small"), max_bytes=1)
+    small.put(*_record(b"%PDF-1 big"))
+    assert os.listdir(tmp_path / "small") == []
+
+def test_memory_tier_is_bounded_by_bytes(fake_model, tmp_path):
+    key, record = _record(b"%PDF-1 first")
+    size = dc.record_bytes(record)
+    assert size >= 3 * 64 * 4  # three float32 vectors of the fake encoder, plus the text
+    cache = dc.DocumentCache(cache_dir=str(tmp_path), max_memory_bytes=int(size * 1.5))
+    cache.put(key, record)
+    cache.put(*_record(b"%PDF-1 second"))
+    # Only the newest record fits; the older one is evicted from memory but still on disk
+    assert cache.memory_stats() == {'entries': 1, 'bytes': size}
+    assert key not in cache._memory and cache.get(key) is not None
+    tiny = dc.DocumentCache(cache_dir=str(tmp_path / "tiny"), max_memory_bytes=size - 1)
+    tiny.put(key, record)
+    assert tiny.memory_stats() == {'entries': 0, 'bytes': 0} and tiny.get(key) is not None
+
+def test_mmapped_index_is_not_counted_as_resident(fake_model, tmp_path):
+    key, record = _record(b"%PDF-1 mapped")
+    dc.DocumentCache(cache_dir=str(tmp_path)).put(key, record)
+    cache = dc.DocumentCache(cache_dir=str(tmp_path))
+    loaded = cache.get(key)
+    text_only = dc.record_bytes(loaded, index_resident=False)
+    assert text_only < dc.record_bytes(loaded)
+    assert cache.memory_stats() == {'entries': 1, 'bytes': text_only}
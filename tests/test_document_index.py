@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from utils import embeddings
+from utils.document_index import DocumentIndex
+from utils.vector_store import build_index
+
+KB = [
+    "The grace period for premium payment is 30 days.",
+    "You can file a claim via our mobile app.",
+]
+
+def _encoded_texts(monkeypatch):
+    seen = []
+    original = embeddings.encode_texts
+    def spy(texts, model_name=embeddings.DEFAULT_MODEL_NAME):
+        seen.extend(texts)
+        return original(texts, model_name)
+    monkeypatch.setattr("utils.document_index.encode_texts", spy)
+    return seen
+
+def test_add_embeds_only_new_text(fake_model, monkeypatch):
+    seen = _encoded_texts(monkeypatch)
+    index = DocumentIndex.from_documents(KB)
+    ids = index.add([KB[0], "Policies renew every year."])
+    assert seen == KB + ["Policies renew every year."]
+    assert ids == [2, 3]
+    assert len(index) == 4 and index.index.ntotal == 4
+
+def test_remove_keeps_other_ids_stable(fake_model):
+    index = DocumentIndex.from_documents(KB + ["Home insurance covers floods."])
+    assert index.remove([0, 99]) == 1
+    assert index.ids() == [1, 2]
+    hits = index.search("home insurance floods", k=1)
+    assert hits[0][:2] == (2, "Home insurance covers floods.")
+    assert all(doc_id != 0 for doc_id, _, _ in index.search("grace period premium", k=3))
+
+def test_update_reembeds_single_chunk(fake_model, monkeypatch):
+    index = DocumentIndex.from_documents(KB)
+    seen = _encoded_texts(monkeypatch)
+    index.update(0, "The grace period is 15 days for monthly premiums.")
+    index.update(1, KB[1])  # unchanged text: no encode
+    assert seen == ["The grace period is 15 days for monthly premiums."]
+    assert index.get(0).startswith("The grace period is 15 days")
+    assert index.search("grace period monthly premiums", k=1)[0][0] == 0
+    with pytest.raises(KeyError):
+        index.update(42, "missing")
+
+def test_from_index_reuses_vectors(fake_model, monkeypatch):
+    flat = build_index(KB)
+    seen = _encoded_texts(monkeypatch)
+    index = DocumentIndex.from_index(KB, flat)
+    assert seen == []
+    assert index.search("file a claim", k=1)[0][1] == KB[1]
+
+@pytest.mark.parametrize("index_type,max_bytes", [("flat", 64 * 4 + 8), ("sq8", 64 + 8)])
+def test_compressed_storage_supports_edits(fake_model, index_type, max_bytes):
+    index = DocumentIndex.from_documents(KB + ["Home insurance covers floods."], index_type=index_type)
+    assert index.bytes_per_vector() == max_bytes
+    index.remove([1])
+    index.update(0, "The grace period is 15 days.")
+    assert index.search("home insurance floods", k=1)[0][1] == "Home insurance covers floods."
+
+def test_pq_falls_back_to_sq8_for_small_corpora(fake_model):
+    index = DocumentIndex.from_documents(KB, index_type="pq")
+    assert index.bytes_per_vector() == 64 + 8
+    with pytest.raises(ValueError):
+        DocumentIndex(index_type="hnsw")
@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import datetime
+import pytest
+from utils.corpus import SessionCorpus
+from utils.document_cache import DocumentCache
+from utils.field_extractor import answer_field_question, extract_fields, match_field_question
+from utils.ingestion import PageIngestor
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', 'sample Document', 'POLICY_DOCUMENTpdf.pdf')
+
+SCHEDULE = [
+    "POLICY SCHEDULE",
+    "Policy No. : 2293112006084450 Customer Code: CUST-8812",
+    "Premium payment grace period is 30 days",
+    "Total Premium (incl. GST): Rs. 12,345.50",
+    "Sum Insured",
+    "5,00,000",
+    "Nominee Details",
+    "Nominee Name: Sumegha (Spouse)",
+    "GSTIN: 27AAACR5055K1Z7",
+    "Date of Inception: 12-Mar-2023 00:00 hrs",
+    "Email ID: Ravi.K@Example.com Mobile No. 98765 43210",
+]
+PAGES = [1] * 6 + [2] * 5
+
+def test_extracts_typed_values_with_source_lines():
+    fields = extract_fields(SCHEDULE, PAGES)
+    assert fields["policy_number"]["value"] == "2293112006084450"
+    assert fields["customer_code"]["value"] == "CUST-8812"
+    assert fields["premium"]["value"] == 12345.5
+    assert fields["sum_insured"]["value"] == 500000 and fields["sum_insured"]["line"] == "5,00,000"
+    assert fields["nominee"]["value"] == "Sumegha (Spouse)" and fields["nominee"]["page"] == 2
+    assert fields["gstin"]["value"] == "27AAACR5055K1Z7"
+    assert fields["date_of_inception"]["value"] == datetime.date(2023, 3, 12)
+    assert fields["email"]["value"] == "ravi.k@example.com" and fields["mobile"]["value"] == "9876543210"
+    assert fields["policy_number"]["position"] == 1
+
+@pytest.mark.parametrize("query,expected", [
+    ("What is my policy number?", ["policy_number"]),
+    ("who is the nominee", ["nominee"]),
+    ("policy number and sum insured", ["policy_number", "sum_insured"]),
+    ("Can I change my nominee?", []),
+    ("What is the premium grace period?", []),
+    ("How do I file a claim?", []),
+])
+def test_only_direct_field_questions_match(query, expected):
+    assert match_field_question(query) == expected
+
+def test_answers_from_corpus_fields_without_llm(fake_model):
+    corpus = SessionCorpus()
+    corpus.add_document("schedule", "schedule.pdf", SCHEDULE, pages=PAGES)
+    corpus.add_document("renewal", "renewal.pdf", ["Policy No. : 2293112006099999"])
+    reply, rationale = answer_field_question("What is the sum insured?", corpus.document_fields())
+    assert reply == "**Sum Insured**: ₹5,00,000"
+    assert 'schedule.pdf p.1: "5,00,000"' in rationale
+    reply, _ = answer_field_question("policy number?", corpus.document_fields())
+    assert reply == ("**Policy Number** (schedule.pdf): 2293112006084450\n\n"
+                     "**Policy Number** (renewal.pdf): 2293112006099999")
+    assert answer_field_question("What is my gstin?", corpus.document_fields(["renewal"])) is None
+    corpus.remove_document("schedule")
+    assert "schedule" not in corpus.fields
+
+def test_values_stop_at_any_label_and_ambiguous_values_are_not_answered():
+    fields = extract_fields([
+        "Policy No. : 2293112006084450 Previous Policy No : 11250215490605",
+        "Customer Name : DHARMARAJ N WAGANNAVAR SAC Code : 997133 / Accident and Health",
+        "CIN : L66010TN2005PLC056649 Email :support@starhealth.in Website :www.starhealth.in",
+        "E-mail Id : customer@gmail.com",
+    ])
+    assert fields["policy_number"]["value"] == "2293112006084450"
+    # Where the name ends and "SAC Code" begins is a guess: no value rather than a wrong one
+    assert "customer_name" not in fields
+    assert fields["email"]["value"] == "support@starhealth.in" and fields["email"]["ambiguous"]
+    assert answer_field_question("What is my email?", [("doc.pdf", fields)]) is None
+
+def test_insurer_gstin_is_not_the_policyholders(fake_model):
+    header = "Customer Code : BP0054831374 GSTIN : 27AAJCS4517L1ZY"
+    assert "gstin" not in extract_fields([header])
+    # The proposer's own GSTIN wins over a bare one elsewhere
+    fields = extract_fields(["GSTIN : 27AAJCS4517L1ZY", "Proposer GSTIN: 27AAACR5055K1Z7"])
+    assert fields["gstin"]["value"] == "27AAACR5055K1Z7"
+    # "Proposer GSTIN : NO" on page 2 keeps the insurer's invoice GSTIN on page 4 from answering
+    corpus = SessionCorpus()
+    corpus.extend_document("policy", "policy.pdf", [header, "Proposer GSTIN : NO Place of Supply : Maharashtra"], [2, 2])
+    corpus.extend_document("policy", "policy.pdf", ["GSTIN : GSTIN : 27AAJCS4517L1ZY"], [4])
+    assert corpus.fields["policy"]["gstin"]["value"] is None
+    assert answer_field_question("What is my GSTIN?", corpus.document_fields()) is None
+
+def test_sample_policy_document_gives_no_wrong_direct_answers(fake_model, tmp_path):
+    corpus = SessionCorpus()
+    with open(SAMPLE_PDF, "rb") as f:
+        ingestor = PageIngestor(f.read(), "policy.pdf", corpus, cache=DocumentCache(cache_dir=str(tmp_path)))
+    list(ingestor.run())
+    documents = corpus.document_fields()
+    # The email has several values (customer, branch, helpdesk): left to the LLM
+    assert answer_field_question("What is my email?", documents) is None
+    # Names and category come from the label/value grid, not the run-on text lines
+    assert answer_field_question("What is the customer name?", documents)[0] == "**Customer Name**: DHARMARAJ N WAGANNAVAR"
+    assert answer_field_question("Who is the proposer?", documents)[0] == "**Proposer**: DHARMARAJ NEMCHANDRA WAGANNAWAR"
+    assert answer_field_question("What is my policy category?", documents)[0] == "**Policy Category**: Sixth Year"
+    assert answer_field_question("What is my policy number?", documents)[0] == "**Policy Number**: 2293112006084450"
+    assert answer_field_question("What is my mobile number?", documents)[0] == "**Mobile**: 9869725043"
+    assert answer_field_question("What is the premium?", documents)[0] == "**Premium**: ₹20,147"
+    # The only GSTIN values belong to the insurer; the proposer's is stated as "NO"
+    assert answer_field_question("What is my GSTIN?", documents) is None
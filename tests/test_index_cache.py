@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from utils import embeddings
+from utils.index_cache import corpus_fingerprint, load_or_build_index, load_or_build_embeddings
+from utils.vector_store import query_index
+
+KB = [
+    "The grace period for premium payment is 30 days.",
+    "You can file a claim via our mobile app.",
+]
+
+def test_fingerprint_changes_with_text_and_model():
+    base = corpus_fingerprint(KB, "model-a")
+    assert base == corpus_fingerprint(list(KB), "model-a")
+    assert base != corpus_fingerprint(KB, "model-b")
+    assert base != corpus_fingerprint(KB + ["new fact"], "model-a")
+
+def test_index_is_reused_from_disk(fake_model, tmp_path):
+    index = load_or_build_index(KB, cache_dir=str(tmp_path))
+    calls_after_build = embeddings.get_model().encode_calls
+    reloaded = load_or_build_index(KB, cache_dir=str(tmp_path))
+    assert embeddings.get_model().encode_calls == calls_after_build
+    assert reloaded.ntotal == index.ntotal == len(KB)
+    assert query_index(reloaded, KB, "grace period", k=1) == [KB[0]]
+
+def test_kb_change_rebuilds_and_drops_stale_artifacts(fake_model, tmp_path):
+    load_or_build_index(KB, cache_dir=str(tmp_path))
+    load_or_build_index(KB + ["Policies renew yearly."], cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2  # one .faiss + one .npy
+
+def test_embeddings_are_memory_mapped(fake_model, tmp_path):
+    load_or_build_index(KB, cache_dir=str(tmp_path))
+    emb = load_or_build_embeddings(KB, cache_dir=str(tmp_path))
+    assert isinstance(emb, np.memmap)
+    assert emb.shape == (len(KB), fake_model.dim)
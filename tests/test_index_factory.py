@@ -0,0 +1,55 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import faiss
+import numpy as np
+import pytest
+from utils.index_factory import INDEX_TYPES, benchmark_index_types, bytes_per_vector, create_index, describe_index, set_search_params
+from utils.vector_store import build_index, query_index, search_document_chunks
+
+DOCS = [f"clause {i} about premium grace period claim number {i}" for i in range(40)] + [
+    "Nominee details: Sumegha, spouse, 100 percent of claim",
+]
+
+def _vectors(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n, dim)).astype('float32')
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_search_functions_work_on_every_index_type(fake_model, index_type):
+    index = build_index(DOCS, index_type=index_type, nprobe=64)
+    assert index.ntotal == len(DOCS)
+    assert query_index(index, DOCS, "nominee details sumegha spouse", k=1) == [DOCS[-1]]
+    chunks, found = search_document_chunks(index, DOCS, "nominee details sumegha", k=1, similarity_threshold=0.0)
+    assert found and chunks == [DOCS[-1]]
+
+def test_ivf_pq_trains_when_enough_vectors_and_falls_back_otherwise():
+    assert describe_index(create_index(_vectors(300), 'ivf_pq', pq_bits=8)) == 'IndexIVFPQ'
+    assert describe_index(create_index(_vectors(50), 'ivf_pq', pq_bits=8)) == 'IndexIVFFlat'
+
+def test_unknown_index_type_rejected():
+    with pytest.raises(ValueError):
+        create_index(_vectors(10), 'lsh')
+
+def test_set_search_params_tunes_ivf_and_hnsw():
+    ivf = create_index(_vectors(400), 'ivf_flat', nlist=16)
+    set_search_params(ivf, nprobe=4)
+    assert faiss.extract_index_ivf(ivf).nprobe == 4
+    hnsw = create_index(_vectors(50), 'hnsw')
+    set_search_params(hnsw, ef_search=123)
+    assert hnsw.hnsw.efSearch == 123
+
+def test_benchmark_reports_exact_recall_for_flat():
+    vectors = _vectors(500)
+    results = benchmark_index_types(vectors, vectors[:20], k=5, index_types=['flat', 'ivf_flat'], nprobe=1000)
+    assert [r["index_type"] for r in results] == ['flat', 'ivf_flat']
+    assert all(r["recall_at_k"] == pytest.approx(1.0) for r in results)
+
+def test_compressed_types_report_smaller_codes():
+    vectors = _vectors(300)
+    assert bytes_per_vector(create_index(vectors, 'flat')) == 32 * 4
+    assert bytes_per_vector(create_index(vectors, 'sq8')) == 32
+    assert bytes_per_vector(create_index(vectors, 'pq', pq_m=4)) == 4
+    report = benchmark_index_types(vectors, vectors[:20], k=5, index_types=['sq8'])
+    assert report[0]["bytes_per_vector"] == 32 and report[0]["recall_at_k"] > 0.8
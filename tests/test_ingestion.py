@@ -0,0 +1,115 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+from utils.corpus import SessionCorpus
+from utils.document_cache import DocumentCache
+from utils.index_factory import describe_index
+from utils.ingestion import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, IngestionManager, PageIngestor
+
+PAGES = [
+    ["PROPOSAL FORM", "Proposer Name: Ravi Kumar"],
+    [],
+    ["Nominee Name: Sumegha", "Relationship: Spouse"],
+    ["Sum Insured: 500000"],
+]
+
+def test_pages_are_searchable_while_ingesting(fake_model, make_pdf, tmp_path):
+    corpus = SessionCorpus()
+    ingestor = PageIngestor(make_pdf(PAGES), "proposal.pdf", corpus, cache=DocumentCache(cache_dir=str(tmp_path)))
+    stream = ingestor.run()
+    assert next(stream) == (1, 4)
+    assert corpus.chunks() == PAGES[0] and not corpus.is_complete(ingestor.key)
+    assert corpus.search("proposer name", k=1, window=0)[0] == ["Proposer Name: Ravi Kumar"]
+    assert list(stream) == [(2, 4), (3, 4), (4, 4)]
+    assert ingestor.done and ingestor.error is None and corpus.is_complete(ingestor.key)
+    assert corpus.search("nominee name", k=1, window=0, with_sources=True)[0] == ["[proposal.pdf p.3] Nominee Name: Sumegha"]
+
+def test_streamed_pq_corpus_is_trained_on_the_whole_document(fake_model, make_pdf, tmp_path):
+    # 6 pages of 50 lines: no single page has the 256 vectors PQ needs, the document does
+    pages = [[f"Clause {page}.{line}: benefit {page * 50 + line} covers item {line}" for line in range(50)]
+             for page in range(6)]
+    corpus = SessionCorpus(index_type="pq")
+    ingestor = PageIngestor(make_pdf(pages), "wording.pdf", corpus, cache=DocumentCache(cache_dir=str(tmp_path)))
+    stream = ingestor.run()
+    assert next(stream) == (1, 6)
+    assert describe_index(corpus.index.index.index) == "IndexFlatL2"
+    assert corpus.search("Clause 0.7", k=1, window=0)[0] == [pages[0][7]]
+    list(stream)
+    assert corpus.is_complete(ingestor.key)
+    assert describe_index(corpus.index.index.index) == "IndexPQ" and corpus.index.index.ntotal == 300
+    assert corpus.search("Clause 5.12 benefit 262", k=1, window=0)[0] == [pages[5][12]]
+
+def test_abandoned_run_resumes_and_fills_cache(fake_model, make_pdf, tmp_path):
+    cache = DocumentCache(cache_dir=str(tmp_path))
+    corpus = SessionCorpus()
+    ingestor = PageIngestor(make_pdf(PAGES), "proposal.pdf", corpus, cache=cache)
+    for pages_done, _ in ingestor.run():
+        if pages_done == 2:
+            break
+    assert ingestor.progress == 0.5
+    assert list(ingestor.run()) == [(3, 4), (4, 4)]
+    assert corpus.chunks() == [line for page in PAGES for line in page]
+
+    record = cache.get(ingestor.key)
+    assert record["pages"] == [1, 1, 3, 3, 4] and record["index"].ntotal == 5
+    again = PageIngestor(make_pdf(PAGES), "copy.pdf", SessionCorpus(), cache=cache)
+    assert list(again.run()) == [(4, 4)]
+    assert again.corpus.chunks() == corpus.chunks()
+
+def test_bad_and_empty_pdfs_report_errors(fake_model, make_pdf, tmp_path):
+    cache = DocumentCache(cache_dir=str(tmp_path))
+    broken = PageIngestor(b"not a pdf", "broken.pdf", SessionCorpus(), cache=cache)
+    assert list(broken.run()) == [] and broken.error.startswith("Error extracting text")
+    empty = PageIngestor(make_pdf([[], []]), "blank.pdf", SessionCorpus(), cache=cache)
+    assert list(empty.run()) == [(1, 2), (2, 2)]
+    assert empty.done and "No text content" in empty.error and len(empty.corpus) == 0
+
+def test_manager_runs_jobs_in_background_and_dedupes(fake_model, make_pdf, tmp_path):
+    manager = IngestionManager(max_workers=2)
+    corpus = SessionCorpus()
+    cache = DocumentCache(cache_dir=str(tmp_path))
+    job_id = manager.submit(make_pdf(PAGES), "proposal.pdf", corpus, cache=cache)
+    assert manager.submit(make_pdf(PAGES), "proposal.pdf", corpus, cache=cache) == job_id
+    status = manager.wait(job_id, timeout=10)
+    assert status["status"] == JOB_DONE and status["progress"] == 1.0 and status["pages_done"] == 4
+    assert corpus.is_complete(status["doc_id"])
+    failed = manager.wait(manager.submit(b"not a pdf", "broken.pdf", corpus, cache=cache), timeout=10)
+    assert failed["status"] == JOB_FAILED and failed["error"]
+    manager.shutdown()
+
+def test_failed_job_drops_partial_document(fake_model, make_pdf, monkeypatch, tmp_path):
+    def pages_then_error(pdf_file, start_page=1):
+        yield 1, 4, "\n".join(PAGES[0]), []
+        raise ValueError("corrupt xref")
+    monkeypatch.setattr("utils.ingestion.iter_pdf_pages_with_tables", pages_then_error)
+    manager = IngestionManager(max_workers=1)
+    corpus = SessionCorpus()
+    job_id = manager.submit(make_pdf(PAGES), "proposal.pdf", corpus, cache=DocumentCache(cache_dir=str(tmp_path)))
+    status = manager.wait(job_id, timeout=10)
+    assert status["status"] == JOB_FAILED and "corrupt xref" in status["error"]
+    assert status["doc_id"] not in corpus.documents and corpus.index.index.ntotal == 0
+    assert corpus.search("proposer name", k=1, window=0) == ([], False)
+    manager.shutdown()
+
+def test_cancel_stops_between_pages_and_drops_partial_document(fake_model, make_pdf, monkeypatch, tmp_path):
+    gate = threading.Event()
+    original = PageIngestor._index_page
+    def slow_index_page(self, page_no, text, tables=None):
+        original(self, page_no, text, tables)
+        gate.wait(timeout=10)
+    monkeypatch.setattr(PageIngestor, "_index_page", slow_index_page)
+    manager = IngestionManager(max_workers=1)
+    corpus = SessionCorpus()
+    job_id = manager.submit(make_pdf(PAGES), "proposal.pdf", corpus, cache=DocumentCache(cache_dir=str(tmp_path)))
+    queued = manager.submit(make_pdf([["Other document"]]), "other.pdf", corpus, cache=DocumentCache(cache_dir=str(tmp_path)))
+    assert manager.status(queued)["status"] == JOB_QUEUED
+    assert manager.cancel(job_id) and manager.cancel(queued)
+    gate.set()
+    assert manager.wait(job_id, timeout=10)["status"] == JOB_CANCELLED
+    assert manager.wait(queued, timeout=10)["status"] == JOB_CANCELLED
+    assert len(corpus) == 0 and corpus.index.index.ntotal == 0
+    assert not manager.cancel(job_id)
+    manager.forget(job_id)
+    assert manager.status(job_id) is None
+    manager.shutdown()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.corpus import SessionCorpus
+from utils.keyword_rules import KeywordAutomaton, index_lines, keyword_context, matching_rules
+
+SCHEDULE = [
+    "POLICY SCHEDULE",
+    "Insured Name: Ravi Kumar",
+    "Policy No. : 2293112006084450",
+    "Plan: Family Floater",
+    "Sum Insured: 5,00,000",
+    "Premium: 12,400",
+    "Nominee Details",
+    "Sumegha Spouse 100%",
+    "Policy Period: 01/04/2024 - 31/03/2025",
+]
+
+def test_automaton_reports_overlapping_keywords():
+    automaton = KeywordAutomaton(["sum insured", "insured", "insured name", "name"])
+    assert automaton.find("the insured name") == {"insured", "insured name", "name"}
+    assert automaton.find("sum insured") == {"sum insured", "insured"}
+    assert automaton.find("nothing here") == set()
+
+def test_index_is_built_incrementally():
+    whole = index_lines(SCHEDULE)
+    partial = index_lines(SCHEDULE[:4])
+    index_lines(SCHEDULE[4:], start=4, index=partial)
+    assert partial == whole
+    assert whole["sum insured"] == [4]
+    assert whole["nominee details"] == [6]
+
+def test_specific_rule_wins_over_broad_insured_rule():
+    assert [rule["label"] for rule in matching_rules("What is the sum_insured?")] == ["sum insured", "insured"]
+    label, lines = keyword_context("What is the sum insured?", [(SCHEDULE, index_lines(SCHEDULE))])
+    assert label == "sum insured"
+    assert lines == SCHEDULE[2:7]
+    label, lines = keyword_context("insured name?", [(SCHEDULE, index_lines(SCHEDULE))])
+    assert label == "insured name" and lines == SCHEDULE[0:3]
+
+def test_nominee_section_stops_at_next_section():
+    label, lines = keyword_context("who is my nominee", [(SCHEDULE, index_lines(SCHEDULE))])
+    assert label == "nominee"
+    assert lines == ["Nominee Details", "Sumegha Spouse 100%"]
+
+def test_no_rule_or_no_matching_line():
+    assert keyword_context("is dental covered?", [(SCHEDULE, index_lines(SCHEDULE))]) is None
+    assert keyword_context("what is my gstin", [(SCHEDULE, index_lines(SCHEDULE))]) is None
+
+def test_corpus_context_spans_documents_without_crossing_them(fake_model):
+    corpus = SessionCorpus()
+    corpus.add_document("a", "a.pdf", ["Premium: 1,000"])
+    corpus.add_document("b", "b.pdf", ["Header", "Premium: 2,000", "Footer"])
+    label, lines = corpus.keyword_context("premium amount")
+    assert label == "premium"
+    assert lines == ["Premium: 1,000", "Header", "Premium: 2,000", "Footer"]
+    assert corpus.keyword_context("premium amount", ["b"])[1] == ["Header", "Premium: 2,000", "Footer"]
+    corpus.remove_document("b")
+    assert "b" not in corpus.keyword_index
+    assert corpus.keyword_context("premium amount") == ("premium", ["Premium: 1,000"])
@@ -15,7 +15,7 @@ def test_chat_returns_stubbed_message(llm_client):
     stubbed_response.status_code = 200
     stubbed_response.json.return_value = [{"generated_text": "Hello, this is a stubbed response."}]
     
-    with patch("requests.post", return_value=stubbed_response) as mock_post:
+    with patch("requests.Session.post", return_value=stubbed_response) as mock_post:
         result = llm_client.chat("Hi!")
         assert result[0] == "Hello, this is a stubbed response."  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
@@ -26,7 +26,7 @@ def test_chat_handles_dict_response(llm_client):
     stubbed_response.status_code = 200
     stubbed_response.json.return_value = {"generated_text": "Dict format response."}
     
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!")
         assert result[0] == "Dict format response."  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
@@ -40,7 +40,7 @@ def test_chat_handles_list_last_element(llm_client):
         {"generated_text": "Last format response."}
     ]
     
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!")
         assert result[0] == "Last format response."  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
@@ -49,7 +49,7 @@ def test_chat_model_not_found(llm_client):
     stubbed_response = Mock()
     stubbed_response.status_code = 404
     stubbed_response.json.return_value = {"error": "Model not found"}
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!")
         assert "Model not found" in result[0]  # Check reply
         assert result[1] is None  # No rationale for error cases
@@ -58,16 +58,20 @@ def test_chat_raises_for_other_http_errors(llm_client):
     stubbed_response = Mock()
     stubbed_response.status_code = 500
     stubbed_response.raise_for_status.side_effect = requests.HTTPError("Server error")
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response) as mock_post, \
+            patch("utils.llm_client.time.sleep") as mock_sleep:
         with pytest.raises(requests.HTTPError):
             llm_client.chat("Hi!")
+    # 5xx responses are retried before the error surfaces
+    assert mock_post.call_count == llm_client.max_retries + 1
+    assert mock_sleep.call_count == llm_client.max_retries
 
 def test_chat_handles_unexpected_response(llm_client):
     stubbed_response = Mock()
     stubbed_response.status_code = 200
     stubbed_response.json.return_value = {"unexpected": "format"}
     
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!")
         assert "unexpected" in result[0]  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
@@ -85,7 +89,7 @@ def test_chat_with_kb_passages(llm_client):
     
     kb_passages = ["Health insurance covers medical expenses.", "Your policy number is 1234567890."]
     
-    with patch("requests.post", side_effect=[stubbed_response, rationale_response]):
+    with patch("requests.Session.post", side_effect=[stubbed_response, rationale_response]):
         result = llm_client.chat("What is my policy number?", kb_passages=kb_passages)
         assert result[0] == "Response with KB context."  # Check reply
         assert result[1] == "Based on the KB passages provided."   # Check rationale
@@ -96,7 +100,7 @@ def test_chat_without_kb_passages(llm_client):
     stubbed_response.status_code = 200
     stubbed_response.json.return_value = [{"generated_text": "Response without KB context."}]
     
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!")
         assert result[0] == "Response without KB context."  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
@@ -107,7 +111,7 @@ def test_chat_with_empty_kb_passages(llm_client):
     stubbed_response.status_code = 200
     stubbed_response.json.return_value = [{"generated_text": "Response with empty KB."}]
     
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!", kb_passages=[])
         assert result[0] == "Response with empty KB."  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
@@ -118,7 +122,114 @@ def test_chat_with_none_kb_passages(llm_client):
     stubbed_response.status_code = 200
     stubbed_response.json.return_value = [{"generated_text": "Response with None KB."}]
     
-    with patch("requests.post", return_value=stubbed_response):
+    with patch("requests.Session.post", return_value=stubbed_response):
         result = llm_client.chat("Hi!", kb_passages=None)
         assert result[0] == "Response with None KB."  # Check reply
         assert result[1] == "No relevant facts or KB snippets were found for this answer."  # Check rationale
+
+def _response(status, body=None, headers=None):
+    response = Mock()
+    response.status_code = status
+    response.json.return_value = body
+    response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    return response
+
+def test_retries_429_and_5xx_with_backoff(llm_client):
+    responses = [_response(429, headers={"Retry-After": "2"}), _response(503),
+                 _response(200, [{"generated_text": "Recovered."}])]
+    with patch("requests.Session.post", side_effect=responses) as mock_post, \
+            patch("utils.llm_client.time.sleep") as mock_sleep:
+        assert llm_client.chat("Hi!")[0] == "Recovered."
+    assert mock_post.call_count == 3
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert delays[0] == 2.0 and 0 <= delays[1] <= 2 * 0.5 * 2
+    assert mock_post.call_args.kwargs["timeout"] == llm_client.timeout
+
+def test_retries_connection_errors_then_raises(llm_client):
+    with patch("requests.Session.post", side_effect=requests.ConnectionError("reset")) as mock_post, \
+            patch("utils.llm_client.time.sleep"):
+        with pytest.raises(requests.ConnectionError):
+            llm_client.chat("Hi!")
+    assert mock_post.call_count == llm_client.max_retries + 1
+
+def test_clients_share_one_pooled_session():
+    from utils.llm_client import backoff_delay
+    assert LLMClient(api_key="a").session is LLMClient(api_key="b").session
+    assert LLMClient(api_key="a", timeout=(1, 2), max_retries=0).timeout == (1, 2)
+    assert all(0 <= backoff_delay(10) <= 8.0 for _ in range(20))
+    assert backoff_delay(0, retry_after="soon") <= 0.5
+
+class _FakeGenai:
+    def __init__(self):
+        self.configured = []
+        self.built = []
+        fake = self
+
+        class GenerativeModel:
+            def __init__(self, model_name, generation_config=None):
+                fake.built.append((model_name, generation_config))
+
+            def generate_content(self, prompt):
+                return Mock(text=f"gemini: {prompt[:12]}")
+
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, api_key):
+        self.configured.append(api_key)
+
+def test_gemini_models_are_built_once_and_shared(monkeypatch):
+    import threading
+    from utils import llm_client as module
+    fake = _FakeGenai()
+    monkeypatch.setattr(module, "_import_genai", lambda: fake)
+    module.clear_gemini_models()
+    module.gemini_stats.reset()
+    client = LLMClient(api_key="hf")
+    client.gemini_api_key = "key-1"
+    threads = [threading.Thread(target=client.chat, args=("What is my premium?", ["KB fact."])) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # One configure, one model per generation config (answer and rationale), for 8 generations
+    assert fake.configured == ["key-1"]
+    assert sorted(config["max_output_tokens"] for _, config in fake.built) == [96, 512]
+    stats = module.gemini_stats.snapshot()
+    assert stats["calls"] == 8 and stats["models_built"] == 2
+    assert stats["setup_ms_mean"] >= 0 and stats["generate_ms_mean"] >= 0
+    # A new key reconfigures the SDK and rebuilds
+    other = LLMClient(api_key="hf")
+    other.gemini_api_key = "key-2"
+    assert other.chat("Hi!")[0] == "gemini: Hi!"
+    assert fake.configured == ["key-1", "key-2"] and len(fake.built) == 3
+    module.clear_gemini_models()
+
+def test_achat_and_astream_match_the_sync_client(llm_client):
+    import asyncio
+    reply = _response(200, [{"generated_text": "Async reply."}])
+    rationale = _response(200, [{"generated_text": "From the KB."}])
+    with patch("requests.Session.post", side_effect=[reply, rationale]):
+        assert asyncio.run(llm_client.achat("Hi!", kb_passages=["KB fact."])) == ("Async reply.", "From the KB.")
+    with patch("requests.Session.post", return_value=_response(404)) as mock_post:
+        assert asyncio.run(llm_client.achat("Hi!", kb_passages=["KB fact."]))[1] is None
+        assert mock_post.call_count == 1  # no rationale for an error reply
+
+    async def collect():
+        return [token async for token in llm_client.astream("Hi!")]
+    with patch.object(LLMClient, "stream_chat_response", return_value=iter(["Hel", "lo"])):
+        assert asyncio.run(collect()) == ["Hel", "lo"]
+
+def test_async_calls_overlap_when_gathered(llm_client):
+    import asyncio
+    import threading
+    both_in_flight = threading.Barrier(2, timeout=5)
+
+    def post(*args, **kwargs):
+        both_in_flight.wait()  # times out unless the two requests are sent concurrently
+        return _response(200, [{"generated_text": "Done."}])
+
+    async def both():
+        return await asyncio.gather(llm_client.areply("Hi!"),
+                                    llm_client.arationale("Done.", ["KB fact."], provider="hf"))
+    with patch("requests.Session.post", side_effect=post):
+        assert asyncio.run(both()) == [("Done.", "hf"), "Done."]
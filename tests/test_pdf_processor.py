@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+from concurrent.futures.process import BrokenProcessPool
+from utils import pdf_processor
+
+PAGES = [[f"Clause {page}.{line}: cover applies" for line in range(3)] if page % 5 else [] for page in range(1, 21)]
+
+def _expected(start=1):
+    return [(page, len(PAGES), "\n".join(lines)) for page, lines in enumerate(PAGES, start=1)][start - 1:]
+
+def test_parallel_extraction_matches_sequential_order(make_pdf):
+    pdf = make_pdf(PAGES)
+    try:
+        assert list(pdf_processor.iter_pdf_pages(io.BytesIO(pdf), workers=2)) == _expected()
+        assert list(pdf_processor.iter_pdf_pages(pdf, start_page=4, workers=2)) == _expected(4)
+    finally:
+        pdf_processor.shutdown_pool()
+    assert list(pdf_processor.iter_pdf_pages(pdf, workers=1)) == _expected()
+
+def test_pool_failure_falls_back_to_sequential(make_pdf, monkeypatch, capsys):
+    def broken(workers):
+        raise BrokenProcessPool("workers died")
+    monkeypatch.setattr(pdf_processor, "_get_pool", broken)
+    assert list(pdf_processor.iter_pdf_pages(make_pdf(PAGES), workers=4)) == _expected()
+    assert "sequential fallback" in capsys.readouterr().out
+
+def test_extract_text_joins_non_empty_pages(make_pdf):
+    text = pdf_processor.extract_text_from_pdf(io.BytesIO(make_pdf([["Policy No. : 42"], [], ["Nominee: Sumegha"]])))
+    assert text == "Policy No. : 42\nNominee: Sumegha"
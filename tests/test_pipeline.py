@@ -0,0 +1,150 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import threading
+import time
+import pytest
+from utils.corpus import SessionCorpus
+from utils.knowledge_base import KB_DOCS
+from utils.pipeline import STAGES, PipelineSession, QueryPipeline
+from utils.vector_store import build_index
+
+class FakeLLM:
+    def __init__(self, answer="The grace period is 30 days."):
+        self.answer = answer
+        self.prompts = []
+
+    def chat(self, prompt, kb_passages=None):
+        self.prompts.append(prompt)
+        if prompt.lstrip().startswith("Extract the most important factual information"):
+            return "Grace period for premium payment is 30 days.", None
+        return self.answer, "From the KB."
+
+    def stream_chat_response(self, prompt):
+        self.prompts.append(prompt)
+        yield from ["The grace ", "period is ", "30 days."]
+
+@pytest.fixture
+def pipeline(fake_model):
+    return QueryPipeline(FakeLLM(), build_index(KB_DOCS))
+
+def test_kb_answer_updates_conversation_and_memory(pipeline):
+    session = PipelineSession(context_page="Billing")
+    result = pipeline.run("  What is the grace period for premium?  ", session)
+    assert result["route"] == "kb" and result["follow_up"] is None and not result["rationale_pending"]
+    assert result["reply"] == "The grace period is 30 days." and result["rationale"] == "From the KB."
+    assert "### Reference policies:" in result["prompt"]
+    assert list(result["timings"]) == list(STAGES[:3]) + ["kb_vector"] + list(STAGES[3:])
+    assert result["kb_ranker"] == "vector"
+    assert session.conversation == [
+        {"role": "user", "content": "What is the grace period for premium?"},
+        {"role": "assistant", "content": "The grace period is 30 days.", "rationale": "From the KB."},
+    ]
+    assert session.memories == ["Grace period for premium payment is 30 days."]
+    # The next prompt carries the memory
+    pipeline.run("And for renewal of the policy?", session)
+    assert "### CONVERSATION MEMORY" in pipeline.llm.prompts[-2]
+
+def test_unsafe_and_off_topic_questions_skip_the_llm(pipeline):
+    session = PipelineSession()
+    result = pipeline.run("how to hack my insurance account", session)
+    assert result["route"] == "unsafe_input" and session.last_safety_check["unsafe"]
+    assert [m["role"] for m in session.conversation] == ["assistant"]
+    result = pipeline.run("what is the weather today", session)
+    assert result["route"] == "off_topic" and list(result["timings"]) == ["input_safety", "bfsi_gate"]
+    assert pipeline.llm.prompts == []
+    assert pipeline.run("   ", session) is None
+
+def test_document_questions(pipeline):
+    corpus = SessionCorpus()
+    corpus.add_document("schedule", "schedule.pdf", ["POLICY SCHEDULE", "Policy No. : 2293112006084450",
+                                                      "Premium: 12,400", "Grace period: 15 days"])
+    session = PipelineSession(corpus=corpus, doc_ids=["schedule"])
+    result = pipeline.run("What is my policy number?", session)
+    assert result["route"] == "direct" and "2293112006084450" in result["reply"]
+    assert pipeline.llm.prompts == [] and session.memories
+    result = pipeline.run("How much premium do I pay?", session)
+    assert result["route"] == "document"
+    assert result["notices"] == [("info", "🔍 Using uploaded document for answer context (premium match).")]
+    assert "Premium: 12,400" in result["prompt"]
+
+def test_hooks_and_streaming(pipeline):
+    seen = []
+    pipeline.add_hook(lambda stage, context: seen.append(stage))
+    pipeline.add_hook(lambda stage, context: context.update(reply=context["reply"].upper()), stage="llm")
+    with pytest.raises(ValueError):
+        pipeline.add_hook(print, stage="nope")
+    result = pipeline.run("What is the grace period for premium?", PipelineSession(stream=True))
+    assert seen == list(STAGES)
+    assert result["reply"] == "THE GRACE PERIOD IS 30 DAYS." and result["rationale"] is None
+
+def test_cold_process_answers_kb_lexically_while_encoder_loads(fake_model):
+    from utils import embeddings
+    pipeline = QueryPipeline(FakeLLM(), build_index(KB_DOCS))
+    embeddings.clear_models()
+    assert not embeddings.model_loaded()
+    result = pipeline.run("What is the grace period for premium payment?", PipelineSession())
+    assert result["route"] == "kb" and result["kb_ranker"] == "bm25" and "kb_bm25" in result["timings"]
+    assert "The grace period for premium payment is usually 30 days from the due date." in result["prompt"]
+    embeddings.warm_up_in_background().join(timeout=10)
+    assert embeddings.model_loaded()
+
+class DeferringLLM(FakeLLM):
+    """Answers with `reply`; the rationale and the memory summary each wait for the other."""
+
+    def __init__(self):
+        super().__init__()
+        self.both_started = threading.Barrier(2, timeout=5)
+
+    def reply(self, prompt):
+        self.prompts.append(prompt)
+        return self.answer, "gemini"
+
+    def chat(self, prompt, kb_passages=None):
+        self.both_started.wait()
+        return super().chat(prompt, kb_passages)
+
+    async def arationale(self, reply, kb_passages=None, provider="hf"):
+        await asyncio.to_thread(self.both_started.wait)
+        return f"From the KB ({provider})."
+
+def test_deferred_follow_up_runs_rationale_and_memory_concurrently(fake_model):
+    pipeline = QueryPipeline(DeferringLLM(), build_index(KB_DOCS), defer_follow_up=True)
+    session = PipelineSession()
+    result = pipeline.run("What is the grace period for premium?", session)
+    assert result["reply"] == "The grace period is 30 days." and result["rationale"] is None
+    assert result["rationale_pending"]
+    assert session.follow_up is result["follow_up"]
+    # Both calls must be in flight together, or the barrier times out
+    assert result["follow_up"].result(timeout=10) == "From the KB (gemini)."
+    assert session.conversation[-1]["rationale"] == "From the KB (gemini)."
+    assert session.memories == ["Grace period for premium payment is 30 days."]
+    # The next question waits for the previous follow-up and carries its memory
+    result = pipeline.run("And for renewal of the policy?", session)
+    assert "Grace period for premium payment is 30 days." in result["prompt"]
+    result["follow_up"].result(timeout=10)
+
+def test_cold_query_does_not_wait_for_a_warm_up_in_progress(fake_model, monkeypatch):
+    from utils import embeddings
+    loading, release = threading.Event(), threading.Event()
+
+    class SlowLoadingModel(fake_model):
+        def __init__(self, *args, **kwargs):
+            loading.set()
+            release.wait(timeout=10)
+            super().__init__(*args, **kwargs)
+
+    pipeline = QueryPipeline(FakeLLM(), build_index(KB_DOCS))
+    monkeypatch.setattr(embeddings, "SentenceTransformer", SlowLoadingModel)
+    embeddings.clear_models()
+    # Like app.py: the warm-up starts before the first question and is still loading
+    thread = embeddings.warm_up_in_background()
+    assert loading.wait(timeout=10)
+    started = time.perf_counter()
+    result = pipeline.run("What is the grace period for premium payment?", PipelineSession())
+    assert time.perf_counter() - started < 1.0 and result["route"] == "kb" and result["kb_ranker"] == "bm25"
+    assert thread.is_alive() and not embeddings.model_loaded()
+    release.set()
+    thread.join(timeout=10)
+    assert embeddings.model_loaded()
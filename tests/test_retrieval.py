@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.corpus import SessionCorpus
+from utils.retrieval import BM25Index, expand_windows, reciprocal_rank_fusion, tokenize
+
+LINES = [
+    "POLICY SCHEDULE",
+    "Policy No. : 2293112006084450",
+    "Customer Name: Ravi Kumar",
+    "Customer Code: CC-88121",
+    "GSTIN: 27AAACR1234A1Z5",
+    "Sum Insured: 5,00,000",
+    "Nominee Details",
+    "Sumegha Spouse 56 100%",
+]
+
+def test_tokenize():
+    assert tokenize("Policy No. : 2293-A") == ["policy", "no", "2293", "a"]
+
+def test_bm25_ranks_rare_terms_first_and_supports_remove():
+    bm25 = BM25Index()
+    for i, line in enumerate(LINES):
+        bm25.add(i, line)
+    assert bm25.search("gstin number", k=1)[0][0] == 4
+    bm25.remove(4)
+    assert bm25.search("gstin", k=1) == []
+    assert len(bm25) == len(LINES) - 1
+    assert [doc_id for doc_id, _ in bm25.search("customer", allowed={3})] == [3]
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [2, 1, 4]])
+    assert {fused[0][0], fused[1][0]} == {1, 2}
+    assert fused[-1][0] in (3, 4)
+
+def test_expand_windows_merges_and_clips():
+    assert expand_windows([0, 1, 7], n_lines=8, window=1) == [0, 1, 2, 6, 7]
+
+def _corpus():
+    corpus = SessionCorpus()
+    corpus.add_document("schedule", "schedule.pdf", LINES)
+    return corpus
+
+def test_hybrid_search_returns_context_window(fake_model):
+    lines, found = _corpus().search("What is the GSTIN?", k=1, window=1)
+    assert found
+    assert lines == LINES[3:6]
+
+def test_hybrid_search_finds_lexical_hits_below_vector_threshold(fake_model):
+    lines, found = _corpus().search("customer code", k=1, window=0, similarity_threshold=1.1)
+    assert found and lines == ["Customer Code: CC-88121"]
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import threading
+import time
+import pytest
+from starlette.testclient import TestClient
+from server import ChatService, Overloaded, create_app
+from utils.ingestion import IngestionManager
+from utils.knowledge_base import KB_DOCS
+from utils.pipeline import QueryPipeline
+from utils.vector_store import build_index
+
+class SlowLLM:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def chat(self, prompt, kb_passages=None):
+        time.sleep(self.delay)
+        return "Premiums can be paid online.", None
+
+    def stream_chat_response(self, prompt):
+        yield from ["Premiums can ", "be paid ", "online."]
+
+@pytest.fixture
+def service(fake_model):
+    manager = IngestionManager(max_workers=1)
+    service = ChatService(QueryPipeline(SlowLLM(), build_index(KB_DOCS)), ingestion=manager, workers=2, max_queue=1)
+    yield service
+    manager.shutdown()
+
+def test_chat_and_session_lifecycle(service):
+    with TestClient(create_app(service)) as client:
+        assert client.post("/sessions/nope/chat", json={"message": "hi"}).status_code == 404
+        session_id = client.post("/sessions").json()["session_id"]
+        assert client.post(f"/sessions/{session_id}/chat", json={"message": "  "}).status_code == 400
+        response = client.post(f"/sessions/{session_id}/chat", json={"message": "How do I pay my premium?"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["reply"] == "Premiums can be paid online." and body["route"] == "kb"
+        assert body["rationale_pending"] is False and body["kb_ranker"] == "vector"
+        assert "llm" in body["timings_ms"] and body["safety"]["unsafe"] is False
+        state = client.get(f"/sessions/{session_id}").json()
+        assert [m["role"] for m in state["conversation"]] == ["user", "assistant"]
+        assert client.delete(f"/sessions/{session_id}").json() == {"deleted": True}
+        assert client.get(f"/sessions/{session_id}").status_code == 404
+
+def test_stream_flag_still_returns_one_json_reply(service):
+    with TestClient(create_app(service)) as client:
+        session_id = client.post("/sessions").json()["session_id"]
+        response = client.post(f"/sessions/{session_id}/chat", json={"message": "How do I pay my premium?", "stream": True})
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["reply"] == "Premiums can be paid online."
+
+def test_upload_then_ask_the_document(service, make_pdf):
+    pdf = make_pdf([["POLICY SCHEDULE", "Policy No. : 2293112006084450", "Premium: 12,400"]])
+    with TestClient(create_app(service)) as client:
+        session_id = client.post("/sessions").json()["session_id"]
+        upload = client.post(f"/sessions/{session_id}/documents?name=schedule.pdf", content=pdf,
+                             headers={"content-type": "application/pdf"})
+        assert upload.status_code == 202
+        service.ingestion.wait(upload.json()["job_id"], timeout=30)
+        documents = client.get(f"/sessions/{session_id}/documents").json()["documents"]
+        assert documents[0]["name"] == "schedule.pdf" and documents[0]["status"] == "done"
+        body = client.post(f"/sessions/{session_id}/chat", json={"message": "What is my policy number?"}).json()
+        assert body["route"] == "direct" and "2293112006084450" in body["reply"]
+        bad = client.post(f"/sessions/{session_id}/chat", json={"message": "premium?", "doc_ids": ["other"]})
+        assert bad.status_code == 400
+        doc_id = upload.json()["doc_id"]
+        assert client.delete(f"/sessions/{session_id}/documents/{doc_id}").status_code == 200
+        assert client.post(f"/sessions/{session_id}/chat", json={"message": "What is my policy number?"}).json()["route"] == "kb"
+
+def test_timeout_returns_504(service):
+    service.pipeline.llm.delay = 0.5
+    service.timeout = 0.05
+    with TestClient(create_app(service)) as client:
+        session_id = client.post("/sessions").json()["session_id"]
+        response = client.post(f"/sessions/{session_id}/chat", json={"message": "How do I pay my premium?"})
+        assert response.status_code == 504
+
+def test_admission_control_bounds_running_and_waiting_work():
+    service = ChatService(workers=1, max_queue=1, timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(service.run(release.wait))
+        second = asyncio.ensure_future(service.run(lambda: "queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await service.run(lambda: "rejected")
+        release.set()
+        assert await first is True and await second == "queued"
+        assert service.load["admitted"] == 0
+
+    asyncio.run(scenario())
+    service.shutdown()
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.corpus import SessionCorpus
+from utils.document_cache import DocumentCache
+from utils.ingestion import PageIngestor
+from utils.table_extractor import answer_table_question, is_nominee_question, parse_table
+
+NOMINEES = [
+    ["Nominee Name", "Relationship", "Age", "% of Claim", "Appointee"],
+    ["Sumegha", "Spouse", "34", "60", "-"],
+    ["Anil", "Son", "12", "40%", "Ravi Kumar"],
+]
+
+def test_nominee_table_rows_are_typed_records():
+    records = parse_table(NOMINEES, page=2)
+    assert [r["row"] for r in records] == [
+        {"name": "Sumegha", "relationship": "Spouse", "age": 34, "share": 60},
+        {"name": "Anil", "relationship": "Son", "age": 12, "share": 40, "appointee": "Ravi Kumar"},
+    ]
+    assert records[1]["text"] == "Nominee: Anil | Relationship: Son | Age: 12 | % of Claim: 40% | Appointee: Ravi Kumar"
+    assert all(r["table"] == "nominee" and r["page"] == 2 for r in records)
+
+def test_other_tables_become_schedule_rows():
+    assert [r["text"] for r in parse_table([["Policy No.", "2293112006084450"], ["Sum Insured", "5,00,000"], ["GSTIN", None]])] == \
+        ["Policy No.: 2293112006084450", "Sum Insured: 5,00,000"]
+    rows = parse_table([["Cover", "Limit", "Co-pay"], ["Room rent", "1% of SI", None], ["ICU", "2% of SI", "10%"]])
+    assert [r["row"] for r in rows] == [{"Cover": "Room rent", "Limit": "1% of SI"},
+                                        {"Cover": "ICU", "Limit": "2% of SI", "Co-pay": "10%"}]
+
+def test_label_value_grid_cells_are_split_into_their_own_records():
+    grid = [["Policy No. : 2293112006084450", "Previous Policy No : 11250215490605"],
+            ["Proposer Name : DHARMARAJ NEMCHANDRA\nWAGANNAWAR", "Issuing Office Name : Branch Office Thane II"],
+            ["Policy Category : Sixth Year", None],
+            ["Date of Inception: 22-Jun-2019", "Intermediary :BA0000164136\nName :Ms.SUMEGHA D"]]
+    assert [r["row"] for r in parse_table(grid)] == [
+        {"Policy No.": "2293112006084450"}, {"Previous Policy No": "11250215490605"},
+        {"Proposer Name": "DHARMARAJ NEMCHANDRA WAGANNAWAR"}, {"Issuing Office Name": "Branch Office Thane II"},
+        {"Policy Category": "Sixth Year"},
+        {"Date of Inception": "22-Jun-2019"}, {"Intermediary": "BA0000164136"}, {"Name": "Ms.SUMEGHA D"},
+    ]
+
+def test_nominee_questions_are_lookups_only():
+    assert is_nominee_question("Who are my nominees and their shares?")
+    assert is_nominee_question("nominee details")
+    assert not is_nominee_question("Can I change my nominee?")
+    assert not is_nominee_question("What is the policy number?")
+
+def test_ingested_tables_answer_nominee_questions(fake_model, make_pdf, tmp_path):
+    cache = DocumentCache(cache_dir=str(tmp_path))
+    pdf = make_pdf([["POLICY SCHEDULE", "Policy No. : 2293112006084450"], ["NOMINEE DETAILS"]], tables={1: NOMINEES})
+    corpus = SessionCorpus()
+    list(PageIngestor(pdf, "schedule.pdf", corpus, cache=cache).run())
+    reply, rationale = answer_table_question("who is the nominee?", corpus.document_tables())
+    assert reply.splitlines() == [
+        "| Nominee | Relationship | Age | % of Claim | Appointee |",
+        "|---|---|---|---|---|",
+        "| Sumegha | Spouse | 34 | 60% | - |",
+        "| Anil | Son | 12 | 40% | Ravi Kumar |",
+    ]
+    assert rationale.endswith("schedule.pdf p.2")
+    assert corpus.fields[next(iter(corpus.documents))]["nominee"]["value"] == "Sumegha, Anil"
+
+    # A repeat upload restores the rows from the document cache
+    again = SessionCorpus()
+    list(PageIngestor(pdf, "copy.pdf", again, cache=cache).run())
+    assert answer_table_question("nominees", again.document_tables())[0] == reply
@@ -0,0 +1,137 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import pytest
+from utils import embeddings
+from utils.vector_store import build_index, query_index, search_document_chunks, search_many
+
+DOCS = [
+    "The grace period for premium payment is 30 days.",
+    "You can file a claim via our mobile app.",
+    "Home insurance covers floods and earthquakes.",
+]
+
+def test_model_loaded_once_across_calls(fake_model):
+    index = build_index(DOCS)
+    query_index(index, DOCS, "grace period premium", k=1)
+    search_document_chunks(index, DOCS, "file a claim", k=1, similarity_threshold=0.0)
+    assert fake_model.instances == 1
+    assert embeddings.loaded_models() == [embeddings.DEFAULT_MODEL_NAME]
+
+def test_model_loaded_once_under_concurrency(fake_model):
+    threads = [threading.Thread(target=embeddings.get_model) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fake_model.instances == 1
+
+def test_warm_up_is_idempotent(fake_model):
+    embeddings.warm_up()
+    embeddings.warm_up()
+    model = embeddings.get_model()
+    assert model.encode_calls == 1
+
+def test_query_index_returns_nearest_doc(fake_model):
+    index = build_index(DOCS)
+    assert query_index(index, DOCS, "grace period for premium payment", k=1) == [DOCS[0]]
+
+def test_repeated_queries_hit_cache(fake_model):
+    index = build_index(DOCS)
+    model = embeddings.get_model()
+    calls = model.encode_calls
+    query_index(index, DOCS, "What is the grace period?", k=1)
+    search_document_chunks(index, DOCS, "  what is the GRACE period? ", k=1)
+    assert model.encode_calls == calls + 1
+    stats = embeddings.query_cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+def test_embedding_cache_bounds():
+    cache = embeddings.EmbeddingCache(max_entries=2, max_bytes=1024)
+    vec = [0.0] * 64  # 256 bytes as float32
+    for i in range(3):
+        cache.put(("m", str(i)), vec)
+    assert cache.get(("m", "0")) is None
+    assert cache.stats()["entries"] == 2
+    small = embeddings.EmbeddingCache(max_entries=10, max_bytes=600)
+    for i in range(3):
+        small.put(("m", str(i)), vec)
+    assert small.stats()["bytes"] <= 600
+
+def test_search_many_matches_single_query_results(fake_model):
+    index = build_index(DOCS)
+    queries = ["grace period premium", "file a claim mobile app", "floods earthquakes"]
+    expected = [search_document_chunks(index, DOCS, q, k=2, similarity_threshold=0.2) for q in queries]
+    embeddings.query_cache.clear()
+    model = embeddings.get_model()
+    calls = model.encode_calls
+    assert search_many(index, DOCS, queries, k=2, threshold=0.2) == expected
+    assert model.encode_calls == calls + 1
+    assert search_many(index, DOCS, []) == []
+    # More queries than one batcher batch still make a single encode call
+    many = [f"claim question number {i}" for i in range(150)]
+    calls = model.encode_calls
+    assert len(search_many(index, DOCS, many, k=1, threshold=0.0)) == 150
+    assert model.encode_calls == calls + 1
+
+def test_int8_backend_is_a_separate_model_with_parity(fake_model, monkeypatch):
+    quantized = []
+    monkeypatch.setattr(embeddings, "_quantize_dynamic", lambda model: quantized.append(model) or model)
+    assert embeddings.get_model(backend="int8") is not embeddings.get_model(backend="torch")
+    assert len(quantized) == 1
+    assert sorted(embeddings.loaded_models()) == ["all-MiniLM-L6-v2", "all-MiniLM-L6-v2+int8"]
+    parity = embeddings.backend_parity(DOCS, "int8")
+    assert parity["min_cosine"] == pytest.approx(1.0)
+    assert embeddings.backend_throughput(DOCS, "int8", repeats=1)["sentences_per_second"] > 0
+    with pytest.raises(ValueError):
+        embeddings.get_model(backend="tensorrt")
+
+def test_quantize_dynamic_keeps_outputs_close():
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(32, 32), torch.nn.ReLU(), torch.nn.Linear(32, 16))
+    x = torch.randn(8, 32)
+    quantized = embeddings._quantize_dynamic(model)
+    cosine = torch.nn.functional.cosine_similarity(model(x), quantized(x), dim=1)
+    assert float(cosine.min()) > 0.99
+
+def test_cache_keys_depend_on_backend(monkeypatch):
+    from utils.document_cache import document_key
+    from utils.index_cache import corpus_fingerprint
+    torch_keys = (document_key(b"pdf"), corpus_fingerprint(DOCS))
+    monkeypatch.setattr(embeddings, "DEFAULT_BACKEND", "int8")
+    assert embeddings.encoder_id() == "all-MiniLM-L6-v2+int8"
+    assert document_key(b"pdf") != torch_keys[0]
+    assert corpus_fingerprint(DOCS) != torch_keys[1]
+
+def test_batcher_coalesces_concurrent_queries(fake_model):
+    batcher = embeddings.EmbeddingBatcher(window_ms=500, max_batch=len(DOCS) * 2)
+    barrier = threading.Barrier(len(DOCS) * 2)
+    results = {}
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.submit(DOCS[i % len(DOCS)]).result(timeout=5)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(DOCS) * 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+    expected = embeddings.encode_texts(DOCS)
+    assert all((results[i] == expected[i % len(DOCS)]).all() for i in results)
+    assert batcher.stats()["batches"] == 1 and batcher.stats()["texts"] == len(DOCS) * 2
+    assert embeddings.get_model().encode_calls == 2  # one batch + the reference encode above
+
+def test_batcher_propagates_errors_and_can_run_inline(fake_model, monkeypatch):
+    batcher = embeddings.EmbeddingBatcher(window_ms=1)
+    def boom(*args, **kwargs):
+        raise RuntimeError("encoder down")
+    with monkeypatch.context() as patch:
+        patch.setattr(embeddings, "encode_texts", boom)
+        with pytest.raises(RuntimeError):
+            batcher.submit("grace period").result(timeout=5)
+    batcher.close()
+    inline = embeddings.EmbeddingBatcher(window_ms=0)
+    assert inline.encode(DOCS).shape == (len(DOCS), fake_model.dim)
+    assert inline.stats()["batches"] == 0
@@ -0,0 +1,275 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from utils.document_index import DocumentIndex
+from utils.embeddings import DEFAULT_MODEL_NAME
+from utils.field_extractor import extract_fields, merge_fields
+from utils.index_factory import describe_index, min_training_vectors
+from utils.keyword_rules import index_lines, keyword_context
+from utils.retrieval import BM25Index, expand_windows, reciprocal_rank_fusion
+
+# Vector storage for session corpora: 'flat' (float32), 'sq8' or 'pq' (see DocumentIndex)
+DEFAULT_CORPUS_INDEX_TYPE = os.getenv('POLICYPULSE_CORPUS_INDEX_TYPE', 'flat')
+
+
+class _DocumentLines:
+    """Read-only view of one document's lines by position, without copying them."""
+
+    def __init__(self, corpus: 'SessionCorpus', doc_id: str):
+        self._texts = corpus.index.texts
+        self._chunk_ids = corpus.documents[doc_id]['chunk_ids']
+
+    def __len__(self) -> int:
+        return len(self._chunk_ids)
+
+    def __getitem__(self, position: int) -> str:
+        return self._texts[self._chunk_ids[position]]
+
+
+class SessionCorpus:
+    """
+    Every document uploaded in one session, held in a single DocumentIndex plus a
+    single BM25 index. Each chunk is tagged with its document id and page number,
+    so searches can be restricted to some documents without one FAISS index per file.
+
+    `index_type` chooses the vector storage ('flat', 'sq8' or 'pq'); the compressed
+    variants trade a little recall for much less memory per session. Their quantizer
+    is trained once a document is complete and enough lines have arrived for it
+    (see index_factory.min_training_vectors); until then lines are stored as float32.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, index_type: Optional[str] = None):
+        self.model_name = model_name
+        self.index = DocumentIndex(model_name=model_name, index_type=index_type or DEFAULT_CORPUS_INDEX_TYPE)
+        self.bm25 = BM25Index()
+        # doc_id -> {'name': str, 'chunk_ids': [int, ...], 'complete': bool} (chunk ids in reading order;
+        # 'complete' is False while a document is still being streamed in page by page)
+        self.documents: Dict[str, dict] = {}
+        # chunk id -> (doc_id, page, position within the document)
+        self.chunk_meta: Dict[int, Tuple[str, int, int]] = {}
+        # doc_id -> {field: extracted value} (see utils.field_extractor), filled as lines are added
+        self.fields: Dict[str, Dict[str, dict]] = {}
+        # doc_id -> row-level table records (see utils.table_extractor)
+        self.tables: Dict[str, List[dict]] = {}
+        # doc_id -> {keyword: [line positions]} for the rules in utils.keyword_rules
+        self.keyword_index: Dict[str, Dict[str, List[int]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.documents
+
+    def document_names(self) -> Dict[str, str]:
+        """Return {doc_id: display name} in upload order."""
+        return {doc_id: info['name'] for doc_id, info in self.documents.items()}
+
+    def add_document(self, doc_id: str, name: str, chunks: List[str], pages: Optional[List[int]] = None,
+                     embeddings: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Add one document's line chunks to the corpus. Re-adding a complete doc_id is a no-op.
+
+        Args:
+            doc_id: Stable document id (e.g. the document cache key)
+            name: Display name, usually the uploaded file name
+            chunks: Lines in reading order
+            pages: 1-based page number per line (defaults to page 1)
+            embeddings: Precomputed vectors for `chunks`, to skip the encoder
+
+        Returns:
+            The chunk ids assigned in the shared index
+        """
+        with self._lock:
+            if self.is_complete(doc_id):
+                return self.documents[doc_id]['chunk_ids']
+            self.remove_document(doc_id)
+            chunk_ids = self.extend_document(doc_id, name, chunks, pages, embeddings)
+            self.documents[doc_id]['complete'] = True
+            self.index.train(min_training_vectors(self.index.index_type))
+            return chunk_ids
+
+    def extend_document(self, doc_id: str, name: str, chunks: List[str], pages: Optional[List[int]] = None,
+                        embeddings: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Append lines to a document that is still being ingested (page by page),
+        creating it on first call. The lines are searchable as soon as this returns.
+
+        Returns:
+            The chunk ids assigned to the appended lines
+        """
+        with self._lock:
+            info = self.documents.setdefault(doc_id, {'name': name, 'chunk_ids': [], 'complete': False})
+            if not chunks:
+                return []
+            pages = pages or [1] * len(chunks)
+            # Streamed pages are staged: training on the first page alone would fit it to that page
+            chunk_ids = self.index.add(chunks, embeddings=embeddings, train=False)
+            start = len(info['chunk_ids'])
+            for position, (chunk_id, chunk, page) in enumerate(zip(chunk_ids, chunks, pages), start=start):
+                self.bm25.add(chunk_id, chunk)
+                self.chunk_meta[chunk_id] = (doc_id, page, position)
+            info['chunk_ids'].extend(chunk_ids)
+            index_lines(chunks, start, self.keyword_index.setdefault(doc_id, {}))
+            # Earlier pages win: a field found on page 1 is not replaced by a later mention,
+            # though a different later value makes it ambiguous
+            merge_fields(self.fields.setdefault(doc_id, {}), extract_fields(chunks, pages, start))
+            return chunk_ids
+
+    def mark_complete(self, doc_id: str) -> None:
+        """Record that every page of a streamed document has been indexed."""
+        with self._lock:
+            if doc_id in self.documents:
+                self.documents[doc_id]['complete'] = True
+                self.index.train(min_training_vectors(self.index.index_type))
+
+    def is_complete(self, doc_id: str) -> bool:
+        info = self.documents.get(doc_id)
+        return info is not None and info['complete']
+
+    def add_record(self, record: dict, name: str) -> List[int]:
+        """Add a processed record from utils.document_cache, reusing its stored vectors and table rows."""
+        index = record['index']
+        chunk_ids = self.add_document(record['key'], name, record['chunks'], record.get('pages'),
+                                      embeddings=index.reconstruct_n(0, index.ntotal))
+        if record['key'] not in self.tables:
+            self.add_table_records(record['key'], record.get('tables') or [])
+        return chunk_ids
+
+    def add_table_records(self, doc_id: str, records: List[dict]) -> None:
+        """
+        Attach row-level table records to a document. Key/value rows from schedule
+        tables also fill any fields the line scan missed.
+        """
+        with self._lock:
+            doc_tables = self.tables.setdefault(doc_id, [])
+            doc_tables.extend(records)
+            doc_fields = self.fields.setdefault(doc_id, {})
+            nominees = [record for record in doc_tables if record['table'] == 'nominee']
+            if nominees:
+                # The nominee table is more reliable than a line scan, which can pick up its header row
+                doc_fields['nominee'] = {
+                    'field': 'nominee', 'label': 'Nominee', 'value': ", ".join(r['row']['name'] for r in nominees),
+                    'text': nominees[0]['row']['name'], 'line': nominees[0]['text'], 'position': None,
+                    'page': nominees[0]['page'], 'priority': 0, 'ambiguous': False,
+                }
+            schedule = [record for record in records if record['table'] == 'schedule']
+            found = extract_fields([record['text'] for record in schedule], [record['page'] for record in schedule])
+            for name, field in found.items():
+                # Positions refer to document lines; table rows have none
+                doc_fields.setdefault(name, dict(field, position=None))
+
+    def remove_document(self, doc_id: str) -> None:
+        with self._lock:
+            info = self.documents.pop(doc_id, None)
+            if info is None:
+                return
+            self.fields.pop(doc_id, None)
+            self.tables.pop(doc_id, None)
+            self.keyword_index.pop(doc_id, None)
+            self.index.remove(info['chunk_ids'])
+            for chunk_id in info['chunk_ids']:
+                self.bm25.remove(chunk_id)
+                self.chunk_meta.pop(chunk_id, None)
+
+    def _chunk_ids(self, doc_ids: Optional[Iterable[str]] = None) -> List[int]:
+        doc_ids = self.documents if doc_ids is None else doc_ids
+        return [chunk_id for doc_id in doc_ids if doc_id in self.documents
+                for chunk_id in self.documents[doc_id]['chunk_ids']]
+
+    def chunks(self, doc_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """Lines of the selected documents (all by default), document by document in reading order."""
+        return [self.index.texts[chunk_id] for chunk_id in self._chunk_ids(doc_ids)]
+
+    def document_fields(self, doc_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, Dict[str, dict]]]:
+        """(display name, extracted fields) for the selected documents (all by default), in upload order."""
+        doc_ids = set(self.documents if doc_ids is None else doc_ids)
+        return [(info['name'], self.fields.get(doc_id, {})) for doc_id, info in self.documents.items()
+                if doc_id in doc_ids]
+
+    def document_tables(self, doc_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, List[dict]]]:
+        """(display name, table records) for the selected documents (all by default), in upload order."""
+        doc_ids = set(self.documents if doc_ids is None else doc_ids)
+        return [(info['name'], self.tables.get(doc_id, [])) for doc_id, info in self.documents.items()
+                if doc_id in doc_ids]
+
+    def keyword_context(self, query: str, doc_ids: Optional[Iterable[str]] = None) -> Optional[Tuple[str, List[str]]]:
+        """
+        Context lines from the first keyword rule (utils.keyword_rules) the query triggers,
+        looked up in the per-document keyword index instead of rescanning every line.
+
+        Returns:
+            (rule label, context lines) or None if no rule matches the selected documents
+        """
+        with self._lock:
+            doc_ids = self.documents if doc_ids is None else doc_ids
+            documents = [(_DocumentLines(self, doc_id), self.keyword_index.get(doc_id, {}))
+                         for doc_id in doc_ids if doc_id in self.documents]
+            return keyword_context(query, documents)
+
+    def memory_report(self) -> dict:
+        """
+        Vector storage used by this corpus: the type actually in use ('index_type', which can
+        differ from the 'requested_type' while lines are staged or after a fallback),
+        index class, vector count and bytes.
+        """
+        doc_index = self.index
+        per_vector = doc_index.bytes_per_vector()
+        return {
+            "index_type": doc_index.storage_type or doc_index.index_type,
+            "requested_type": doc_index.index_type,
+            "index_class": describe_index(doc_index.index.index) if doc_index.index is not None else None,
+            "vectors": len(doc_index),
+            "bytes_per_vector": per_vector,
+            "vector_bytes": int(per_vector * len(doc_index)),
+        }
+
+    def source(self, chunk_id: int) -> str:
+        """Human-readable origin of a chunk, e.g. 'schedule.pdf p.2'."""
+        doc_id, page, _ = self.chunk_meta[chunk_id]
+        return f"{self.documents[doc_id]['name']} p.{page}"
+
+    def search(self, query: str, k: int = 3, window: int = 1, similarity_threshold: float = 0.1,
+               doc_ids: Optional[Iterable[str]] = None, candidates: int = 20,
+               with_sources: bool = False) -> Tuple[List[str], bool]:
+        """
+        Hybrid (BM25 + vector) search over the selected documents.
+
+        Args:
+            query: User query
+            k: Number of fused hits to keep
+            window: Lines of context on each side of a hit (never crossing into another document)
+            similarity_threshold: Minimum vector similarity for a vector hit to count
+            doc_ids: Restrict to these documents (default: all)
+            candidates: Hits taken from each retriever before fusion
+            with_sources: Prefix each line with '[file p.N]'
+
+        Returns:
+            Tuple of (context_lines, has_relevant_chunks)
+        """
+        with self._lock:
+            allowed = None if doc_ids is None else set(self._chunk_ids(doc_ids))
+            if allowed is not None and not allowed:
+                return [], False
+            lexical = [chunk_id for chunk_id, _ in self.bm25.search(query, candidates, allowed)]
+            vector = [chunk_id for chunk_id, _, _ in
+                      self.index.search(query, candidates, similarity_threshold, allowed)]
+            hits = reciprocal_rank_fusion([lexical, vector])[:k]
+
+            # Context windows are expanded per document, so they never cross into another one
+            hit_positions: Dict[str, List[int]] = {}
+            for chunk_id, _ in hits:
+                doc_id, _, position = self.chunk_meta[chunk_id]
+                hit_positions.setdefault(doc_id, []).append(position)
+            ordered = []
+            for doc_id in self.documents:
+                if doc_id in hit_positions:
+                    doc_chunk_ids = self.documents[doc_id]['chunk_ids']
+                    positions = expand_windows(hit_positions[doc_id], len(doc_chunk_ids), window)
+                    ordered.extend(doc_chunk_ids[position] for position in positions)
+            if with_sources:
+                lines = [f"[{self.source(chunk_id)}] {self.index.texts[chunk_id]}" for chunk_id in ordered]
+            else:
+                lines = [self.index.texts[chunk_id] for chunk_id in ordered]
+            return lines, len(lines) > 0
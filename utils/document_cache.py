@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import faiss
+from utils.embeddings import DEFAULT_MODEL_NAME, encoder_id
+from utils.index_cache import DEFAULT_CACHE_DIR
+from utils.index_factory import bytes_per_vector
+
+
+def document_key(pdf_bytes: bytes, model_name: str = DEFAULT_MODEL_NAME) -> str:
+    """Content address of an uploaded PDF: sha256 of its bytes, salted with the encoder name."""
+    digest = hashlib.sha256(pdf_bytes)
+    digest.update(b'\x00' + encoder_id(model_name).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def record_bytes(record: dict, index_resident: bool = True) -> int:
+    """
+    Estimated resident size of a cached record: the text of its lines and table rows,
+    plus the FAISS index's vector codes (see index_factory.bytes_per_vector) when
+    `index_resident`. An index read from disk is memory-mapped, so its pages belong
+    to the OS page cache and are not counted.
+    """
+    index = record.get('index') if index_resident else None
+    size = int(bytes_per_vector(index) * index.ntotal) if index is not None else 0
+    size += sum(len(chunk.encode('utf-8')) for chunk in record.get('chunks') or [])
+    size += 8 * len(record.get('pages') or [])
+    size += sum(len(row.get('text', '').encode('utf-8')) for row in record.get('tables') or [])
+    return size
+
+
+class DocumentCache:
+    """
+    Two-tier cache of processed PDFs keyed by document_key().
+
+    A cached record is a dict with 'key', 'chunks' (lines), 'pages' (1-based page
+    number of each line) and 'index' (FAISS index of the chunks). Everything except
+    the index is stored as record.json; the index as index.faiss.
+
+    The memory tier is an LRU shared by every session in the process; the disk tier
+    survives restarts. Entries older than `max_age_seconds` since last use are dropped,
+    and the least recently used entries are evicted once the disk tier exceeds `max_bytes`
+    or the memory tier exceeds `max_memory_bytes` (estimated, see `record_bytes`; indexes
+    loaded from the disk tier are memory-mapped and not counted) or `max_memory_entries`.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024,
+                 max_age_seconds: float = 7 * 24 * 3600, max_memory_entries: int = 32,
+                 max_memory_bytes: int = 128 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, 'documents')
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        # key -> (record, last used, estimated bytes)
+        self._memory: "OrderedDict[str, Tuple[dict, float, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached record for `key`, or None if not cached or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                record, last_used, size = entry
+                if now - last_used <= self.max_age_seconds:
+                    self._memory[key] = (record, now, size)
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    return record
+                self._forget(key)
+
+        entry_dir = self._entry_dir(key)
+        record_path = os.path.join(entry_dir, 'record.json')
+        index_path = os.path.join(entry_dir, 'index.faiss')
+        if not (os.path.exists(record_path) and os.path.exists(index_path)):
+            return None
+        if now - os.path.getmtime(entry_dir) > self.max_age_seconds:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        try:
+            with open(record_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            record['index'] = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"[document_cache] Dropping unreadable entry {key[:12]}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        self._touch(key, now)
+        self._remember(key, record, now, index_resident=False)
+        return record
+
+    def put(self, key: str, record: dict) -> None:
+        """Store a processed document in both tiers, then enforce the size and age limits."""
+        now = time.time()
+        record = dict(record, key=key)
+        self._remember(key, record, now)
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            with open(os.path.join(tmp_dir, 'record.json'), 'w', encoding='utf-8') as f:
+                json.dump({name: value for name, value in record.items() if name != 'index'}, f)
+            faiss.write_index(record['index'], os.path.join(tmp_dir, 'index.faiss'))
+            if os.path.exists(entry_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            # The memory tier still serves this process; disk is best-effort
+            print(f"[document_cache] Could not persist {key[:12]}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def _remember(self, key: str, record: dict, now: float, index_resident: bool = True) -> None:
+        size = record_bytes(record, index_resident)
+        with self._lock:
+            self._forget(key)
+            if size > self.max_memory_bytes:
+                return
+            self._memory[key] = (record, now, size)
+            self._memory_bytes += size
+            while len(self._memory) > self.max_memory_entries or self._memory_bytes > self.max_memory_bytes:
+                self._forget(next(iter(self._memory)))
+
+    def _forget(self, key: str) -> None:
+        """Drop `key` from the memory tier; the caller holds the lock."""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def memory_stats(self) -> dict:
+        """Entry count and estimated bytes of the memory tier."""
+        with self._lock:
+            return {'entries': len(self._memory), 'bytes': self._memory_bytes}
+
+    def _touch(self, key: str, now: float) -> None:
+        try:
+            os.utime(self._entry_dir(key), (now, now))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until the disk tier fits in `max_bytes`."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (_, used, _) in self._memory.items() if now - used > self.max_age_seconds]:
+                self._forget(key)
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            last_used = os.path.getmtime(path)
+            if now - last_used > self.max_age_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((last_used, size, name, path))
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, name, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._forget(name)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove every cached document from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+document_cache = DocumentCache()
+
@@ -0,0 +1,202 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import faiss
+import numpy as np
+from utils.embeddings import DEFAULT_MODEL_NAME, encode_queries, encode_texts
+from utils.index_factory import COMPACT_INDEX_TYPES, bytes_per_vector, index_type_of, new_index
+
+
+class DocumentIndex:
+    """
+    FAISS index wrapped in an IndexIDMap2 with the chunk texts kept alongside it,
+    so chunks can be added, removed and edited without rebuilding from scratch.
+
+    Ids are stable: removing a chunk never renumbers the others. Only text that is
+    not already in the index is embedded; duplicates reuse the stored vector.
+
+    `index_type` selects how vectors are stored: 'flat' (float32), 'sq8' (8-bit
+    scalar quantized, 4x smaller) or 'pq' (product quantized, ~32x smaller). The
+    compressed types are trained on the first batch that is added, unless it is added
+    with `train=False`: then vectors are staged in exact float32 storage until `train()`
+    has enough of them, so the quantizer is fitted to more than one page of a document.
+    """
+
+    def __init__(self, dim: Optional[int] = None, model_name: str = DEFAULT_MODEL_NAME,
+                 index_type: str = 'flat'):
+        if index_type not in COMPACT_INDEX_TYPES:
+            raise ValueError(f"DocumentIndex supports {COMPACT_INDEX_TYPES}, not '{index_type}'.")
+        self.model_name = model_name
+        self.index_type = index_type
+        self.dim = dim
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self.texts: Dict[int, str] = {}
+        self._ids_by_text: Dict[str, List[int]] = {}
+        self._next_id = 0
+        # True while a compressed index holds its vectors in exact storage, waiting for train()
+        self._staging = False
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_documents(cls, documents: List[str], model_name: str = DEFAULT_MODEL_NAME,
+                       index_type: str = 'flat') -> "DocumentIndex":
+        doc_index = cls(model_name=model_name, index_type=index_type)
+        doc_index.add(documents)
+        return doc_index
+
+    @classmethod
+    def from_index(cls, documents: List[str], index: faiss.Index, model_name: str = DEFAULT_MODEL_NAME,
+                   index_type: str = 'flat') -> "DocumentIndex":
+        """Wrap an existing positional index (e.g. from build_index) without re-embedding its chunks."""
+        doc_index = cls(index.d, model_name, index_type)
+        doc_index.add(documents, embeddings=index.reconstruct_n(0, index.ntotal))
+        return doc_index
+
+    def _create(self, training_vectors: np.ndarray) -> None:
+        self.dim = training_vectors.shape[1]
+        base = new_index(self.index_type, self.dim, len(training_vectors))
+        if not base.is_trained:
+            base.train(training_vectors)
+        self.index = faiss.IndexIDMap2(base)
+
+    @property
+    def storage_type(self) -> Optional[str]:
+        """
+        How vectors are stored right now: `index_type`, or 'flat' while staged for
+        training, or 'sq8' when too few vectors were there to train 'pq'. None before the first add.
+        """
+        return index_type_of(self.index) if self.index is not None else None
+
+    def bytes_per_vector(self) -> float:
+        """Resident bytes per stored chunk vector (code + id), 0 before the first add."""
+        return bytes_per_vector(self.index) if self.index is not None else 0.0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self.texts
+
+    def ids(self) -> List[int]:
+        return sorted(self.texts)
+
+    def get(self, doc_id: int) -> Optional[str]:
+        return self.texts.get(doc_id)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed only texts the index has not seen; reuse stored vectors for the rest."""
+        vectors: List[Optional[np.ndarray]] = []
+        missing: Dict[str, None] = {}
+        for text in texts:
+            known = self._ids_by_text.get(text)
+            if known and self.index is not None:
+                vectors.append(self.index.reconstruct(known[0]))
+            else:
+                vectors.append(None)
+                missing[text] = None
+        if missing:
+            encoded = dict(zip(missing, encode_texts(list(missing), self.model_name)))
+            vectors = [encoded[text] if vec is None else vec for text, vec in zip(texts, vectors)]
+        return np.vstack(vectors).astype('float32', copy=False)
+
+    def train(self, min_vectors: int = 1) -> bool:
+        """
+        Move vectors staged by `add(train=False)` into the requested compressed storage,
+        training its quantizer on all of them. Nothing happens while fewer than
+        `min_vectors` are staged.
+
+        Returns:
+            True once the index uses its requested storage
+        """
+        with self._lock:
+            if not self._staging:
+                return self.index is not None
+            if len(self.texts) < max(1, min_vectors):
+                return False
+            ids = faiss.vector_to_array(self.index.id_map).astype('int64')
+            vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+            self._create(vectors)
+            self.index.add_with_ids(vectors, ids)
+            self._staging = False
+            return True
+
+    def add(self, documents: List[str], embeddings: Optional[np.ndarray] = None, train: bool = True) -> List[int]:
+        """
+        Add chunks and return their new ids.
+        Pass `embeddings` when the vectors are already known (e.g. from a cache) to skip the encoder.
+        Pass `train=False` to stage the vectors of a compressed index that is not trained
+        yet, instead of training it on this batch alone (see `train`).
+        """
+        if not documents:
+            return []
+        with self._lock:
+            if embeddings is None:
+                embeddings = self._embed(documents)
+            embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+            if self.index is None:
+                if train or self.index_type == 'flat':
+                    self._create(embeddings)
+                else:
+                    self.dim = embeddings.shape[1]
+                    self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.dim))
+                    self._staging = True
+            ids = np.arange(self._next_id, self._next_id + len(documents), dtype='int64')
+            self.index.add_with_ids(embeddings, ids)
+            self._next_id += len(documents)
+            for doc_id, text in zip(ids.tolist(), documents):
+                self.texts[doc_id] = text
+                self._ids_by_text.setdefault(text, []).append(doc_id)
+            if train:
+                self.train()
+            return ids.tolist()
+
+    def remove(self, ids: Iterable[int]) -> int:
+        """Remove chunks by id; unknown ids are ignored. Returns the number removed."""
+        with self._lock:
+            ids = [doc_id for doc_id in ids if doc_id in self.texts]
+            if not ids:
+                return 0
+            self.index.remove_ids(np.asarray(ids, dtype='int64'))
+            for doc_id in ids:
+                text = self.texts.pop(doc_id)
+                same_text = self._ids_by_text[text]
+                same_text.remove(doc_id)
+                if not same_text:
+                    del self._ids_by_text[text]
+            return len(ids)
+
+    def update(self, doc_id: int, text: str) -> None:
+        """Replace the text of an existing chunk, keeping its id. Unchanged text is a no-op."""
+        with self._lock:
+            if doc_id not in self.texts:
+                raise KeyError(f"No chunk with id {doc_id}")
+            if self.texts[doc_id] == text:
+                return
+            vector = self._embed([text])
+            self.remove([doc_id])
+            self.index.add_with_ids(vector, np.asarray([doc_id], dtype='int64'))
+            self.texts[doc_id] = text
+            self._ids_by_text.setdefault(text, []).append(doc_id)
+
+    def search(self, query: str, k: int = 3, similarity_threshold: float = 0.0,
+               allowed_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, str, float]]:
+        """
+        Return up to k (id, text, similarity) hits, best first, with
+        similarity = 1 / (1 + L2 distance) as in search_document_chunks.
+        When `allowed_ids` is given, only those chunks are considered, still in a single index lookup.
+        """
+        if self.index is None or not self.texts:
+            return []
+        params = None
+        if allowed_ids is not None:
+            allowed = np.fromiter(allowed_ids, dtype='int64')
+            if not allowed.size:
+                return []
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed))
+        query_embedding = encode_queries([query], self.model_name)
+        distances, ids = self.index.search(query_embedding, min(k, len(self.texts)), params=params)
+        hits = []
+        for distance, doc_id in zip(distances[0], ids[0]):
+            similarity = float(1 / (1 + distance))
+            if doc_id != -1 and similarity >= similarity_threshold:
+                hits.append((int(doc_id), self.texts[int(doc_id)], similarity))
+        return hits
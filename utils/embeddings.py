@@ -0,0 +1,387 @@
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Inference backends for the encoder:
+#   torch - stock PyTorch SentenceTransformer (reference output)
+#   onnx  - ONNX Runtime via sentence-transformers (needs `optimum[onnxruntime]`)
+#   int8  - PyTorch with its Linear layers dynamically quantized to int8 (CPU only)
+# The model name may also be a local directory, e.g. a pre-exported ONNX model.
+ENCODER_BACKENDS = ('torch', 'onnx', 'int8')
+DEFAULT_BACKEND = os.getenv('POLICYPULSE_ENCODER_BACKEND', 'torch')
+# Optional ONNX file inside the model directory, e.g. 'onnx/model_qint8_avx512_vnni.onnx'
+ONNX_FILE_NAME = os.getenv('POLICYPULSE_ONNX_FILE')
+
+# Process-wide registry: each (encoder, backend) is loaded from disk once and
+# shared by every Streamlit session / thread in this process.
+_models: Dict[Tuple[str, str], 'SentenceTransformer'] = {}
+_warmed: set = set()
+# Guards the registry dicts only; each model loads under its own lock, so a load in
+# progress never blocks lookups, other models or starting the warm-up thread
+_registry_lock = threading.Lock()
+_load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_warm_lock = threading.Lock()
+_warm_thread: Optional[threading.Thread] = None
+
+# sentence_transformers (and torch with it) takes seconds to import, so it is imported on
+# the first model load rather than with this module; tests may replace it with a fake class
+SentenceTransformer = None
+
+
+def _model_class():
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        from sentence_transformers import SentenceTransformer as model_class
+        SentenceTransformer = model_class
+    return SentenceTransformer
+
+
+def _check_backend(backend: Optional[str]) -> str:
+    backend = backend or DEFAULT_BACKEND
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}'; expected one of {ENCODER_BACKENDS}")
+    return backend
+
+
+def _quantize_dynamic(model):
+    """Swap every torch.nn.Linear in `model` for an int8 dynamically quantized equivalent."""
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_model(model_name: str, backend: str) -> 'SentenceTransformer':
+    model_class = _model_class()
+    if backend == 'onnx':
+        model_kwargs = {'file_name': ONNX_FILE_NAME} if ONNX_FILE_NAME else None
+        return model_class(model_name, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+    if backend == 'int8':
+        return _quantize_dynamic(model_class(model_name, device='cpu'))
+    return model_class(model_name)
+
+
+def encoder_id(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> str:
+    """
+    Identity of the vectors an encoder produces, used to key caches. The torch backend
+    keeps the bare model name so existing cached indexes stay valid.
+    """
+    backend = _check_backend(backend)
+    return model_name if backend == 'torch' else f"{model_name}+{backend}"
+
+
+def get_model(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> 'SentenceTransformer':
+    """
+    Return the shared SentenceTransformer for `model_name` on `backend` (default:
+    POLICYPULSE_ENCODER_BACKEND), loading it on first use.
+    Loading is guarded by a per-model lock so concurrent sessions never load the same
+    model twice, while lookups of loaded models never wait for a load.
+    """
+    key = (model_name, _check_backend(backend))
+    model = _models.get(key)
+    if model is None:
+        with _registry_lock:
+            load_lock = _load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            model = _models.get(key)
+            if model is None:
+                model = _load_model(*key)
+                _models[key] = model
+    return model
+
+
+def warm_up(model_names: Iterable[str] = (DEFAULT_MODEL_NAME,)) -> None:
+    """
+    Load the given encoders and run one dummy encode so the first user query
+    does not pay for model loading or lazy initialisation. Safe to call on every rerun.
+    """
+    for name in model_names:
+        key = encoder_id(name)
+        if key in _warmed:
+            continue
+        get_model(name).encode(["warm up"], convert_to_numpy=True)
+        _warmed.add(key)
+
+
+def warm_up_in_background(model_names: Iterable[str] = (DEFAULT_MODEL_NAME,)) -> threading.Thread:
+    """
+    Start `warm_up` on a daemon thread (once per process) and return the thread, so a
+    fresh process can serve requests that need no encoder while the model loads. Never
+    waits for the load itself.
+    """
+    global _warm_thread
+    if _warm_thread is not None:
+        return _warm_thread
+    with _warm_lock:
+        if _warm_thread is None:
+            names = list(model_names)
+            _warm_thread = threading.Thread(target=warm_up, args=(names,), name='encoder-warm-up', daemon=True)
+            _warm_thread.start()
+        return _warm_thread
+
+
+def model_loaded(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> bool:
+    """True if `get_model` would return at once instead of loading (or waiting for) the encoder."""
+    return (model_name, _check_backend(backend)) in _models
+
+
+def loaded_models() -> List[str]:
+    """Return the encoder ids (see `encoder_id`) currently held by the registry."""
+    return [encoder_id(name, backend) for name, backend in _models]
+
+
+def clear_models() -> None:
+    """Drop all loaded encoders and cached query embeddings (mainly useful in tests)."""
+    global _warm_thread
+    with _registry_lock, _warm_lock:
+        _models.clear()
+        _warmed.clear()
+        _warm_thread = None
+    query_cache.clear()
+
+
+def encode_texts(texts: List[str], model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> np.ndarray:
+    """Embed a list of texts with the shared encoder and return a float32 matrix."""
+    embeddings = get_model(model_name, backend).encode(texts, convert_to_numpy=True)
+    return np.asarray(embeddings, dtype='float32')
+
+
+def backend_parity(texts: List[str], backend: str, model_name: str = DEFAULT_MODEL_NAME) -> dict:
+    """
+    Compare `backend` against the PyTorch reference on the same texts.
+
+    Returns:
+        Dict with the min and mean cosine similarity between paired embeddings
+    """
+    reference = encode_texts(texts, model_name, backend='torch')
+    candidate = encode_texts(texts, model_name, backend=backend)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosine = np.sum(reference * candidate, axis=1)
+    return {"backend": backend, "min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+
+
+def backend_throughput(texts: List[str], backend: str, model_name: str = DEFAULT_MODEL_NAME,
+                       batch_size: int = 32, repeats: int = 3) -> dict:
+    """
+    Measure encoding throughput of `backend` in sentences per second (best of `repeats`).
+    The model is loaded and warmed before timing.
+    """
+    model = get_model(model_name, backend)
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        best = min(best, time.perf_counter() - start)
+    return {"backend": backend, "sentences": len(texts), "seconds": best,
+            "sentences_per_second": len(texts) / best if best else float('inf')}
+
+
+def normalize_query(text: str) -> str:
+    """Canonical cache key for a query: lower-cased with whitespace collapsed (the default encoder is uncased)."""
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU of query embeddings shared by all sessions in the process.
+    Bounded both by number of entries and by total bytes of stored vectors.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        vector = np.array(vector, dtype='float32')
+        vector.setflags(write=False)
+        if vector.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return entry count, byte usage and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+query_cache = EmbeddingCache()
+
+
+class EmbeddingBatcher:
+    """
+    Background worker that coalesces encode requests from every session into batches.
+
+    Callers `submit` single texts and get a Future back. The worker thread takes the
+    first pending request, keeps collecting for up to `window_ms` (or until `max_batch`
+    texts), then runs one `encode` per (model, backend) group and resolves the futures.
+    With `window_ms=0` texts are encoded inline on the caller's thread.
+    """
+
+    def __init__(self, window_ms: float = 5.0, max_batch: int = 64):
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.batches = 0
+        self.texts = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, str, str, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str, model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> Future:
+        """Queue one text for encoding and return a Future resolving to its float32 vector."""
+        future: Future = Future()
+        backend = _check_backend(backend)
+        if self.window_ms <= 0:
+            try:
+                future.set_result(encode_texts([text], model_name, backend)[0])
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_worker()
+        self._queue.put((text, model_name, backend, future))
+        return future
+
+    def encode(self, texts: List[str], model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> np.ndarray:
+        """Submit `texts` and block until all of them are encoded; returns a float32 matrix."""
+        if self.window_ms <= 0:
+            return encode_texts(texts, model_name, backend)
+        futures = [self.submit(text, model_name, backend) for text in texts]
+        return np.vstack([future.result() for future in futures]).astype('float32', copy=False)
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000.0
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            groups: Dict[Tuple[str, str], list] = {}
+            for text, model_name, backend, future in self._collect(first):
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault((model_name, backend), []).append((text, future))
+            for (model_name, backend), requests in groups.items():
+                unique = list(dict.fromkeys(text for text, _ in requests))
+                try:
+                    vectors = dict(zip(unique, encode_texts(unique, model_name, backend)))
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+                    continue
+                self.batches += 1
+                self.texts += len(requests)
+                for text, future in requests:
+                    future.set_result(vectors[text])
+
+    def close(self) -> None:
+        """Stop the worker after it drains the requests already queued."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        """Return batches run, texts encoded and the mean batch size."""
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
+
+
+# Shared by all sessions; POLICYPULSE_QUERY_BATCH_MS=0 turns batching off.
+query_batcher = EmbeddingBatcher(window_ms=float(os.getenv('POLICYPULSE_QUERY_BATCH_MS', '5')))
+
+
+def encode_queries(queries: List[str], model_name: str = DEFAULT_MODEL_NAME) -> np.ndarray:
+    """
+    Embed user queries, serving repeats from `query_cache`.
+    A single cache miss goes through `query_batcher`, so concurrent sessions share encode
+    batches; several misses (e.g. from search_many) are already a batch and are encoded
+    in one `encode_texts` call.
+    """
+    model_key = encoder_id(model_name)
+    keys = [(model_key, normalize_query(q)) for q in queries]
+    vectors: List[Optional[np.ndarray]] = [query_cache.get(key) for key in keys]
+    missing: Dict[Tuple[str, str], str] = {}
+    for key, query, vector in zip(keys, queries, vectors):
+        if vector is None and key not in missing:
+            missing[key] = query
+    if missing:
+        texts = list(missing.values())
+        if len(texts) == 1:
+            encoded = query_batcher.encode(texts, model_name)
+        else:
+            encoded = encode_texts(texts, model_name)
+        fresh = dict(zip(missing, encoded))
+        for key, vector in fresh.items():
+            query_cache.put(key, vector)
+        vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+    return np.vstack(vectors).astype('float32', copy=False)
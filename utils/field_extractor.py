@@ -0,0 +1,373 @@
+import datetime
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Each field: display label, label patterns in priority order, value kind, and the
+# phrases that ask for it in a question. Kinds are parsed by the _parse_* functions.
+# Optional: 'qualified', the number of leading labels that say whose value it is (a
+# qualified label stating no valid value keeps the unqualified ones from answering),
+# and 'exclude', line context in which the unqualified labels belong to someone else.
+FIELD_SPECS: Dict[str, dict] = {
+    'policy_number': {
+        'label': 'Policy Number', 'kind': 'id',
+        'labels': [r"(?<!previous\s)policy\s*(?:(?:number|num|no)\b\.?|#)"],
+        'question': r"policy\s*(?:number|num|no)\b",
+    },
+    'sum_insured': {
+        'label': 'Sum Insured', 'kind': 'amount',
+        'labels': [r"(?:total\s+)?sum[\s_-]*(?:insured|assured)"],
+        'question': r"sum[\s_-]*(?:insured|assured)|cover(?:age)?\s+amount",
+    },
+    'premium': {
+        'label': 'Premium', 'kind': 'amount',
+        'labels': [r"total\s+premium(?:\s+amount)?(?:\s*\([^)]*\))?", r"(?:net\s+|gross\s+)?premium(?:\s+amount)?(?:\s*\([^)]*\))?"],
+        'question': r"\bpremium\b",
+    },
+    'nominee': {
+        'label': 'Nominee', 'kind': 'text',
+        'labels': [r"nominee(?:'s)?\s+name", r"name\s+of\s+(?:the\s+)?nominee", r"nominee(?!\s*(?:details|relationship|share|age|dob))"],
+        'question': r"\bnominee\b",
+    },
+    'gstin': {
+        'label': 'GSTIN', 'kind': 'gstin',
+        'labels': [r"(?:proposer|insured|policy\s*holder|customer)(?:'s)?\s+gstin(?:\s*/\s*uin)?(?:\s*(?:number|no)\b)?\.?",
+                   r"gstin(?:\s*/\s*uin)?(?:\s*(?:number|no)\b)?\.?", r"gst\s*(?:registration\s*)?(?:number|no)\b\.?"],
+        # A bare GSTIN next to the customer code or the insurer's details is the insurer's own
+        'qualified': 1, 'exclude': r"customer\s*code|insurer|insurance\s+co|\bltd\b|corporate\s+identity",
+        'question': r"\bgstin?\b",
+    },
+    'date_of_inception': {
+        'label': 'Date of Inception', 'kind': 'date',
+        'labels': [r"date\s+of\s+inception", r"inception\s+date", r"policy\s+start\s+date", r"start\s+date"],
+        'question': r"inception|start\s+date|policy\s+start",
+    },
+    'customer_code': {
+        'label': 'Customer Code', 'kind': 'id',
+        'labels': [r"customer\s*(?:code|id)"],
+        'question': r"customer\s*(?:code|id)\b",
+    },
+    'customer_name': {
+        'label': 'Customer Name', 'kind': 'text',
+        'labels': [r"customer\s*name"],
+        'question': r"customer\s*name",
+    },
+    'insured_name': {
+        'label': 'Insured Name', 'kind': 'text',
+        'labels': [r"insured(?:'s)?\s*name", r"name\s+of\s+(?:the\s+)?insured"],
+        'question': r"insured\s*name|name\s+of\s+(?:the\s+)?insured",
+    },
+    'policyholder': {
+        'label': 'Policyholder', 'kind': 'text',
+        'labels': [r"policy\s*holder(?:'s)?(?:\s*name)?"],
+        'question': r"policy\s*holder",
+    },
+    'proposer': {
+        'label': 'Proposer', 'kind': 'text',
+        'labels': [r"proposer(?:'s)?\s*name", r"name\s+of\s+(?:the\s+)?proposer"],
+        'question': r"\bproposer\b",
+    },
+    'email': {
+        'label': 'Email', 'kind': 'email',
+        'labels': [r"e-?mail(?:\s*(?:id|address))?"],
+        'question': r"\be-?mail\b",
+    },
+    'mobile': {
+        'label': 'Mobile', 'kind': 'phone',
+        'labels': [r"mobile\s*(?:(?:number|no)\b\.?)?", r"(?:phone|contact)\s*(?:(?:number|no)\b\.?)?"],
+        'question': r"\b(?:mobile|phone)\b",
+    },
+    'policy_category': {
+        'label': 'Policy Category', 'kind': 'text',
+        'labels': [r"policy\s*category"],
+        'question': r"policy\s*category",
+    },
+    'plan': {
+        'label': 'Plan', 'kind': 'text',
+        'labels': [r"(?:plan|product)\s*name"],
+        'question': r"\b(?:plan|product)\s*name\b",
+    },
+    'collection_number': {
+        'label': 'Collection Number', 'kind': 'id',
+        'labels': [r"collection\s*(?:number|no)\b\.?"],
+        'question': r"collection\s*(?:number|no)\b",
+    },
+    'collection_date': {
+        'label': 'Collection Date', 'kind': 'date',
+        'labels': [r"collection\s*date"],
+        'question': r"collection\s*date",
+    },
+}
+
+_LABEL_PATTERNS = {
+    name: [re.compile(r"(?<![a-z])" + pattern, re.IGNORECASE) for pattern in spec['labels']]
+    for name, spec in FIELD_SPECS.items()
+}
+_EXCLUDE_PATTERNS = {name: re.compile(spec['exclude'], re.IGNORECASE)
+                     for name, spec in FIELD_SPECS.items() if 'exclude' in spec}
+_ANY_LABEL = re.compile("|".join(f"(?:{p})" for spec in FIELD_SPECS.values() for p in spec['labels']), re.IGNORECASE)
+_QUESTION_PATTERNS = {name: re.compile(spec['question'], re.IGNORECASE) for name, spec in FIELD_SPECS.items()}
+_SEPARATOR = re.compile(r"^[\s:=\-–|]*")
+# Any "Label :" on a line, known field or not: up to four words ending in a colon. Words
+# start with a letter, so times (00:00) and amounts never count; URLs (http://) neither
+_GENERIC_LABEL = re.compile(r"(?<!\S)(?:\b[A-Za-z][\w.'/()&-]*\s+){0,3}\b[A-Za-z][\w.'/()&-]*\s*:(?!//)")
+
+_AMOUNT = re.compile(r"(?:rs\.?|inr|₹)?\s*(\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)", re.IGNORECASE)
+_ID = re.compile(r"\b(?=[A-Z0-9/\-]*\d)[A-Z0-9][A-Z0-9/\-]{3,}\b", re.IGNORECASE)
+_GSTIN = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]\b", re.IGNORECASE)
+_EMAIL = re.compile(r"[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)+")
+_PHONE = re.compile(r"(?:\+?91[\s\-]?)?\d(?:[\s\-]?\d){9}")
+_MONTHS = r"jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec"
+_DATE = re.compile(
+    rf"\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}[/\-.]\d{{1,2}}[/\-.]\d{{2,4}}"
+    rf"|\d{{1,2}}(?:st|nd|rd|th)?[\s\-](?:{_MONTHS})[a-z]*\.?[\s\-,]*\d{{2,4}}"
+    rf"|(?:{_MONTHS})[a-z]*\.?\s+\d{{1,2}},?\s+\d{{4}}",
+    re.IGNORECASE,
+)
+_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y',
+                 '%d %b %Y', '%d-%b-%Y', '%d %B %Y', '%d-%B-%Y', '%d %b %y', '%d-%b-%y',
+                 '%b %d %Y', '%B %d %Y')
+
+
+def _parse_amount(text: str) -> Optional[Tuple[float, str]]:
+    match = _AMOUNT.match(text.strip())
+    if not match:
+        return None
+    number = float(match.group(1).replace(',', ''))
+    return (int(number) if number.is_integer() else number), match.group(0).strip()
+
+
+def _parse_date(text: str) -> Optional[Tuple[datetime.date, str]]:
+    match = _DATE.match(text.strip())
+    if not match:
+        return None
+    raw = match.group(0)
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)", r"\1", raw, flags=re.IGNORECASE)
+    cleaned = re.sub(r"[,.]?\s+|\.(?=\s|\d)", " ", cleaned).replace('Sept', 'Sep').strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(cleaned, fmt).date(), raw
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_pattern(pattern: re.Pattern, text: str, normalise=None, anchored: bool = False):
+    """Find `pattern` in text (at its start if `anchored`); return (normalised value, raw text)."""
+    text = text.strip()
+    match = pattern.match(text) if anchored else pattern.search(text)
+    if not match:
+        return None
+    raw = match.group(0)
+    return (normalise(raw) if normalise else raw), raw
+
+
+def _parse_text(text: str) -> Optional[Tuple[str, str]]:
+    value = text.strip(" \t:;,.-–|")
+    # A colon means the text runs into another "Label :" whose start cannot be told apart
+    # from the value ("DHARMARAJ N WAGANNAVAR SAC Code : 997133"): leave it to the LLM
+    if not value or len(value) > 80 or ':' in value or not re.search(r"[A-Za-z]", value):
+        return None
+    return value, value
+
+
+_PARSERS = {
+    'amount': _parse_amount,
+    'date': _parse_date,
+    'id': lambda text: _parse_pattern(_ID, text, str.upper, anchored=True),
+    'gstin': lambda text: _parse_pattern(_GSTIN, text, str.upper),
+    'email': lambda text: _parse_pattern(_EMAIL, text, str.lower),
+    'phone': lambda text: _parse_pattern(_PHONE, text, lambda raw: re.sub(r"\D", "", raw)[-10:]),
+    'text': _parse_text,
+}
+
+
+def _value_segment(line: str, label_end: int, kind: str) -> str:
+    """
+    Text after a label, up to the next label on the same line (table-style rows): a
+    field label, or any other "Label :". Text values are cut at field labels only, since
+    where an unknown label begins is a guess; _parse_text rejects what still has a colon.
+    """
+    rest = line[label_end:]
+    rest = rest[_SEPARATOR.match(rest).end():]
+    following = _ANY_LABEL.search(rest)
+    if following and following.start() > 0:
+        rest = rest[:following.start()]
+    if kind != 'text':
+        generic = _GENERIC_LABEL.search(rest, 1)
+        if generic:
+            rest = rest[:generic.start()]
+    return rest
+
+
+def extract_fields(lines: List[str], pages: Optional[List[int]] = None, start: int = 0) -> Dict[str, dict]:
+    """
+    Find the fields in FIELD_SPECS in document lines.
+
+    Each line is checked once against every field's label patterns. A value is read from
+    the text after its label on the same line (stopping at the next label, so
+    'Policy No. 123 Customer Code C9' yields both), or from the next line when the label
+    stands alone. Per field, the highest-priority label pattern with a parseable value
+    wins, earliest line first. When that label gives different values in different
+    places (e.g. an 'Email' for the customer and one for the insurer's helpdesk), the
+    field is returned with 'ambiguous': True and is not used for direct answers. So is a
+    field whose qualified label states no valid value ('Proposer GSTIN : NO'), with
+    'value' None, rather than a value found under an unqualified label.
+
+    Args:
+        lines: Document lines in reading order
+        pages: 1-based page number per line (defaults to page 1)
+        start: Position of lines[0] within the whole document
+
+    Returns:
+        {field: {'field', 'label', 'value', 'text', 'line', 'position', 'page', 'priority',
+        'ambiguous'}} where 'value' is typed (int/float amounts, datetime.date dates,
+        normalised ids), 'text' is the value as written, 'line' the source line and
+        'priority' the index of the label pattern that matched.
+    """
+    pages = pages or [1] * len(lines)
+    # field -> (label priority, [(value, raw text, source line index), ...])
+    candidates: Dict[str, Tuple[int, list]] = {}
+    # field -> (label priority, stated text, source line index) of a qualified label without a valid value
+    declared: Dict[str, Tuple[int, str, int]] = {}
+    for i, line in enumerate(lines):
+        for name, patterns in _LABEL_PATTERNS.items():
+            kind = FIELD_SPECS[name]['kind']
+            qualified = FIELD_SPECS[name].get('qualified', 0)
+            exclude = _EXCLUDE_PATTERNS.get(name)
+            for priority, pattern in enumerate(patterns):
+                best = candidates.get(name)
+                if best is not None and best[0] < priority:
+                    break
+                if priority >= qualified and exclude is not None and exclude.search(line):
+                    break
+                match = pattern.search(line)
+                if not match:
+                    continue
+                segment = _value_segment(line, match.end(), kind)
+                source = i
+                if not segment.strip() and i + 1 < len(lines) and not _ANY_LABEL.match(lines[i + 1]):
+                    segment, source = lines[i + 1], i + 1
+                parsed = _PARSERS[kind](segment)
+                if parsed is None:
+                    if priority < qualified and name not in declared:
+                        declared[name] = (priority, segment.strip(), source)
+                    continue
+                if best is None or priority < best[0]:
+                    candidates[name] = best = (priority, [])
+                best[1].append((parsed[0], parsed[1], source))
+                break
+    fields: Dict[str, dict] = {}
+    for name, (priority, text, source) in declared.items():
+        if name not in candidates or candidates[name][0] > priority:
+            candidates.pop(name, None)
+            fields[name] = {
+                'field': name, 'label': FIELD_SPECS[name]['label'], 'value': None, 'text': text,
+                'line': lines[source], 'position': start + source, 'page': pages[source],
+                'priority': priority, 'ambiguous': True,
+            }
+    for name, (priority, found) in candidates.items():
+        value, raw, source = found[0]
+        fields[name] = {
+            'field': name,
+            'label': FIELD_SPECS[name]['label'],
+            'value': value,
+            'text': raw,
+            'line': lines[source],
+            'position': start + source,
+            'page': pages[source],
+            'priority': priority,
+            'ambiguous': any(other != value for other, _, _ in found[1:]),
+        }
+    return fields
+
+
+def merge_fields(doc_fields: Dict[str, dict], found: Dict[str, dict]) -> None:
+    """
+    Add fields found in more of a document to the ones already known (in place), with
+    the precedence extract_fields uses within one scan: a higher-priority label replaces
+    a known value, a lower-priority one is ignored, and for the same label the earlier
+    find wins but a different later value makes the field ambiguous.
+    """
+    for name, field in found.items():
+        known = doc_fields.get(name)
+        if known is None or field['priority'] < known['priority']:
+            doc_fields[name] = field
+        elif field['priority'] == known['priority'] and (field['ambiguous'] or known['value'] != field['value']):
+            known['ambiguous'] = True
+
+
+# Words that may surround a field name in a direct question ("what is my policy number?")
+_FILLER_WORDS = {
+    'what', 'whats', 's', 'is', 'are', 'was', 'my', 'the', 'a', 'an', 'of', 'for', 'me', 'tell', 'show',
+    'give', 'please', 'pls', 'kindly', 'your', 'our', 'this', 'that', 'in', 'on', 'per', 'as', 'policy',
+    'document', 'documents', 'uploaded', 'who', 'which', 'when', 'does', 'do', 'did', 'name', 'number',
+    'no', 'amount', 'value', 'details', 'mentioned', 'listed', 'stated', 'i', 'to', 'know', 'can', 'could',
+    'you', 'find', 'get', 'it', 'its', 'and', 'date', 'id', 'address', 'current', 'total', 'exact',
+}
+
+
+def match_field_question(query: str) -> List[str]:
+    """
+    Return the fields a query asks for directly (e.g. 'What is my policy number?'),
+    or [] when the query needs more than a lookup ('Can I change my nominee?').
+    """
+    fields, rest = [], query.lower()
+    for name, pattern in _QUESTION_PATTERNS.items():
+        if pattern.search(rest):
+            fields.append(name)
+            rest = pattern.sub(' ', rest)
+    if not fields:
+        return []
+    leftover = [word for word in re.findall(r"[a-z]+", rest) if word not in _FILLER_WORDS]
+    return [] if leftover else fields
+
+
+def format_value(field: dict) -> str:
+    """Display form of an extracted value (dates as DD/MM/YYYY, amounts with Indian grouping)."""
+    value = field['value']
+    if isinstance(value, datetime.date):
+        return value.strftime('%d/%m/%Y')
+    if field['field'] in ('sum_insured', 'premium'):
+        return f"₹{_indian_grouping(value)}"
+    return str(value)
+
+
+def _indian_grouping(amount) -> str:
+    whole, _, fraction = (f"{amount:.2f}" if isinstance(amount, float) else f"{amount}").partition('.')
+    head, tail = whole[:-3], whole[-3:]
+    while len(head) > 2:
+        tail = f"{head[-2:]},{tail}"
+        head = head[:-2]
+    grouped = f"{head},{tail}" if head else tail
+    return f"{grouped}.{fraction}" if fraction else grouped
+
+
+def answer_field_question(query: str, documents: Iterable[Tuple[str, Dict[str, dict]]]) -> Optional[Tuple[str, str]]:
+    """
+    Answer a direct field question from extracted fields, without the LLM.
+
+    Args:
+        query: User question
+        documents: (document display name, extracted fields) pairs to answer from
+
+    Returns:
+        (reply, rationale), or None if the query is not a direct field question or
+        any requested field is missing (or ambiguous) in every document
+    """
+    wanted = match_field_question(query)
+    if not wanted:
+        return None
+    documents = list(documents)
+    lines, sources = [], []
+    for name in wanted:
+        found = [(doc_name, fields[name]) for doc_name, fields in documents
+                 if name in fields and not fields[name].get('ambiguous')]
+        if not found:
+            return None
+        for doc_name, field in found:
+            suffix = f" ({doc_name})" if len(found) > 1 else ""
+            lines.append(f"**{field['label']}**{suffix}: {format_value(field)}")
+            sources.append(f"{doc_name} p.{field['page']}: \"{field['line']}\"")
+    reply = "\n\n".join(lines)
+    rationale = "Answered directly from the uploaded document — " + "; ".join(sources)
+    return reply, rationale
@@ -0,0 +1,107 @@
+import glob
+import hashlib
+import os
+from typing import List, Optional
+import faiss
+import numpy as np
+from utils.embeddings import DEFAULT_MODEL_NAME, encode_texts, encoder_id
+from utils.index_factory import DEFAULT_INDEX_TYPE
+from utils.vector_store import index_from_embeddings
+
+DEFAULT_CACHE_DIR = os.getenv(
+    'POLICYPULSE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'),
+)
+
+
+def corpus_fingerprint(documents: List[str], model_name: str = DEFAULT_MODEL_NAME) -> str:
+    """
+    Return a sha256 hex digest identifying this exact list of documents embedded with `model_name`.
+    Any edit, reorder, addition or encoder change produces a new fingerprint.
+    """
+    digest = hashlib.sha256()
+    digest.update(encoder_id(model_name).encode('utf-8'))
+    for doc in documents:
+        digest.update(b'\x00')
+        digest.update(doc.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _artifact_paths(name: str, fingerprint: str, cache_dir: str, index_type: str = 'flat'):
+    # The embedding matrix is shared by every index type; only the .faiss file is type-specific
+    stem = os.path.join(cache_dir, f"{name}-{fingerprint[:16]}")
+    return f"{stem}.{index_type}.faiss", stem + '.npy'
+
+
+def _remove_stale(name: str, keep: List[str], cache_dir: str) -> None:
+    """Delete older artifacts for `name` so the cache directory does not grow on every KB edit."""
+    for path in glob.glob(os.path.join(cache_dir, f"{name}-*")):
+        if path not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write to a temp file and rename, so concurrent workers never read a half-written artifact."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_or_build_embeddings(documents: List[str], model_name: str = DEFAULT_MODEL_NAME,
+                             cache_dir: Optional[str] = None, name: str = 'kb') -> np.ndarray:
+    """
+    Return the (n, dim) embedding matrix for `documents`, memory-mapped from the
+    `.npy` artifact when one exists for the current fingerprint; otherwise encode and persist it.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    fingerprint = corpus_fingerprint(documents, model_name)
+    _, emb_path = _artifact_paths(name, fingerprint, cache_dir)
+    if os.path.exists(emb_path):
+        return np.load(emb_path, mmap_mode='r')
+    os.makedirs(cache_dir, exist_ok=True)
+    embeddings = encode_texts(documents, model_name)
+    # np.save appends '.npy' to names without it, so write through a file handle
+    def _save(path):
+        with open(path, 'wb') as f:
+            np.save(f, embeddings)
+    _write_atomic(emb_path, _save)
+    return embeddings
+
+
+def load_or_build_index(documents: List[str], model_name: str = DEFAULT_MODEL_NAME,
+                        cache_dir: Optional[str] = None, name: str = 'kb',
+                        index_type: Optional[str] = None, **index_params) -> faiss.Index:
+    """
+    Load the FAISS index for `documents` from disk (memory-mapped) when the KB text and
+    encoder are unchanged; otherwise embed, build, and write both the index and the
+    embedding matrix keyed by the new fingerprint.
+
+    Args:
+        documents: Texts to index, in order (positions are the FAISS ids)
+        model_name: Encoder name; part of the cache key
+        cache_dir: Directory for artifacts (defaults to POLICYPULSE_CACHE_DIR or ./.cache)
+        name: Artifact prefix, so several corpora can share a directory
+        index_type: Index type passed to index_from_embeddings; part of the index file name
+        **index_params: Build/search parameters forwarded to the index factory
+
+    Returns:
+        A FAISS index equivalent to build_index(documents, model_name)
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    index_type = (index_type or DEFAULT_INDEX_TYPE).lower()
+    fingerprint = corpus_fingerprint(documents, model_name)
+    index_path, emb_path = _artifact_paths(name, fingerprint, cache_dir, index_type)
+    if os.path.exists(index_path):
+        try:
+            return faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+        except RuntimeError as e:
+            print(f"[index_cache] Could not read {index_path}: {e}. Rebuilding.")
+
+    embeddings = load_or_build_embeddings(documents, model_name, cache_dir, name)
+    index = index_from_embeddings(embeddings, index_type, **index_params)
+    _write_atomic(index_path, lambda path: faiss.write_index(index, path))
+    _remove_stale(name, [index_path, emb_path], cache_dir)
+    return index
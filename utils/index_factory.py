@@ -0,0 +1,206 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'hnsw', 'ivf_pq', 'sq8', 'pq')
+# Types that store codes in a flat array, so they support remove_ids/reconstruct (usable by DocumentIndex)
+COMPACT_INDEX_TYPES = ('flat', 'sq8', 'pq')
+DEFAULT_INDEX_TYPE = os.getenv('POLICYPULSE_INDEX_TYPE', 'flat')
+
+# Search-time defaults; both can be overridden per index with set_search_params()
+DEFAULT_NPROBE = int(os.getenv('POLICYPULSE_NPROBE', '8'))
+DEFAULT_EF_SEARCH = int(os.getenv('POLICYPULSE_EF_SEARCH', '64'))
+
+
+def _default_nlist(n: int) -> int:
+    """Rule of thumb: about 4*sqrt(n) inverted lists, never more than there are vectors."""
+    return max(1, min(n, int(4 * np.sqrt(n))))
+
+
+def _default_pq_m(dim: int) -> int:
+    """Pick the number of PQ sub-quantizers: the largest divisor of dim giving >= 8 dims per sub-vector."""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def min_training_vectors(index_type: str, pq_bits: int = 8) -> int:
+    """Fewest training vectors `new_index` accepts for `index_type` without falling back to a simpler type."""
+    return 2 ** pq_bits if index_type.lower() in ('ivf_pq', 'pq') else 1
+
+
+def new_index(index_type: str, dim: int, n_train: int, nlist: Optional[int] = None,
+              hnsw_m: int = 32, ef_construction: int = 80, pq_m: Optional[int] = None,
+              pq_bits: int = 8) -> faiss.Index:
+    """
+    Construct an empty FAISS L2 index of `index_type` for `n_train` training vectors.
+    The caller trains it when `index.is_trained` is False. Types whose quantizer
+    cannot be trained on that few vectors fall back to the next simpler type.
+    """
+    index_type = index_type.lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+    if index_type in ('ivf_pq', 'pq'):
+        pq_m = pq_m or _default_pq_m(dim)
+        if dim % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}.")
+        if n_train < min_training_vectors(index_type, pq_bits):
+            # PQ codebooks need at least 2**pq_bits training vectors
+            fallback = 'ivf_flat' if index_type == 'ivf_pq' else 'sq8'
+            logger.warning("%d vectors are too few to train %s; using %s.", n_train, index_type, fallback)
+            index_type = fallback
+
+    if index_type == 'flat':
+        return faiss.IndexFlatL2(dim)
+    if index_type == 'sq8':
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    if index_type == 'pq':
+        return faiss.IndexPQ(dim, pq_m, pq_bits)
+    if index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+    nlist = min(nlist or _default_nlist(n_train), max(1, n_train))
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == 'ivf_flat':
+        return faiss.IndexIVFFlat(quantizer, dim, nlist)
+    return faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+
+
+def create_index(embeddings: np.ndarray, index_type: Optional[str] = None, nlist: Optional[int] = None,
+                 hnsw_m: int = 32, ef_construction: int = 80, pq_m: Optional[int] = None,
+                 pq_bits: int = 8, nprobe: Optional[int] = None,
+                 ef_search: Optional[int] = None) -> faiss.Index:
+    """
+    Build a FAISS L2 index of the requested type over `embeddings`, training it first if needed.
+
+    Args:
+        embeddings: (n, dim) float32 matrix; row positions become the FAISS ids
+        index_type: One of INDEX_TYPES (defaults to POLICYPULSE_INDEX_TYPE, else 'flat')
+        nlist: Inverted lists for the IVF variants (default ~4*sqrt(n))
+        hnsw_m: Graph degree for HNSW
+        ef_construction: HNSW build-time beam width
+        pq_m: Sub-quantizers for IVF-PQ and PQ (default: dim / 8 or the nearest divisor)
+        pq_bits: Bits per PQ code
+        nprobe: Lists scanned per IVF query (default POLICYPULSE_NPROBE)
+        ef_search: HNSW search beam width (default POLICYPULSE_EF_SEARCH)
+
+    Returns:
+        A trained, populated index. Corpora too small to train the requested
+        quantizer fall back to the next simpler type rather than failing.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    n, dim = embeddings.shape
+    index = new_index(index_type or DEFAULT_INDEX_TYPE, dim, n, nlist=nlist, hnsw_m=hnsw_m,
+                      ef_construction=ef_construction, pq_m=pq_m, pq_bits=pq_bits)
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> faiss.Index:
+    """
+    Tune the recall/latency trade-off of an existing index in place.
+    IVF indexes take `nprobe`, HNSW indexes take `ef_search`; other types ignore both.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe or DEFAULT_NPROBE, ivf.nlist)
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, 'hnsw'):
+        hnsw_index.hnsw.efSearch = ef_search or DEFAULT_EF_SEARCH
+    return index
+
+
+def describe_index(index: faiss.Index) -> str:
+    """Short human-readable name of the index type, e.g. 'IndexIVFFlat'."""
+    return type(faiss.downcast_index(index)).__name__
+
+
+# describe_index() class name -> index type, the inverse of new_index()
+_TYPE_BY_CLASS = {
+    'IndexFlatL2': 'flat', 'IndexIVFFlat': 'ivf_flat', 'IndexHNSWFlat': 'hnsw',
+    'IndexIVFPQ': 'ivf_pq', 'IndexScalarQuantizer': 'sq8', 'IndexPQ': 'pq',
+}
+
+
+def index_type_of(index: faiss.Index) -> Optional[str]:
+    """
+    The INDEX_TYPES name of an index as actually built (after any fallback in
+    new_index), looking through an IDMap wrapper. None for classes new_index never builds.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = index.index
+    return _TYPE_BY_CLASS.get(describe_index(index))
+
+
+def bytes_per_vector(index: faiss.Index) -> float:
+    """
+    Approximate resident bytes per stored vector: the code size, plus the 8-byte id
+    for ID-mapped indexes. Graph links and IVF list overheads are not counted.
+    """
+    index = faiss.downcast_index(index)
+    overhead = 0
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        overhead = 8
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    code_size = getattr(index, 'code_size', None)
+    if code_size is None:
+        code_size = index.sa_code_size()
+    return float(code_size + overhead)
+
+
+def benchmark_index_types(embeddings: np.ndarray, queries: np.ndarray, k: int = 10,
+                          index_types: Optional[List[str]] = None, **params) -> List[Dict]:
+    """
+    Compare index types against the exact IndexFlatL2 on the same data.
+
+    Args:
+        embeddings: (n, dim) corpus matrix
+        queries: (q, dim) query matrix
+        k: Neighbours per query used for recall@k
+        index_types: Types to compare (default: all of INDEX_TYPES)
+        **params: Forwarded to create_index (nlist, nprobe, ef_search, ...)
+
+    Returns:
+        One dict per type with build_seconds, ms_per_query, bytes_per_vector and
+        recall_at_k (fraction of the exact top-k that the approximate index also returned).
+    """
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    exact = create_index(embeddings, 'flat')
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type in index_types or list(INDEX_TYPES):
+        start = time.perf_counter()
+        index = create_index(embeddings, index_type, **params)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        search_seconds = time.perf_counter() - start
+
+        hits = sum(len(set(t[t >= 0]) & set(f[f >= 0])) for t, f in zip(truth, found))
+        expected = int((truth >= 0).sum())
+        results.append({
+            "index_type": index_type,
+            "index_class": describe_index(index),
+            "bytes_per_vector": bytes_per_vector(index),
+            "build_seconds": build_seconds,
+            "ms_per_query": 1000 * search_seconds / len(queries),
+            "recall_at_k": hits / float(expected) if expected else 1.0,
+        })
+    return results
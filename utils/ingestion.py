@@ -0,0 +1,243 @@
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from utils.corpus import SessionCorpus
+from utils.document_cache import DocumentCache, document_cache, document_key
+from utils.embeddings import DEFAULT_MODEL_NAME, encode_texts
+from utils.pdf_processor import iter_pdf_pages_with_tables, split_text_by_lines
+from utils.table_extractor import extract_table_records
+from utils.vector_store import index_from_embeddings
+
+
+class PageIngestor:
+    """
+    Streams one uploaded PDF into a SessionCorpus page by page: each page is extracted,
+    split into lines, embedded and appended to the corpus before the next page is read,
+    so questions can be answered against the pages indexed so far.
+
+    `run()` is a generator yielding (pages_done, page_count) after every page. It can be
+    abandoned part-way (e.g. a Streamlit rerun) and called again later; it resumes after
+    the last indexed page. Once every page is indexed the document is stored in the
+    document cache, and a repeat upload of the same bytes is added in one step.
+    """
+
+    def __init__(self, pdf_bytes: bytes, name: str, corpus: SessionCorpus,
+                 cache: Optional[DocumentCache] = None, model_name: str = DEFAULT_MODEL_NAME):
+        self.pdf_bytes = pdf_bytes
+        self.name = name
+        self.corpus = corpus
+        self.cache = cache or document_cache
+        self.model_name = model_name
+        self.key = document_key(pdf_bytes, model_name)
+        self.pages_done = 0
+        self.page_count: Optional[int] = None
+        self.error: Optional[str] = None
+        self._chunks: List[str] = []
+        self._pages: List[int] = []
+        self._vectors: List[np.ndarray] = []
+        self._tables: List[dict] = []
+
+    @property
+    def done(self) -> bool:
+        return self.error is not None or self.corpus.is_complete(self.key)
+
+    @property
+    def progress(self) -> float:
+        """Fraction of pages indexed, between 0 and 1."""
+        if self.done:
+            return 1.0
+        return self.pages_done / self.page_count if self.page_count else 0.0
+
+    def run(self) -> Iterator[Tuple[int, int]]:
+        """Index the remaining pages, yielding (pages_done, page_count) after each one."""
+        if self.done:
+            return
+        if self.pages_done == 0:
+            cached = self.cache.get(self.key)
+            if cached is not None:
+                self.corpus.add_record(cached, self.name)
+                self.pages_done = self.page_count = max(cached['pages'], default=1)
+                yield self.pages_done, self.page_count
+                return
+        try:
+            for page_no, page_count, text, tables in iter_pdf_pages_with_tables(io.BytesIO(self.pdf_bytes),
+                                                                                 self.pages_done + 1):
+                self.page_count = page_count
+                self._index_page(page_no, text, tables)
+                self.pages_done = page_no
+                yield self.pages_done, page_count
+        except Exception as e:
+            self.error = f"Error extracting text from PDF: {e}"
+            return
+        self._finish()
+
+    def _index_page(self, page_no: int, text: str, tables: Optional[list] = None) -> None:
+        lines = split_text_by_lines(text)
+        if not lines:
+            return
+        vectors = encode_texts(lines, self.model_name)
+        self.corpus.extend_document(self.key, self.name, lines, [page_no] * len(lines), embeddings=vectors)
+        self._chunks.extend(lines)
+        self._pages.extend([page_no] * len(lines))
+        self._vectors.append(vectors)
+        # Table rows (e.g. nominee details) become row-level records for direct lookup
+        records = extract_table_records(tables or [], page_no)
+        if records:
+            self.corpus.add_table_records(self.key, records)
+            self._tables.extend(records)
+
+    def _finish(self) -> None:
+        if not self._chunks:
+            self.error = "No text content found in the uploaded PDF."
+            return
+        self.corpus.mark_complete(self.key)
+        record = {'key': self.key, 'chunks': self._chunks, 'pages': self._pages, 'tables': self._tables,
+                  'index': index_from_embeddings(np.vstack(self._vectors))}
+        self.cache.put(self.key, record)
+        # Nothing left to resume: release the upload and the float32 copies
+        self.pdf_bytes = b""
+        self._vectors = []
+
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+ACTIVE_JOB_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+INGEST_WORKERS = int(os.getenv('POLICYPULSE_INGEST_WORKERS', '2'))
+# Finished jobs are kept this long for polling, then dropped with their corpus reference
+JOB_RETENTION_SECONDS = 3600
+
+
+class IngestionJob:
+    """One upload being indexed by the IngestionManager."""
+
+    def __init__(self, job_id: str, ingestor: PageIngestor):
+        self.id = job_id
+        self.ingestor = ingestor
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = threading.Event()
+
+    def snapshot(self) -> dict:
+        """Point-in-time view of the job for polling."""
+        return {
+            "id": self.id,
+            "name": self.ingestor.name,
+            "doc_id": self.ingestor.key,
+            "status": self.status,
+            "pages_done": self.ingestor.pages_done,
+            "page_count": self.ingestor.page_count,
+            "progress": self.ingestor.progress if self.status != JOB_CANCELLED else 0.0,
+            "error": self.error,
+        }
+
+
+class IngestionManager:
+    """
+    Runs PageIngestors on a bounded thread pool so uploads return immediately.
+
+    `submit` returns a job id; `status` polls progress; `cancel` stops a job between
+    pages. A cancelled or failed job drops whatever it had indexed. Submitting the same bytes to the same
+    corpus while a job is queued, running or done returns the existing job id, so a
+    rerun never reprocesses a file.
+    """
+
+    def __init__(self, max_workers: int = INGEST_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pdf_bytes: bytes, name: str, corpus: SessionCorpus,
+               cache: Optional[DocumentCache] = None, model_name: str = DEFAULT_MODEL_NAME) -> str:
+        """Queue an upload for indexing into `corpus` and return its job id."""
+        key = document_key(pdf_bytes, model_name)
+        with self._lock:
+            self._prune(time.time())
+            for job in self._jobs.values():
+                ingestor = job.ingestor
+                if ingestor.corpus is corpus and ingestor.key == key and job.status not in (JOB_FAILED, JOB_CANCELLED):
+                    return job.id
+            job = IngestionJob(uuid.uuid4().hex, PageIngestor(pdf_bytes, name, corpus, cache, model_name))
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def _run(self, job: IngestionJob) -> None:
+        if job.cancel_requested.is_set():
+            job.status = JOB_CANCELLED
+            return
+        job.status = JOB_RUNNING
+        try:
+            for _ in job.ingestor.run():
+                if job.cancel_requested.is_set():
+                    break
+        except Exception as e:
+            job.error = f"Indexing failed: {e}"
+        if job.cancel_requested.is_set():
+            job.status = JOB_CANCELLED
+        else:
+            job.error = job.error or job.ingestor.error
+            job.status = JOB_FAILED if job.error else JOB_DONE
+        if job.status != JOB_DONE:
+            # Pages indexed before a cancel or failure must not stay searchable as if complete
+            job.ingestor.corpus.remove_document(job.ingestor.key)
+        job.finished_at = time.time()
+
+    def _prune(self, now: float) -> None:
+        for job_id in [job.id for job in self._jobs.values()
+                       if job.finished_at is not None and now - job.finished_at > JOB_RETENTION_SECONDS]:
+            del self._jobs[job_id]
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """Return the job's snapshot, or None for an unknown (or forgotten) id."""
+        job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a queued or running job to stop. Returns False if it had already finished."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in ACTIVE_JOB_STATES:
+            return False
+        job.cancel_requested.set()
+        return True
+
+    def forget(self, job_id: str) -> None:
+        """Cancel the job if still active and drop its record."""
+        self.cancel(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def active_jobs(self) -> List[str]:
+        return [job.id for job in list(self._jobs.values()) if job.status in ACTIVE_JOB_STATES]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_seconds: float = 0.05) -> Optional[dict]:
+        """Block until the job leaves the queued/running states (or `timeout`); return its snapshot."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.status(job_id)
+            if snapshot is None or snapshot['status'] not in ACTIVE_JOB_STATES:
+                return snapshot
+            if deadline is not None and time.monotonic() >= deadline:
+                return snapshot
+            time.sleep(poll_seconds)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancel every active job and stop the worker threads."""
+        for job_id in self.active_jobs():
+            self.cancel(job_id)
+        self._executor.shutdown(wait=wait)
+
+
+# Shared by every session in the process, so the worker bound applies server-wide
+ingestion_manager = IngestionManager()
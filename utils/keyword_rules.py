@@ -0,0 +1,167 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Keyword rules for document questions, in priority order: the first rule whose query
+# keywords appear in the question and whose line keywords appear in the document wins.
+# Each rule sends the matching lines plus `before`/`after` neighbours (at most `limit`
+# distinct lines) to the LLM as context. Keywords are plain substrings of the
+# normalised text (lower case, runs of space/_/- collapsed to one space).
+KEYWORD_RULES: List[dict] = [
+    {'label': 'customer name', 'query': ('customer name',), 'lines': ('customer name',)},
+    {'label': 'insured name', 'query': ('insured name',), 'lines': ('insured name',)},
+    {'label': 'policyholder', 'query': ('policyholder',), 'lines': ('policyholder',)},
+    # 'nominee details' starts a section: the header plus up to 5 following table rows
+    {'label': 'nominee', 'query': ('nominee',), 'lines': ('nominee',), 'limit': 7,
+     'section': {'header': 'nominee details', 'rows': 5, 'stop': ('details', 'policy', 'coverage', 'important', 'note:')}},
+    {'label': 'address', 'query': ('address',), 'lines': ('address',)},
+    {'label': 'phone/mobile', 'query': ('mobile', 'phone'), 'lines': ('mobile', 'phone')},
+    {'label': 'email', 'query': ('email',), 'lines': ('email',)},
+    {'label': 'GSTIN', 'query': ('gstin',), 'lines': ('gstin',)},
+    {'label': 'plan/product', 'query': ('plan', 'product'), 'lines': ('plan', 'product')},
+    {'label': 'premium', 'query': ('premium',), 'lines': ('premium',)},
+    {'label': 'date of inception', 'query': ('date of inception',), 'lines': ('date of inception',)},
+    {'label': 'collection number', 'query': ('collection number',), 'lines': ('collection no', 'collection number')},
+    {'label': 'collection date', 'query': ('collection date',), 'lines': ('collection date',)},
+    {'label': 'policy category', 'query': ('policy category',), 'lines': ('policy category',)},
+    {'label': 'policy number', 'query': ('policy number',), 'lines': ('policy no',)},
+    {'label': 'sum insured', 'query': ('sum insured', 'sum assured'),
+     'lines': ('sum insured', 'suminsured', 'sum assured', 'sumassured'), 'before': 2, 'after': 2, 'limit': 7},
+    {'label': 'customer code', 'query': ('customer code',), 'lines': ('customer code',)},
+    {'label': 'proposer', 'query': ('proposer',), 'lines': ('proposer',)},
+    # Broadest rule last, so 'sum insured' / 'insured name' questions get their specific rule
+    {'label': 'insured', 'query': ('insured',), 'lines': ('insured', 'name')},
+]
+RULE_DEFAULTS = {'before': 1, 'after': 1, 'limit': 5, 'section': None}
+
+
+def normalise(text: str) -> str:
+    """Lower-case and collapse runs of whitespace, '_' and '-' to one space."""
+    return re.sub(r"[\s_\-]+", " ", text.lower())
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton: reports every keyword occurring in a text (overlaps
+    included) in a single left-to-right pass, whatever the number of keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                    nxt = len(self._goto) - 1
+                    self._goto[state][char] = nxt
+                state = nxt
+            self._out[state].add(keyword)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        """Return the set of keywords occurring anywhere in `text`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state, found = 0, set()
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+def _rule(spec: dict) -> dict:
+    return dict(RULE_DEFAULTS, **spec)
+
+
+RULES = [_rule(spec) for spec in KEYWORD_RULES]
+_LINE_AUTOMATON = KeywordAutomaton(
+    [kw for rule in RULES for kw in rule['lines']] + [rule['section']['header'] for rule in RULES if rule['section']]
+)
+_QUERY_AUTOMATON = KeywordAutomaton(kw for rule in RULES for kw in rule['query'])
+
+
+def index_lines(lines: List[str], start: int = 0, index: Optional[Dict[str, List[int]]] = None) -> Dict[str, List[int]]:
+    """
+    Add lines to a keyword -> line positions index (one automaton pass per line).
+
+    Args:
+        lines: Document lines in reading order
+        start: Position of lines[0] within the document (for incremental, page-by-page indexing)
+        index: Existing index to extend in place
+
+    Returns:
+        The index, with positions in ascending order per keyword
+    """
+    index = {} if index is None else index
+    for position, line in enumerate(lines, start=start):
+        for keyword in _LINE_AUTOMATON.find(normalise(line)):
+            index.setdefault(keyword, []).append(position)
+    return index
+
+
+def matching_rules(query: str) -> List[dict]:
+    """Rules triggered by a query, in priority order (one automaton pass over the query)."""
+    found = _QUERY_AUTOMATON.find(normalise(query))
+    return [rule for rule in RULES if any(keyword in found for keyword in rule['query'])]
+
+
+def rule_context(rule: dict, lines: Sequence[str], index: Dict[str, List[int]]) -> List[str]:
+    """
+    Context lines one rule selects from a single document, in reading order (not deduplicated).
+    `lines` only needs len() and integer indexing, so callers can pass a lazy view.
+    """
+    hits = sorted({pos for keyword in rule['lines'] for pos in index.get(keyword, ())})
+    section = rule['section']
+    headers = set(index.get(section['header'], ())) if section else set()
+    context: List[str] = []
+    for pos in hits:
+        if pos in headers:
+            # Section header plus the rows below it, up to a blank line or the next section
+            context.append(lines[pos])
+            for row_pos in range(pos + 1, min(len(lines), pos + 1 + section['rows'])):
+                row = lines[row_pos]
+                if not row.strip() or any(word in row.lower() for word in section['stop']):
+                    break
+                context.append(row)
+        else:
+            context.extend(lines[p] for p in range(max(0, pos - rule['before']), min(len(lines), pos + rule['after'] + 1)))
+    return context
+
+
+def keyword_context(query: str, documents: Iterable[Tuple[Sequence[str], Dict[str, List[int]]]]) -> Optional[Tuple[str, List[str]]]:
+    """
+    Context for a question from the first matching keyword rule.
+
+    Args:
+        query: User question
+        documents: (lines, keyword index) per selected document, in display order
+
+    Returns:
+        (rule label, distinct context lines) or None if no rule matches any document
+    """
+    documents = list(documents)
+    for rule in matching_rules(query):
+        context = [line for lines, index in documents for line in rule_context(rule, lines, index)]
+        context = list(dict.fromkeys(context))[:rule['limit']]
+        if context:
+            return rule['label'], context
+    return None
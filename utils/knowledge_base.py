@@ -0,0 +1,41 @@
+from utils.index_cache import load_or_build_index
+
+# Comprehensive KB – covers health, home, claims, and general policy info
+KB_DOCS = [
+    # Health insurance facts
+    "Health insurance covers medical expenses incurred due to illness, injury, or disease.",
+    "We offer individual, family, and group health insurance plans.",
+    "Health insurance provides financial protection against unexpected medical emergencies.",
+    "You can renew your health insurance policy online through our website or mobile app.",
+    "Pre-existing conditions may be covered after a waiting period in health insurance policies.",
+    "Cashless hospitalization is available at our network hospitals for health insurance policyholders.",
+    "You can add dependents to your health insurance policy during renewal or special enrollment periods.",
+    # Home insurance facts
+    "Home insurance covers damages caused by natural disasters such as earthquakes, floods, and hurricanes.",
+    "Your policy covers your home, personal belongings, and liability.",
+    "Your policy includes coverage for earthquakes and floods.",
+    # Claims and general info
+    "You can file a claim via our mobile app under the Claims tab.",
+    "To file a claim, provide your policy number, a detailed description, and supporting documents.",
+    "Your policy is valid for one year from the date of issue.",
+    "You can pay your premium online through our website or mobile app using various payment methods.",
+    "The grace period for premium payment is usually 30 days from the due date.",
+    "To cancel your policy, contact our customer service team and provide your policy number and reason for cancellation.",
+    "Adding a new driver to your auto policy may affect your premium.",
+    "You can add or remove beneficiaries from your life insurance policy at any time.",
+    # More general insurance facts
+    "Insurance policies help manage financial risks by providing coverage for unexpected events.",
+    "Policyholders receive a renewal notice before their policy expires.",
+    "You can check your claim status online or by contacting customer service.",
+]
+
+
+def load_kb_index():
+    """KB index loaded from its on-disk artifact; rebuilt only when KB_DOCS or the encoder change."""
+    return load_or_build_index(KB_DOCS)
+
+
+if __name__ == '__main__':
+    # Prebuild the KB artifact (e.g. at image build time) so workers start without embedding
+    index = load_kb_index()
+    print(f"[knowledge_base] KB index ready: {index.ntotal} passages")
@@ -1,22 +1,154 @@
+import asyncio
+import datetime
 import os
+import random
+import threading
+import time
+from collections.abc import Mapping
+from typing import AsyncIterator, Optional, Tuple
 import requests
-from huggingface_hub import InferenceClient
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 load_dotenv()
 
-# Lazy import to avoid hard dependency if Gemini isn't used
-try:
-    import google.generativeai as genai  # type: ignore
-except Exception:
-    genai = None
+# HTTP settings for the Hugging Face Inference API. Timeouts are (connect, read) seconds;
+# 429 and 5xx responses and connection errors are retried with jittered exponential backoff.
+LLM_CONNECT_TIMEOUT = float(os.getenv('POLICYPULSE_LLM_CONNECT_TIMEOUT', '5'))
+LLM_READ_TIMEOUT = float(os.getenv('POLICYPULSE_LLM_READ_TIMEOUT', '60'))
+LLM_MAX_RETRIES = int(os.getenv('POLICYPULSE_LLM_RETRIES', '3'))
+LLM_BACKOFF_SECONDS = float(os.getenv('POLICYPULSE_LLM_BACKOFF', '0.5'))
+LLM_BACKOFF_MAX_SECONDS = 8.0
+LLM_POOL_SIZE = int(os.getenv('POLICYPULSE_LLM_POOL_SIZE', '16'))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """
+    Process-wide requests.Session with a keep-alive connection pool, shared by every
+    LLMClient (the Streamlit app creates a client per rerun), so consecutive calls
+    reuse the TCP/TLS connection instead of opening a new one.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None,
+                  base: float = LLM_BACKOFF_SECONDS, cap: float = LLM_BACKOFF_MAX_SECONDS) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based): a server's numeric
+    Retry-After when given, else "full jitter" - uniform in [0, base * 2**attempt] - capped at `cap`.
+    """
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _import_genai():
+    """
+    google.generativeai, imported on the first Gemini call: it is optional and slow to
+    import, so sessions that never reach the LLM (refusals, direct answers) skip it.
+    """
+    try:
+        import google.generativeai as genai  # type: ignore
+    except Exception:
+        return None
+    return genai
+
+class GeminiStats:
+    """Thread-safe totals of time spent setting up Gemini models versus generating."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.models_built = 0
+            self.setup_seconds = 0.0
+            self.generate_seconds = 0.0
+
+    def record(self, setup_seconds: float, generate_seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.setup_seconds += setup_seconds
+            self.generate_seconds += generate_seconds
+
+    def model_built(self) -> None:
+        with self._lock:
+            self.models_built += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = max(self.calls, 1)
+            return {
+                "calls": self.calls,
+                "models_built": self.models_built,
+                "setup_ms_mean": self.setup_seconds * 1000 / calls,
+                "generate_ms_mean": self.generate_seconds * 1000 / calls,
+            }
+
+
+gemini_stats = GeminiStats()
+
+# Configured GenerativeModel per (api key, model name, generation config), shared by every
+# LLMClient and thread. genai.configure is process-global and rebuilds the SDK's clients,
+# so it only runs when the key changes (dropping models built for the previous key).
+_gemini_models: dict = {}
+_gemini_configured_key: Optional[str] = None
+_gemini_lock = threading.Lock()
+
+
+def gemini_model(genai, api_key: str, model_name: str, generation_config: dict):
+    """Return the cached GenerativeModel for this key, model and generation config, building it once."""
+    global _gemini_configured_key
+    key = (api_key, model_name, tuple(sorted(generation_config.items())))
+    model = _gemini_models.get(key)
+    if model is None:
+        with _gemini_lock:
+            model = _gemini_models.get(key)
+            if model is None:
+                if _gemini_configured_key != api_key:
+                    genai.configure(api_key=api_key)
+                    _gemini_models.clear()
+                    _gemini_configured_key = api_key
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                _gemini_models[key] = model
+                gemini_stats.model_built()
+    return model
+
+
+def clear_gemini_models() -> None:
+    """Forget cached Gemini models and the configured key (mainly useful in tests)."""
+    global _gemini_configured_key
+    with _gemini_lock:
+        _gemini_models.clear()
+        _gemini_configured_key = None
+
 
 class LLMClient:
-    def __init__(self, api_key=None, model="HuggingFaceH4/zephyr-7b-beta"):
+    def __init__(self, api_key=None, model="HuggingFaceH4/zephyr-7b-beta", timeout=None, max_retries=None):
         # HF token for fallback
         self.api_key = api_key or self._resolve_hf_token()
         self.model = model
         self.api_url = f"https://api-inference.huggingface.co/models/{self.model}"
         self.headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self.session = http_session()
+        self.timeout = timeout or (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
 
         # Gemini primary config
         self.gemini_api_key = self._resolve_gemini_token()
@@ -63,19 +195,20 @@ class LLMClient:
 
     def _gemini_generate(self, prompt: str, max_tokens: int = 128, temperature: float = 0.2):
         """Generate content with Gemini. Returns text or raises Exception."""
+        genai = _import_genai()
         if genai is None:
             raise RuntimeError("google-generativeai is not installed. Add 'google-generativeai' to requirements.")
         if not self.gemini_api_key:
             raise RuntimeError("GEMINI_API_KEY not set.")
-        genai.configure(api_key=self.gemini_api_key)
-        model = genai.GenerativeModel(self.gemini_model)
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "max_output_tokens": max_tokens,
-                "temperature": temperature,
-            },
-        )
+        started = time.perf_counter()
+        model = gemini_model(genai, self.gemini_api_key, self.gemini_model,
+                             {"max_output_tokens": max_tokens, "temperature": temperature})
+        ready = time.perf_counter()
+        response = model.generate_content(prompt)
+        done = time.perf_counter()
+        gemini_stats.record(ready - started, done - ready)
+        print(f"[llm_client] Gemini: setup {(ready - started) * 1000:.2f} ms, "
+              f"generate {(done - ready) * 1000:.0f} ms")
         # Some SDK versions return .text; ensure we get a string
         text = getattr(response, "text", None)
         if not text:
@@ -92,34 +225,75 @@ class LLMClient:
             text = str(response)
         return text.strip()
 
-    def chat(self, prompt, kb_passages=None):
+    def _open_connections(self) -> Optional[int]:
+        # Connections opened so far by the session's pools for the API URL (None if unavailable)
+        try:
+            pools = self.session.get_adapter(self.api_url).poolmanager.pools
+            return sum(pools[key].num_connections for key in pools.keys())
+        except Exception:
+            return None
+
+    def _post(self, payload: dict, purpose: str) -> requests.Response:
         """
-        Try Gemini first. If it fails, fallback to HuggingFace Zephyr.
-        Returns a tuple (reply, rationale).
+        POST to the Inference API through the pooled session, retrying 429/5xx responses
+        and connection errors. Each attempt's latency and whether it opened a new
+        connection or reused a pooled one is logged. Returns the last response.
+        """
+        for attempt in range(self.max_retries + 1):
+            opened_before = self._open_connections()
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.api_url, headers=self.headers, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"[llm_client] HF {purpose}: {type(e).__name__} after "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms; retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            total_ms = (time.perf_counter() - started) * 1000
+            opened_after = self._open_connections()
+            if opened_before is None or opened_after is None:
+                connection = "connection unknown"
+            else:
+                connection = "new connection" if opened_after > opened_before else "reused connection"
+            # requests' `elapsed`: time from sending the request until the response headers arrived
+            elapsed = getattr(response, 'elapsed', None)
+            if isinstance(elapsed, datetime.timedelta):
+                connection += f", headers after {elapsed.total_seconds() * 1000:.0f} ms"
+            print(f"[llm_client] HF {purpose}: HTTP {response.status_code} in {total_ms:.0f} ms "
+                  f"({connection}, attempt {attempt + 1})")
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                headers = getattr(response, 'headers', None)
+                retry_after = headers.get('Retry-After') if isinstance(headers, Mapping) else None
+                delay = backoff_delay(attempt, retry_after)
+                print(f"[llm_client] HF {purpose}: retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            return response
+        return response
+
+    @staticmethod
+    def _generated_text(result) -> str:
+        if isinstance(result, list) and "generated_text" in result[-1]:
+            return result[-1]["generated_text"].strip()
+        if isinstance(result, dict) and "generated_text" in result:
+            return result["generated_text"].strip()
+        return str(result)
+
+    def reply(self, prompt) -> Tuple[str, Optional[str]]:
+        """
+        The answer alone, in one provider call: Gemini first, HuggingFace Zephyr as fallback.
+
+        Returns:
+            (reply, provider) with provider 'gemini' or 'hf', or None when the reply is a
+            configuration/availability message rather than an answer (it gets no rationale)
         """
         # 1) Try Gemini primary
         try:
             if self.gemini_api_key:
-                reply = self._gemini_generate(prompt, max_tokens=512, temperature=0.2)
-                # Rationale with Gemini if we have KB snippets
-                limited_references = (kb_passages or [])[:2]
-                references = "\n".join(limited_references).strip() if limited_references else ""
-                if not references or references == "N/A":
-                    rationale = "No relevant facts or KB snippets were found for this answer."
-                else:
-                    rationale_prompt = f"""
-You are PolicyPulse. Given the following answer and ONLY the reference facts or KB snippets below, explain in one sentence which snippet(s) were most important in producing this answer. Do not mention anything not in the references.
-
-Answer: {reply}
-References:
-{references}
-"""
-                    try:
-                        rationale = self._gemini_generate(rationale_prompt, max_tokens=96, temperature=0.1)
-                    except Exception:
-                        # Non-fatal; provide no rationale if secondary call fails
-                        rationale = None
-                return reply, rationale
+                return self._gemini_generate(prompt, max_tokens=512, temperature=0.2), 'gemini'
         except Exception as e:
             print(f"[Gemini] Error: {e}. Falling back to HuggingFace Zephyr.")
 
@@ -135,7 +309,7 @@ References:
             "inputs": prompt,
             "parameters": {"max_new_tokens": 128, "return_full_text": False}
         }
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = self._post(payload, 'reply')
         if response.status_code == 404:
             return (
                 "Model not found or is not available for Inference API. Please check your model name or use a supported public model.",
@@ -147,20 +321,17 @@ References:
                 None,
             )
         response.raise_for_status()
-        result = response.json()
-        if isinstance(result, list) and "generated_text" in result[-1]:
-            reply = result[-1]["generated_text"].strip()
-        elif isinstance(result, dict) and "generated_text" in result:
-            reply = result["generated_text"].strip()
-        else:
-            reply = str(result)
+        return self._generated_text(response.json()), 'hf'
 
-        # Rationale via Zephyr fallback as before
+    def rationale(self, reply: str, kb_passages=None, provider: str = 'hf') -> Optional[str]:
+        """
+        One sentence on which KB snippets produced `reply`, from the provider that answered
+        (a second provider call, skipped when there are no snippets).
+        """
         limited_references = (kb_passages or [])[:2]
         references = "\n".join(limited_references).strip() if limited_references else ""
         if not references or references == "N/A":
-            rationale = "No relevant facts or KB snippets were found for this answer."
-            return reply, rationale
+            return "No relevant facts or KB snippets were found for this answer."
 
         rationale_prompt = f"""
 You are PolicyPulse. Given the following answer and ONLY the reference facts or KB snippets below, explain in one sentence which snippet(s) were most important in producing this answer. Do not mention anything not in the references.
@@ -169,24 +340,72 @@ Answer: {reply}
 References:
 {references}
 """
+        if provider == 'gemini':
+            try:
+                return self._gemini_generate(rationale_prompt, max_tokens=96, temperature=0.1)
+            except Exception:
+                # Non-fatal; provide no rationale if secondary call fails
+                return None
+
         payload_rationale = {
             "inputs": rationale_prompt,
             "parameters": {"max_new_tokens": 64, "return_full_text": False}
         }
-        response_rationale = requests.post(self.api_url, headers=self.headers, json=payload_rationale)
-        if response_rationale.status_code == 404:
+        response_rationale = self._post(payload_rationale, 'rationale')
+        if response_rationale.status_code in (401, 403, 404):
+            return None
+        response_rationale.raise_for_status()
+        return self._generated_text(response_rationale.json())
+
+    def chat(self, prompt, kb_passages=None):
+        """
+        Try Gemini first. If it fails, fallback to HuggingFace Zephyr.
+        Returns a tuple (reply, rationale): the answer, then its rationale (see `reply`, `rationale`).
+        """
+        reply, provider = self.reply(prompt)
+        if provider is None:
             return reply, None
-        if response_rationale.status_code in (401, 403):
+        return reply, self.rationale(reply, kb_passages, provider)
+
+    # Async variants. The provider SDKs and the pooled HTTP session are blocking, so each
+    # call runs on a worker thread: awaiting several together (asyncio.gather) overlaps
+    # their round trips, and the event loop is never blocked.
+
+    async def areply(self, prompt) -> Tuple[str, Optional[str]]:
+        """Async `reply`."""
+        return await asyncio.to_thread(self.reply, prompt)
+
+    async def arationale(self, reply: str, kb_passages=None, provider: str = 'hf') -> Optional[str]:
+        """Async `rationale`."""
+        return await asyncio.to_thread(self.rationale, reply, kb_passages, provider)
+
+    async def achat(self, prompt, kb_passages=None):
+        """Async `chat`: (reply, rationale)."""
+        reply, provider = await self.areply(prompt)
+        if provider is None:
             return reply, None
-        response_rationale.raise_for_status()
-        result_rationale = response_rationale.json()
-        if isinstance(result_rationale, list) and "generated_text" in result_rationale[-1]:
-            rationale = result_rationale[-1]["generated_text"].strip()
-        elif isinstance(result_rationale, dict) and "generated_text" in result_rationale:
-            rationale = result_rationale["generated_text"].strip()
-        else:
-            rationale = str(result_rationale)
-        return reply, rationale
+        return reply, await self.arationale(reply, kb_passages, provider)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async `stream_chat_response`: tokens are yielded as the worker thread receives them."""
+        loop = asyncio.get_running_loop()
+        tokens: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for token in self.stream_chat_response(prompt):
+                    loop.call_soon_threadsafe(tokens.put_nowait, token)
+            finally:
+                loop.call_soon_threadsafe(tokens.put_nowait, done)
+
+        producer = loop.run_in_executor(None, produce)
+        while True:
+            token = await tokens.get()
+            if token is done:
+                break
+            yield token
+        await producer
 
     def stream_chat_response(self, prompt: str):
         """
@@ -194,6 +413,8 @@ References:
         Falls back to regular chat if streaming fails.
         """
         try:
+            # Imported here: only the streaming path uses the hub client
+            from huggingface_hub import InferenceClient
             # Use a more compatible model for streaming
             streaming_model = "gpt2"  # More compatible than zephyr-7b-beta
             client = InferenceClient(
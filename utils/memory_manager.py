@@ -1,16 +1,31 @@
-import streamlit as st
+import asyncio
+from typing import List, Optional
+
 
 class MemoryManager:
-    def __init__(self, llm_client, max_entries: int = 15):
+    def __init__(self, llm_client, max_entries: int = 15, memories: Optional[List[str]] = None):
         """
         Initialize the memory manager with an LLM client and maximum number of summaries to store.
         
         Args:
             llm_client: An LLM client instance with a chat() method
             max_entries: Maximum number of summaries to keep in memory (default: 15)
+            memories: List the summaries are stored in (updated in place). Defaults to
+                `st.session_state.memories`, so the Streamlit app needs no extra wiring.
         """
         self.llm = llm_client
         self.max_entries = max_entries
+        self._explicit_memories = memories
+
+    @property
+    def memories(self) -> List[str]:
+        """The list summaries are stored in (the explicit list, else Streamlit session state)."""
+        if self._explicit_memories is not None:
+            return self._explicit_memories
+        import streamlit as st
+        if 'memories' not in st.session_state:
+            st.session_state.memories = []
+        return st.session_state.memories
 
     def add_turn(self, user_msg: str, assistant_reply: str):
         """
@@ -53,16 +68,7 @@ class MemoryManager:
             
             # Only store if summary is sufficiently informative (>3 words and not the default message)
             if len(summary.split()) > 3 and summary != "No specific facts to remember.":
-                # Initialize memories in session state if not present
-                if 'memories' not in st.session_state:
-                    st.session_state.memories = []
-                
-                st.session_state.memories.append(summary)
-                print(f"Memory stored. Total memories: {len(st.session_state.memories)}")
-                
-                # Keep only the most recent max_entries summaries
-                if len(st.session_state.memories) > self.max_entries:
-                    st.session_state.memories.pop(0)
+                self.add_fact(summary)
             else:
                 print(f"Memory not stored - too short or no facts: '{summary}'")
                     
@@ -70,6 +76,24 @@ class MemoryManager:
             # Silently fail if summarization fails - don't break the main conversation
             print(f"Memory summarization failed: {e}")
 
+    async def aadd_turn(self, user_msg: str, assistant_reply: str):
+        """Async `add_turn`: the summary call runs on a worker thread, so it can be awaited alongside other LLM calls."""
+        await asyncio.to_thread(self.add_turn, user_msg, assistant_reply)
+
+    def add_fact(self, fact: str):
+        """
+        Store a fact directly, without asking the LLM to summarise the exchange
+        (used when the answer is already a known fact, e.g. a field read from the document).
+        Keeps at most `max_entries` summaries, dropping the oldest.
+        """
+        memories = self.memories
+        memories.append(fact)
+        print(f"Memory stored. Total memories: {len(memories)}")
+        
+        # Keep only the most recent max_entries summaries
+        if len(memories) > self.max_entries:
+            memories.pop(0)
+
     def get_memory_context(self, n: int = 5) -> str:
         """
         Return the last `n` stored memory summaries joined by newlines.
@@ -78,11 +102,7 @@ class MemoryManager:
         Returns:
             String containing the memory context with summaries separated by newlines
         """
-        if 'memories' not in st.session_state:
-            print("No memories in session state")
-            return ""
-        
-        memories = st.session_state.memories
+        memories = self.memories
         print(f"Total memories available: {len(memories)}")
         
         # Get the last n summaries
@@ -103,17 +123,12 @@ class MemoryManager:
     
     def clear_memory(self):
         """Clear all stored summaries."""
-        if 'memories' in st.session_state:
-            st.session_state.memories.clear()
+        self.memories.clear()
     
     def get_memory_count(self) -> int:
         """Get the current number of stored summaries."""
-        if 'memories' not in st.session_state:
-            return 0
-        return len(st.session_state.memories)
+        return len(self.memories)
     
     def get_all_summaries(self) -> list[str]:
         """Get all stored summaries as a list."""
-        if 'memories' not in st.session_state:
-            return []
-        return st.session_state.memories.copy() 
\ No newline at end of file
+        return self.memories.copy() 
\ No newline at end of file
@@ -1,25 +1,182 @@
-import pdfplumber
+import io
+import multiprocessing
+import os
+import threading
+import time
 import re
-from typing import List, Optional
-import streamlit as st
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
 
+# Parallel extraction: documents with at least PARALLEL_MIN_PAGES pages are split into
+# ranges of PAGES_PER_TASK pages, each extracted by a worker process that opens the PDF
+# itself. Smaller documents (or PDF_WORKERS <= 1) are extracted sequentially.
+_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+PDF_WORKERS = int(os.getenv('POLICYPULSE_PDF_WORKERS', str(min(8, _CPUS))))
+PARALLEL_MIN_PAGES = int(os.getenv('POLICYPULSE_PDF_PARALLEL_MIN_PAGES', '16'))
+PAGES_PER_TASK = 8
 
-def extract_text_from_pdf(pdf_file) -> Optional[str]:
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _pdfplumber():
+    # Imported on first extraction: pdfplumber (pdfminer) is slow to import and many
+    # processes (KB-only sessions, the batch CLI without PDFs) never extract anything
+    import pdfplumber
+    return pdfplumber
+
+
+def _show_error(message: str) -> None:
+    # Imported lazily so extraction workers do not load the UI framework
+    import streamlit as st
+    st.error(message)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all uploads; workers are spawned (not forked) once and reused."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the extraction worker processes (they are restarted on demand)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _pdf_bytes(pdf_file) -> bytes:
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, 'rb') as f:
+            return f.read()
+    if hasattr(pdf_file, 'getvalue'):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+Table = List[List[Optional[str]]]
+
+
+def _extract_page(page, with_tables: bool) -> Tuple[str, Optional[List[Table]]]:
+    text = page.extract_text() or ""
+    tables = page.extract_tables() if with_tables else None
+    page.close()
+    return text, tables
+
+
+def _extract_page_range(pdf_bytes: bytes, first_page: int, last_page: int,
+                        with_tables: bool = False) -> List[Tuple[str, Optional[List[Table]]]]:
+    """Worker task: (text, tables) of pages first_page..last_page (1-based, inclusive)."""
+    with _pdfplumber().open(io.BytesIO(pdf_bytes)) as pdf:
+        return [_extract_page(page, with_tables) for page in pdf.pages[first_page - 1:last_page]]
+
+
+def _iter_sequential(pdf, first_page: int, with_tables: bool):
+    for page_no in range(first_page, len(pdf.pages) + 1):
+        yield (page_no, *_extract_page(pdf.pages[page_no - 1], with_tables))
+
+
+def _iter_parallel(pdf_bytes: bytes, first_page: int, page_count: int, workers: int, with_tables: bool):
+    pool = _get_pool(workers)
+    ranges = [(start, min(start + PAGES_PER_TASK - 1, page_count))
+              for start in range(first_page, page_count + 1, PAGES_PER_TASK)]
+    futures = [pool.submit(_extract_page_range, pdf_bytes, start, end, with_tables) for start, end in ranges]
+    try:
+        for (start, _), future in zip(ranges, futures):
+            for offset, (text, tables) in enumerate(future.result()):
+                yield start + offset, text, tables
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _iter_pages(pdf_file, start_page: int, workers: Optional[int], with_tables: bool):
+    workers = PDF_WORKERS if workers is None else workers
+    data = _pdf_bytes(pdf_file)
+    started = time.perf_counter()
+    next_page = max(1, start_page)
+    mode = 'sequential'
+    with _pdfplumber().open(io.BytesIO(data)) as pdf:
+        page_count = len(pdf.pages)
+        remaining = page_count - next_page + 1
+        if workers > 1 and page_count >= PARALLEL_MIN_PAGES and remaining > PAGES_PER_TASK:
+            mode = f'{workers} workers'
+            try:
+                for page_no, text, tables in _iter_parallel(data, next_page, page_count, workers, with_tables):
+                    next_page = page_no + 1
+                    yield page_no, page_count, text, tables
+            except (BrokenProcessPool, OSError) as e:
+                print(f"[pdf_processor] Process pool unavailable ({e}); extracting sequentially")
+                shutdown_pool()
+                mode = 'sequential fallback'
+        for page_no, text, tables in _iter_sequential(pdf, next_page, with_tables):
+            yield page_no, page_count, text, tables
+    elapsed = time.perf_counter() - started
+    extracted = page_count - max(1, start_page) + 1
+    if extracted > 0 and elapsed > 0:
+        print(f"[pdf_processor] Extracted {extracted} pages in {elapsed:.2f}s "
+              f"({extracted / elapsed:.1f} pages/s, {mode})")
+
+
+def iter_pdf_pages(pdf_file, start_page: int = 1, workers: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
     """
-    Extract raw text from uploaded PDF file using pdfplumber.
+    Yield (page_number, page_count, text) for each page of a PDF in page order,
+    starting at the 1-based `start_page`.
+
+    Large documents are extracted by a process pool (see PDF_WORKERS and
+    PARALLEL_MIN_PAGES); pages are still yielded in order as their ranges finish.
+    Small documents, or a pool that cannot start, fall back to sequential extraction.
+    Extraction errors propagate to the caller. Throughput (pages/s) is logged at the end.
+    """
+    for page_no, page_count, text, _ in _iter_pages(pdf_file, start_page, workers, with_tables=False):
+        yield page_no, page_count, text
+
+
+def iter_pdf_pages_with_tables(pdf_file, start_page: int = 1,
+                               workers: Optional[int] = None) -> Iterator[Tuple[int, int, str, List[Table]]]:
+    """
+    Like iter_pdf_pages, but also yields the page's tables from pdfplumber's
+    `page.extract_tables()`: (page_number, page_count, text, tables), where each table
+    is a list of rows and each row a list of cell strings (None for empty cells).
+    """
+    yield from _iter_pages(pdf_file, start_page, workers, with_tables=True)
+
+
+def extract_pages_from_pdf(pdf_file) -> Optional[List[str]]:
+    """
+    Extract the text of each page of an uploaded PDF file using pdfplumber.
+    Pages without text are returned as empty strings so list positions match page numbers.
     Returns None if extraction fails.
     """
     try:
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text.strip()
+        return [text for _, _, text in iter_pdf_pages(pdf_file)]
     except Exception as e:
-        st.error(f"Error extracting text from PDF: {str(e)}")
+        _show_error(f"Error extracting text from PDF: {str(e)}")
+        return None
+
+
+def extract_text_from_pdf(pdf_file) -> Optional[str]:
+    """
+    Extract raw text from uploaded PDF file using pdfplumber.
+    Returns None if extraction fails.
+    """
+    pages = extract_pages_from_pdf(pdf_file)
+    if pages is None:
         return None
+    return "\n".join(page for page in pages if page).strip()
 
 
 def split_text_by_lines(text: str) -> List[str]:
@@ -29,21 +186,45 @@ def split_text_by_lines(text: str) -> List[str]:
     return [line.strip() for line in text.splitlines() if line.strip()]
 
 
-def process_uploaded_pdf(pdf_file) -> Optional[List[str]]:
+def split_pages_by_lines(pages: List[str]) -> Tuple[List[str], List[int]]:
     """
-    Process uploaded PDF file: extract text and split into chunks.
-    Returns list of text chunks or None if processing fails.
+    Line-based chunking that remembers where each line came from.
+    Returns (lines, page_numbers) with 1-based page numbers aligned to lines.
     """
-    # Extract text from PDF
-    text = extract_text_from_pdf(pdf_file)
-    if not text:
+    lines, page_numbers = [], []
+    for page_no, page_text in enumerate(pages, start=1):
+        for line in split_text_by_lines(page_text):
+            lines.append(line)
+            page_numbers.append(page_no)
+    return lines, page_numbers
+
+
+def process_uploaded_pdf_pages(pdf_file) -> Optional[Tuple[List[str], List[int]]]:
+    """
+    Process uploaded PDF file into line chunks plus the page number of each chunk.
+    Returns (chunks, page_numbers) or None if processing fails.
+    """
+    pages = extract_pages_from_pdf(pdf_file)
+    if not pages:
         return None
     
-    # Use line-based chunking for better LLM extraction
-    chunks = split_text_by_lines(text)
+    chunks, page_numbers = split_pages_by_lines(pages)
     
     if not chunks:
-        st.error("No text content found in the uploaded PDF.")
+        _show_error("No text content found in the uploaded PDF.")
         return None
     
-    return chunks 
\ No newline at end of file
+    return chunks, page_numbers
+
+
+def process_uploaded_pdf(pdf_file) -> Optional[List[str]]:
+    """
+    Process uploaded PDF file: extract text and split into chunks.
+    Returns list of text chunks or None if processing fails.
+    """
+    processed = process_uploaded_pdf_pages(pdf_file)
+    if not processed:
+        return None
+    
+    # Use line-based chunking for better LLM extraction
+    return processed[0]
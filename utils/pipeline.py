@@ -0,0 +1,352 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import faiss
+from prompts.few_shot_templates import get_few_shot_prompt
+from utils.bfsi_filter import is_bfsi_query, safety_check, clean_unsafe_content
+from utils.corpus import SessionCorpus
+from utils.embeddings import model_loaded, warm_up_in_background
+from utils.field_extractor import answer_field_question
+from utils.knowledge_base import KB_DOCS
+from utils.memory_manager import MemoryManager
+from utils.retrieval import BM25Index
+from utils.table_extractor import answer_table_question
+from utils.vector_store import query_index
+
+# Stages run in this order; a stage that produces the final answer (an unsafe input, an
+# off-topic question, a field read from the document) ends the run early.
+STAGES = ('input_safety', 'bfsi_gate', 'direct_answer', 'retrieval', 'prompt', 'llm', 'output_safety', 'memory')
+
+UNSAFE_INPUT_MESSAGE = (
+    "⚠️ Your question may violate safety guidelines. "
+    "Please ensure your questions are appropriate and related to BFSI topics. "
+    "I can help you with legitimate banking, financial services, and insurance matters."
+)
+OFF_TOPIC_MESSAGE = (
+    "I'm sorry, I can only answer questions related to banking, financial services, and insurance (BFSI). "
+    "Please ask a question relevant to these topics."
+)
+MEMORY_HEADER = "### CONVERSATION MEMORY (Use this information for consistency):"
+FOLLOW_UP_WORKERS = int(os.getenv('POLICYPULSE_FOLLOW_UP_WORKERS', '4'))
+
+# Rationale and memory summaries of deferred runs (see QueryPipeline), shared by all pipelines
+_follow_up_executor = ThreadPoolExecutor(max_workers=FOLLOW_UP_WORKERS, thread_name_prefix='follow-up')
+
+Hook = Callable[[str, dict], None]
+
+
+class PipelineSession:
+    """
+    Per-conversation state the pipeline reads and updates. The lists are updated in
+    place, so a UI can pass in the lists it already keeps (e.g. Streamlit session state).
+
+    Attributes:
+        context_page: Page the user is on ('My Policies', 'Claims', ...), used in the prompt
+        corpus: Uploaded documents, or None
+        doc_ids: Documents selected for search (None or empty: answer from the KB)
+        memories: Memory summaries (see MemoryManager)
+        conversation: Messages as {'role', 'content', 'rationale'?} dicts
+        stream: Generate the reply with the streaming endpoint
+        remember: Summarise each turn into `memories` (False for one-off questions, which
+            then cost no memory-summary LLM call)
+        last_safety_check: Result of the latest safety_check, set by the pipeline
+        follow_up: Future of the latest deferred rationale/memory update (resolves to the
+            rationale), or None. The next question waits for it before reading memory.
+    """
+
+    def __init__(self, context_page: Optional[str] = None, corpus: Optional[SessionCorpus] = None,
+                 doc_ids: Optional[List[str]] = None, memories: Optional[List[str]] = None,
+                 conversation: Optional[List[dict]] = None, stream: bool = False,
+                 follow_up: Optional[Future] = None, remember: bool = True):
+        self.context_page = context_page
+        self.corpus = corpus
+        self.doc_ids = doc_ids
+        self.memories = [] if memories is None else memories
+        self.conversation = [] if conversation is None else conversation
+        self.stream = stream
+        self.remember = remember
+        self.last_safety_check: Optional[dict] = None
+        self.follow_up = follow_up
+
+    def append_message(self, role: str, content: str, rationale: Optional[str] = None) -> dict:
+        """Append a message and return it; assistant messages keep their rationale if there is one."""
+        entry = {'role': role, 'content': content}
+        if role == 'assistant' and rationale:
+            entry['rationale'] = rationale
+        self.conversation.append(entry)
+        return entry
+
+    def settle(self) -> None:
+        """Wait for the pending follow-up, so memory includes the previous turn."""
+        if self.follow_up is not None:
+            # A failed follow-up only loses that summary; it must not fail the next question
+            self.follow_up.exception()
+
+
+class QueryPipeline:
+    """
+    Question answering without any UI: safety check, BFSI gate, direct field/table
+    answers, document or KB retrieval, prompt with conversation memory, LLM call,
+    response safety check and memory update.
+
+    `run(query, session)` returns a result dict; all per-user state lives in the
+    PipelineSession, so one pipeline can serve many sessions. Hooks registered with
+    `add_hook` are called after each stage with (stage, context), where context holds
+    the query, the session and everything produced so far (doc_chunks, kb_passages,
+    prompt, reply, rationale, timings, ...). Hooks may inspect or modify it.
+
+    KB passages are ranked with BM25 until the shared encoder has loaded and by vector
+    search after, so KB answers in a cold process may differ from later ones. The
+    result's 'kb_ranker' says which one was used; callers that need repeatable answers
+    call embeddings.warm_up() first.
+
+    With `defer_follow_up`, a run makes one LLM call (the answer) and returns. The
+    rationale and the memory summary are then generated together on a follow-up thread
+    (`llm.arationale` and `MemoryManager.aadd_turn`, awaited with asyncio.gather); the
+    result's 'follow_up' Future resolves to the rationale, which is also written into the
+    conversation entry. The LLM client must then provide `reply` and `arationale`.
+    """
+
+    def __init__(self, llm, kb_index: faiss.Index, kb_docs: List[str] = KB_DOCS, memory_max_entries: int = 15,
+                 defer_follow_up: bool = False):
+        self.llm = llm
+        self.defer_follow_up = defer_follow_up
+        self.kb_index = kb_index
+        self.kb_docs = kb_docs
+        self.memory_max_entries = memory_max_entries
+        self._hooks: Dict[Optional[str], List[Hook]] = {}
+        self._kb_bm25: Optional[BM25Index] = None
+        self._kb_bm25_lock = threading.Lock()
+
+    def add_hook(self, hook: Hook, stage: Optional[str] = None) -> None:
+        """Call `hook(stage, context)` after `stage` (after every stage if None)."""
+        if stage is not None and stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}; expected one of {', '.join(STAGES)}")
+        self._hooks.setdefault(stage, []).append(hook)
+
+    def run(self, query: str, session: PipelineSession) -> Optional[dict]:
+        """
+        Answer one question and record the turn in the session.
+
+        Args:
+            query: User question
+            session: The user's conversation state (updated in place)
+
+        Returns:
+            None for a blank query, else a dict with
+            - reply, rationale: the assistant message appended to the conversation
+            - route: 'unsafe_input', 'off_topic', 'direct', 'document' or 'kb'
+            - notices: [(level, message)] for the UI, level being 'info', 'warning' or 'error'
+            - prompt: the prompt sent to the LLM (None if it was not called)
+            - timings: {stage: seconds} for the stages that ran, plus 'kb_vector' or
+              'kb_bm25' for the KB lookup within retrieval
+            - kb_ranker: 'vector' or 'bm25' for the KB passages of a 'kb' route, else None
+            - follow_up: Future resolving to the rationale when it is generated after the
+              run returns (see `defer_follow_up`), else None
+            - rationale_pending: True when the follow-up will supply a rationale
+        """
+        query = query.strip()
+        if not query:
+            return None
+        context = {
+            'query': query, 'session': session, 'memory': MemoryManager(self.llm, self.memory_max_entries,
+                                                                        memories=session.memories),
+            'route': None, 'doc_chunks': None, 'kb_passages': None, 'prompt': None,
+            'reply': None, 'rationale': None, 'provider': None, 'notices': [], 'timings': {},
+            'kb_ranker': None, 'follow_up': None,
+        }
+        for stage in STAGES:
+            started = time.perf_counter()
+            finished = getattr(self, f'_{stage}')(context)
+            context['timings'][stage] = time.perf_counter() - started
+            for hook in self._hooks.get(stage, []) + self._hooks.get(None, []):
+                hook(stage, context)
+            if finished:
+                break
+        entry = session.append_message('assistant', context['reply'], rationale=context['rationale'])
+        if context['follow_up'] is not None:
+            _follow_up_executor.submit(self._run_follow_up, context, entry)
+        result = {key: context[key] for key in ('reply', 'rationale', 'route', 'notices', 'prompt', 'timings',
+                                                'kb_ranker', 'follow_up')}
+        result['rationale_pending'] = (context['follow_up'] is not None and context['rationale'] is None
+                                       and context['provider'] is not None)
+        return result
+
+    # Each stage returns True when the reply is final and the remaining stages are skipped
+
+    def _input_safety(self, context: dict) -> bool:
+        session = context['session']
+        session.last_safety_check = safety_check(context['query'], "")
+        if session.last_safety_check["unsafe"]:
+            context.update(route='unsafe_input', reply=UNSAFE_INPUT_MESSAGE)
+            return True
+        return False
+
+    def _bfsi_gate(self, context: dict) -> bool:
+        context['session'].append_message('user', context['query'])
+        if not is_bfsi_query(context['query']):
+            context.update(route='off_topic', reply=OFF_TOPIC_MESSAGE)
+            return True
+        return False
+
+    def _direct_answer(self, context: dict) -> bool:
+        session = context['session']
+        if not self._has_documents(session):
+            return False
+        # Direct field and nominee-table questions ("What is my policy number?", "Who are my
+        # nominees?") are answered from what was extracted at ingest time, with no LLM round trip
+        query, corpus = context['query'], session.corpus
+        answer = (answer_table_question(query, corpus.document_tables(session.doc_ids))
+                  or answer_field_question(query, corpus.document_fields(session.doc_ids)))
+        if answer is None:
+            return False
+        reply, rationale = answer
+        if session.remember:
+            session.settle()
+            context['memory'].add_fact(reply.replace("**", ""))
+        context.update(route='direct', reply=reply, rationale=rationale)
+        return True
+
+    def _retrieval(self, context: dict) -> bool:
+        session, query, notices = context['session'], context['query'], context['notices']
+        if self._has_documents(session):
+            # Keyword rules (customer name, nominee, GSTIN, premium, ...) resolved with the
+            # per-document keyword index built at ingest time: no rescan of the document lines
+            keyword_match = session.corpus.keyword_context(query, session.doc_ids)
+            if keyword_match:
+                rule_label, context['doc_chunks'] = keyword_match
+                notices.append(('info', f"🔍 Using uploaded document for answer context ({rule_label} match)."))
+            else:
+                try:
+                    # One BM25 lookup + one filtered vector search, with neighbouring lines as context
+                    relevant_chunks, has_relevant_chunks = session.corpus.search(
+                        query,
+                        k=3,
+                        window=1,
+                        similarity_threshold=0.1,
+                        doc_ids=session.doc_ids,
+                        with_sources=len(session.doc_ids) > 1
+                    )
+                    if has_relevant_chunks:
+                        context['doc_chunks'] = relevant_chunks
+                        notices.append(('info', "🔍 Using uploaded document for answer context."))
+                    else:
+                        notices.append(('warning', "⚠️ No relevant information found in uploaded document. "
+                                                   "Using general knowledge base."))
+                except Exception as e:
+                    notices.append(('error', f"Error searching document: {str(e)}"))
+        if context['doc_chunks']:
+            context['route'] = 'document'
+        else:
+            context['route'] = 'kb'
+            started = time.perf_counter()
+            context['kb_passages'], context['kb_ranker'] = self._kb_passages(query, k=3)
+            context['timings'][f"kb_{context['kb_ranker']}"] = time.perf_counter() - started
+        return False
+
+    def _kb_passages(self, query: str, k: int) -> Tuple[List[str], str]:
+        # KB ranking depends on timing: BM25 while the encoder is still loading, vector
+        # search once it is loaded, so the same question may get different passages
+        # in the first seconds of a process. The ranker used is returned with the passages
+        if model_loaded():
+            return query_index(self.kb_index, self.kb_docs, query, k=k), 'vector'
+        # Cold process: rank the KB lexically instead of waiting seconds for the encoder,
+        # which loads in the background (never blocking this call) and serves every later question
+        warm_up_in_background()
+        with self._kb_bm25_lock:
+            if self._kb_bm25 is None:
+                self._kb_bm25 = BM25Index()
+                for doc_id, doc in enumerate(self.kb_docs):
+                    self._kb_bm25.add(doc_id, doc)
+        return [self.kb_docs[doc_id] for doc_id, _ in self._kb_bm25.search(query, k=k)], 'bm25'
+
+    def _prompt(self, context: dict) -> bool:
+        context['session'].settle()
+        base_prompt = get_few_shot_prompt(
+            context['session'].context_page,
+            context['query'],
+            kb_passages=context['kb_passages'],
+            doc_chunks=context['doc_chunks']
+        )
+        # Insert the conversation memory prominently, before the system message
+        memory_ctx = context['memory'].get_memory_context()
+        if memory_ctx:
+            if "You are a helpful assistant" in base_prompt:
+                parts = base_prompt.split("You are a helpful assistant", 1)
+                full_prompt = f"{parts[0]}{MEMORY_HEADER}\n{memory_ctx}\n\nYou are a helpful assistant{parts[1]}"
+            else:
+                full_prompt = f"{MEMORY_HEADER}\n{memory_ctx}\n\n{base_prompt}"
+            print(f"Full prompt with memory context:\n{full_prompt[:500]}...")
+        else:
+            full_prompt = base_prompt
+            print("No memory context available")
+        context['prompt'] = full_prompt
+        return False
+
+    def _llm(self, context: dict) -> bool:
+        if context['session'].stream:
+            context['reply'] = "".join(self.llm.stream_chat_response(context['prompt']))
+            context['rationale'] = None
+        elif self.defer_follow_up:
+            # The rationale comes with the memory update, after the answer is returned
+            context['reply'], context['provider'] = self.llm.reply(context['prompt'])
+        else:
+            context['reply'], context['rationale'] = self.llm.chat(context['prompt'],
+                                                                   kb_passages=context['kb_passages'])
+        return False
+
+    def _output_safety(self, context: dict) -> bool:
+        session, query = context['session'], context['query']
+        session.last_safety_check = safety_check(query, context['reply'])
+        if session.last_safety_check["unsafe"]:
+            cleaned_reply = clean_unsafe_content(context['reply'])
+            if not safety_check(query, cleaned_reply)["unsafe"]:
+                context.update(reply=cleaned_reply, rationale="Some unsafe words were removed for safety.")
+            else:
+                context.update(reply="Sorry, I couldn't provide a safe answer to your question.",
+                               rationale="Content could not be made safe.")
+        return False
+
+    def _memory(self, context: dict) -> bool:
+        if self.defer_follow_up:
+            # Started by run() once the reply is in the conversation
+            context['follow_up'] = context['session'].follow_up = Future()
+        elif context['session'].remember:
+            context['memory'].add_turn(context['query'], context['reply'])
+        return True
+
+    def _run_follow_up(self, context: dict, entry: dict) -> None:
+        follow_up = context['follow_up']
+        try:
+            rationale = asyncio.run(self._follow_up(context))
+        except Exception as e:
+            follow_up.set_exception(e)
+            return
+        # Fill the entry before resolving, so whoever waits on the Future sees the rationale
+        if rationale and 'rationale' not in entry:
+            entry['rationale'] = rationale
+        follow_up.set_result(rationale)
+
+    async def _follow_up(self, context: dict) -> Optional[str]:
+        """Summarise the turn into memory and, if still missing, generate the rationale, concurrently."""
+        rationale, provider = context['rationale'], context['provider']
+        calls = []
+        if context['session'].remember:
+            calls.append(context['memory'].aadd_turn(context['query'], context['reply']))
+        if rationale is None and provider is not None:
+            calls.append(self.llm.arationale(context['reply'], context['kb_passages'], provider))
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        if rationale is not None or provider is None:
+            return rationale
+        rationale = results[-1]
+        if isinstance(rationale, Exception):
+            print(f"[pipeline] Rationale failed: {rationale}")
+            return None
+        return rationale
+
+    @staticmethod
+    def _has_documents(session: PipelineSession) -> bool:
+        return session.corpus is not None and len(session.corpus) > 0 and bool(session.doc_ids)
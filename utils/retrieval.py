@@ -0,0 +1,92 @@
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens, e.g. 'Policy No. : 2293' -> ['policy', 'no', '2293']."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring over integer document ids.
+    Supports incremental add/remove, so it can track an index that changes over time.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.doc_len: Dict[int, int] = {}
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def add(self, doc_id: int, text: str) -> None:
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        for token in tokens:
+            self.postings[token][doc_id] = self.postings[token].get(doc_id, 0) + 1
+        self.doc_len[doc_id] = len(tokens)
+        self._doc_terms[doc_id] = set(tokens)
+        self._total_len += len(tokens)
+
+    def remove(self, doc_id: int) -> None:
+        length = self.doc_len.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_len -= length
+        for token in self._doc_terms.pop(doc_id):
+            docs = self.postings[token]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """Return up to k (doc_id, score) pairs, best first. Only ids in `allowed` are scored when given."""
+        n = len(self.doc_len)
+        if not n:
+            return []
+        avg_len = self._total_len / n or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], weights: Optional[Sequence[float]] = None,
+                           k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse several ranked id lists: score(id) = sum(weight / (k + rank)).
+    Rank-based, so BM25 scores and L2 distances need no calibration against each other.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += weight / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def expand_windows(positions: Iterable[int], n_lines: int, window: int = 1) -> List[int]:
+    """Add `window` neighbouring lines on each side of every hit; return unique positions in document order."""
+    expanded = set()
+    for pos in positions:
+        expanded.update(range(max(0, pos - window), min(n_lines, pos + window + 1)))
+    return sorted(expanded)
+
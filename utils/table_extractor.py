@@ -0,0 +1,199 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Canonical nominee-table columns and the header spellings that map to them
+NOMINEE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'name': ('nominee name', 'name of nominee', 'name of the nominee', 'nominee', 'name'),
+    'relationship': ('relationship with proposer', 'relationship with insured', 'relationship with life assured',
+                     'relationship', 'relation'),
+    'age': ('nominee age', 'age', 'age years', 'age in years', 'date of birth', 'dob'),
+    'share': ('% of claim', '% share', 'percentage of claim', 'percentage share', 'percentage', 'share', 'share %',
+              'claim %', '% claim', '%'),
+    'appointee': ('appointee name', 'name of appointee', 'appointee'),
+}
+COLUMN_LABELS = {'name': 'Nominee', 'relationship': 'Relationship', 'age': 'Age',
+                 'share': '% of Claim', 'appointee': 'Appointee'}
+
+# One "Label : value" line inside a cell (label: a few words starting with a letter)
+_CELL_LABEL = re.compile(r"^([A-Za-z][\w.'/()&@%\- ]{0,40}?)\s*:\s*(\S.*)$")
+_QUESTION = re.compile(r"\bnominees?\b|\bappointees?\b", re.IGNORECASE)
+# Words that may surround a nominee-table question ("who are the nominees and their shares?")
+_FILLER_WORDS = {
+    'what', 'whats', 's', 'is', 'are', 'was', 'my', 'the', 'a', 'an', 'of', 'for', 'me', 'tell', 'show', 'give',
+    'please', 'pls', 'your', 'our', 'this', 'in', 'on', 'policy', 'document', 'uploaded', 'who', 'which', 'how',
+    'much', 'many', 'their', 'each', 'every', 'all', 'list', 'and', 'with', 'details', 'name', 'names', 'to',
+    'i', 'does', 'do', 'get', 'gets', 'receive', 'receives', 'has', 'have', 'there', 'any', 'table',
+    # column words: the whole row is shown anyway
+    'relationship', 'relation', 'related', 'age', 'ages', 'old', 'share', 'shares', 'percentage', 'percent',
+    'claim', 'split', '%',
+}
+
+
+def _normalise_header(cell: Optional[str]) -> str:
+    text = re.sub(r"\s+", " ", (cell or "").replace("\n", " ")).strip().lower()
+    return re.sub(r"[^\w% ]", "", text).strip()
+
+
+def _clean_cell(cell: Optional[str]) -> Optional[str]:
+    text = re.sub(r"\s+", " ", (cell or "")).strip()
+    return None if text in ("", "-", "--", "NA", "N/A", "Nil", "NIL") else text
+
+
+def _label_value_pairs(cell: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Split a cell holding its own labels ('Policy No. : 123', or several such lines) into
+    (label, value) pairs. Lines without a label continue the previous value.
+    """
+    pairs: List[List[str]] = []
+    for line in (cell or "").splitlines():
+        line = line.strip()
+        match = _CELL_LABEL.match(line)
+        if match:
+            pairs.append([match.group(1).strip(), match.group(2)])
+        elif pairs and line:
+            pairs[-1][1] += " " + line
+    return [(label, value) for label, value in ((label, _clean_cell(value)) for label, value in pairs) if value]
+
+
+def _is_label_value_grid(rows: List[List[Optional[str]]]) -> bool:
+    """True if every filled cell of the first column is itself 'Label : value' (a form laid out as a grid)."""
+    first = [row[0] for row in rows if _clean_cell(row[0])]
+    return bool(first) and all(_CELL_LABEL.match(cell.strip().splitlines()[0].strip()) for cell in first)
+
+
+def _nominee_header(row: List[Optional[str]]) -> Optional[Dict[int, str]]:
+    """Map column index -> canonical column if `row` looks like a nominee-table header."""
+    mapping: Dict[int, str] = {}
+    for col, cell in enumerate(row):
+        header = _normalise_header(cell)
+        for column, spellings in NOMINEE_COLUMNS.items():
+            if column not in mapping.values() and header in spellings:
+                mapping[col] = column
+                break
+    has_nominee = any(('nominee' in _normalise_header(cell)) for cell in row)
+    if 'name' in mapping.values() and len(mapping) >= 2 and (has_nominee or 'share' in mapping.values()):
+        return mapping
+    return None
+
+
+def _typed(column: str, value: str):
+    if column == 'age':
+        match = re.match(r"\d{1,3}", value)
+        return int(match.group(0)) if match else value
+    if column == 'share':
+        match = re.match(r"(\d+(?:\.\d+)?)\s*%?$", value)
+        if match:
+            number = float(match.group(1))
+            return int(number) if number.is_integer() else number
+    return value
+
+
+def parse_table(table: List[List[Optional[str]]], page: int = 1) -> List[dict]:
+    """
+    Turn one pdfplumber table into row-level records.
+
+    A table whose header names a nominee and at least one other known column
+    (relationship, age, % of claim, appointee) yields 'nominee' records with those
+    canonical columns (age and share typed as numbers). A grid whose cells hold their
+    own labels ('Policy No. : 123' | 'GSTIN : 27...') yields one 'schedule' record per
+    label. A two-column table yields 'schedule' key/value records. Other tables yield
+    'schedule' records keyed by their header cells.
+
+    Returns:
+        [{'table': 'nominee'|'schedule', 'page': int, 'row': {column: value}, 'text': str}, ...]
+    """
+    rows = [row for row in table if row and any(_clean_cell(cell) for cell in row)]
+    records: List[dict] = []
+    for i, row in enumerate(rows):
+        mapping = _nominee_header(row)
+        if mapping is None:
+            continue
+        for data in rows[i + 1:]:
+            if _nominee_header(data) is not None:
+                break
+            values = {column: _clean_cell(data[col]) for col, column in mapping.items() if col < len(data)}
+            if not values.get('name'):
+                continue
+            record = {column: _typed(column, value) for column, value in values.items() if value is not None}
+            records.append({'table': 'nominee', 'page': page, 'row': record, 'text': format_row(record)})
+        return records
+
+    if rows and _is_label_value_grid(rows):
+        # The first column is not a key column: each cell is a key/value pair of its own
+        for row in rows:
+            for cell in row:
+                for key, value in _label_value_pairs(cell):
+                    records.append({'table': 'schedule', 'page': page, 'row': {key: value}, 'text': f"{key}: {value}"})
+        return records
+
+    if rows and all(len(row) == 2 for row in rows):
+        for key, value in rows:
+            key, value = _clean_cell(key), _clean_cell(value)
+            if key and value:
+                records.append({'table': 'schedule', 'page': page, 'row': {key: value}, 'text': f"{key}: {value}"})
+        return records
+
+    if len(rows) > 1:
+        headers = [_clean_cell(cell) or f"column {col + 1}" for col, cell in enumerate(rows[0])]
+        for data in rows[1:]:
+            record = {headers[col]: value for col, value in enumerate(map(_clean_cell, data))
+                      if col < len(headers) and value}
+            if record:
+                text = " | ".join(f"{key}: {value}" for key, value in record.items())
+                records.append({'table': 'schedule', 'page': page, 'row': record, 'text': text})
+    return records
+
+
+def extract_table_records(tables: Iterable[List[List[Optional[str]]]], page: int = 1) -> List[dict]:
+    """Row-level records for every table on one page (see parse_table)."""
+    return [record for table in tables for record in parse_table(table, page)]
+
+
+def _display(column: str, value) -> str:
+    return f"{value}%" if column == 'share' and isinstance(value, (int, float)) else str(value)
+
+
+def format_row(row: dict) -> str:
+    """One-line description of a nominee row, e.g. 'Nominee: Sumegha | Relationship: Spouse | % of Claim: 100%'."""
+    return " | ".join(f"{label}: {_display(column, row[column])}" for column, label in COLUMN_LABELS.items()
+                      if column in row)
+
+
+def is_nominee_question(query: str) -> bool:
+    """True for plain nominee/appointee lookups ('Who are my nominees and their shares?'),
+    False for anything else ('Can I change my nominee?')."""
+    if not _QUESTION.search(query):
+        return False
+    rest = _QUESTION.sub(' ', query.lower())
+    return all(word in _FILLER_WORDS for word in re.findall(r"[a-z%]+", rest))
+
+
+def answer_table_question(query: str, documents: Iterable[Tuple[str, List[dict]]]) -> Optional[Tuple[str, str]]:
+    """
+    Answer a nominee question from extracted table rows, without the LLM.
+
+    Args:
+        query: User question
+        documents: (document display name, table records) pairs to answer from
+
+    Returns:
+        (reply, rationale) with a markdown table of the nominee rows, or None if the
+        query is not a nominee lookup or no nominee rows were extracted
+    """
+    if not is_nominee_question(query):
+        return None
+    found = [(doc_name, record) for doc_name, records in documents
+             for record in records if record['table'] == 'nominee']
+    if not found:
+        return None
+    # Show every column any row has, in canonical order, so one question gets the whole row
+    shown = [column for column in COLUMN_LABELS if any(column in record['row'] for _, record in found)]
+    multi_doc = len({doc_name for doc_name, _ in found}) > 1
+    header = ([] if not multi_doc else ['Document']) + [COLUMN_LABELS[column] for column in shown]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for doc_name, record in found:
+        cells = [_display(column, record['row'][column]) if column in record['row'] else "-" for column in shown]
+        lines.append("| " + " | ".join(([doc_name] if multi_doc else []) + cells) + " |")
+    sources = sorted({f"{doc_name} p.{record['page']}" for doc_name, record in found})
+    rationale = "Answered directly from the nominee table in the uploaded document — " + ", ".join(sources)
+    return "\n".join(lines), rationale
@@ -1,35 +1,45 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import faiss
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from utils.embeddings import DEFAULT_MODEL_NAME, encode_queries, encode_texts
+from utils.index_factory import create_index
 
 
-def build_index(documents: List[str]) -> faiss.IndexFlatL2:
+def build_index(documents: List[str], model_name: str = DEFAULT_MODEL_NAME,
+                index_type: Optional[str] = None, **index_params) -> faiss.Index:
     """
-    Embeds each document with SentenceTransformer('all-MiniLM-L6-v2'),
-    creates a FAISS IndexFlatL2, and adds the embeddings.
+    Embeds each document with the shared encoder (all-MiniLM-L6-v2 by default)
+    and adds the embeddings to a FAISS index. The index is an exact IndexFlatL2
+    unless `index_type` (or POLICYPULSE_INDEX_TYPE) selects an approximate one;
+    see utils.index_factory.create_index for the types and tuning parameters.
     """
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    embeddings = model.encode(documents, convert_to_numpy=True)
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-    return index
+    embeddings = encode_texts(documents, model_name)
+    return index_from_embeddings(embeddings, index_type, **index_params)
 
 
-def query_index(index: faiss.IndexFlatL2, docs: List[str], query: str, k: int = 3) -> List[str]:
+def index_from_embeddings(embeddings: np.ndarray, index_type: Optional[str] = None,
+                          **index_params) -> faiss.Index:
+    """
+    Creates a FAISS index from a precomputed (n, dim) embedding matrix.
+    """
+    return create_index(embeddings, index_type, **index_params)
+
+
+def query_index(index: faiss.Index, docs: List[str], query: str, k: int = 3,
+                model_name: str = DEFAULT_MODEL_NAME) -> List[str]:
     """
     Embeds the query, searches the index for the top-k nearest docs,
     and returns the matching document texts.
     """
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    query_embedding = model.encode([query], convert_to_numpy=True)
+    query_embedding = encode_queries([query], model_name)
     D, I = index.search(query_embedding, k)
-    return [docs[i] for i in I[0]]
+    # Approximate indexes pad with -1 when fewer than k candidates are found
+    return [docs[i] for i in I[0] if i != -1]
 
 
-def search_document_chunks(index: faiss.IndexFlatL2, doc_chunks: List[str], query: str, 
-                          k: int = 3, similarity_threshold: float = 0.3) -> Tuple[List[str], bool]:
+def search_document_chunks(index: faiss.Index, doc_chunks: List[str], query: str, 
+                          k: int = 3, similarity_threshold: float = 0.3,
+                          model_name: str = DEFAULT_MODEL_NAME) -> Tuple[List[str], bool]:
     """
     Search document chunks with similarity threshold checking.
     
@@ -39,26 +49,56 @@ def search_document_chunks(index: faiss.IndexFlatL2, doc_chunks: List[str], quer
         query: User query
         k: Number of top results to retrieve
         similarity_threshold: Minimum similarity score (lower distance = higher similarity)
+        model_name: Encoder used to build the index
     
     Returns:
         Tuple of (relevant_chunks, has_relevant_chunks)
     """
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    query_embedding = model.encode([query], convert_to_numpy=True)
+    query_embedding = encode_queries([query], model_name)
     
     # Search for top k results
     distances, indices = index.search(query_embedding, k)
+    return _filter_by_similarity(distances[0], indices[0], doc_chunks, similarity_threshold)
+
+
+def search_many(index: faiss.Index, docs: List[str], queries: List[str], k: int = 3,
+                threshold: float = 0.3, model_name: str = DEFAULT_MODEL_NAME) -> List[Tuple[List[str], bool]]:
+    """
+    Batched search_document_chunks: all queries are embedded in one encoder batch
+    (cached queries are skipped) and searched with a single index.search call.
     
-    # Filter results based on similarity threshold
+    Args:
+        index: FAISS index of document chunks
+        docs: List of document chunks
+        queries: User queries
+        k: Number of top results to retrieve per query
+        threshold: Minimum similarity score, as in search_document_chunks
+        model_name: Encoder used to build the index
+    
+    Returns:
+        One (relevant_chunks, has_relevant_chunks) tuple per query, in input order
+    """
+    if not queries:
+        return []
+    query_embeddings = encode_queries(list(queries), model_name)
+    distances, indices = index.search(query_embeddings, k)
+    return [
+        _filter_by_similarity(distances[row], indices[row], docs, threshold)
+        for row in range(len(queries))
+    ]
+
+
+def _filter_by_similarity(distances: np.ndarray, indices: np.ndarray, doc_chunks: List[str],
+                          similarity_threshold: float) -> Tuple[List[str], bool]:
+    """Keep the hits of one query whose similarity clears the threshold."""
     relevant_chunks = []
-    for i, distance in enumerate(distances[0]):
+    for distance, chunk_idx in zip(distances, indices):
         # Convert distance to similarity score (lower distance = higher similarity)
         # Using a simple conversion: similarity = 1 / (1 + distance)
         similarity = 1 / (1 + distance)
         
         if similarity >= similarity_threshold:
-            chunk_idx = indices[0][i]
-            if chunk_idx < len(doc_chunks):
+            if 0 <= chunk_idx < len(doc_chunks):
                 relevant_chunks.append(doc_chunks[chunk_idx])
     
     has_relevant_chunks = len(relevant_chunks) > 0